@@ -0,0 +1,19 @@
+-- Job Passport stok kodu aramaları için index
+-- /api/job-data (exact/prefix) ve /api/job-search (prefix) bu index'te seek yapar;
+-- SIPARIS_NO aynı stok kodunun en son siparişini sıralamadan bulmak için eklenir.
+-- contains modu (LIKE '%kod%') index kullanamaz, tarama yapar.
+
+USE EGEM2025;
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_EGEM_GRAVUR_SIPARIS_IZLEME_stok_kodu' AND object_id = OBJECT_ID('dbo.EGEM_GRAVUR_SIPARIS_IZLEME'))
+BEGIN
+    CREATE NONCLUSTERED INDEX [IX_EGEM_GRAVUR_SIPARIS_IZLEME_stok_kodu]
+    ON [dbo].[EGEM_GRAVUR_SIPARIS_IZLEME]([stok_kodu], [SIPARIS_NO] DESC);
+    PRINT 'IX_EGEM_GRAVUR_SIPARIS_IZLEME_stok_kodu index''i oluşturuldu.';
+END
+ELSE
+BEGIN
+    PRINT 'IX_EGEM_GRAVUR_SIPARIS_IZLEME_stok_kodu index''i zaten mevcut.';
+END
+GO
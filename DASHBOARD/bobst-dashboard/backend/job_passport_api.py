@@ -8,6 +8,7 @@ Veritabanından veri çekerek iş pasaportu bilgilerini API olarak sunar
 from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
 from sqlalchemy import create_engine, text
+from sqlalchemy.exc import SQLAlchemyError
 import os
 from datetime import datetime
 import json
@@ -16,6 +17,68 @@ import json
 app = Flask(__name__, static_folder='static', static_url_path='')
 CORS(app)  # CORS desteği ekle
 
+# Veritabanı bağlantı havuzu ayarları (ortam değişkeniyle değiştirilebilir)
+DB_POOL_SIZE = int(os.environ.get('JOB_API_DB_POOL_SIZE', '5'))  # Havuzda açık tutulan bağlantı sayısı
+DB_MAX_OVERFLOW = int(os.environ.get('JOB_API_DB_MAX_OVERFLOW', '10'))  # Yoğunlukta açılabilecek ek bağlantı
+DB_POOL_TIMEOUT = int(os.environ.get('JOB_API_DB_POOL_TIMEOUT', '30'))  # Boş bağlantı bekleme süresi (sn)
+DB_POOL_RECYCLE = int(os.environ.get('JOB_API_DB_POOL_RECYCLE', '1800'))  # Bu süreden eski bağlantılar yenilenir (sn)
+
+JOB_TABLE = "[EGEM2025].[dbo].[EGEM_GRAVUR_SIPARIS_IZLEME]"
+
+# process_job_data'nın kullandığı kolonlar; SELECT * yerine sadece bunlar çekilir
+JOB_COLUMNS = (
+    ['stok_kodu', 'SIPARIS_NO', 'hammadde_kodu', 'silindir_cevresi']
+    + ['silindir_cevre' + str(i) for i in range(1, 13)]
+    + ['RENK_SIRA' + str(i) for i in range(1, 13)]
+    + ['silindir_no' + str(i) for i in range(1, 13)]
+    + ['MUREKKEP_KODU' + str(i) for i in range(1, 13)]
+    + ['VIZ_RENK_' + str(i) for i in range(1, 13)]
+    + ['INCELTICI' + str(i) for i in range(1, 13)]
+    + ['MEDIUM_KOD' + str(i) for i in range(1, 13)]
+    + ['TONER_KOD_' + str(toner_no) + '_' + str(unite) for unite in range(1, 13) for toner_no in range(1, 5)]
+)
+
+# Arama modları: exact ve prefix stok_kodu index'inde seek yapabilir, contains tabloyu tarar.
+# auto sırayla exact, prefix ve contains dener (eski LIKE '%kod%' davranışı en son çare)
+SEARCH_MODES = ('exact', 'prefix', 'contains')
+STOK_KODU_MAX_LENGTH = 100
+CONTAINS_MIN_LENGTH = 3  # Typeahead'de contains taraması için en az karakter
+TYPEAHEAD_DEFAULT_LIMIT = 10
+TYPEAHEAD_MAX_LIMIT = 50
+
+# Parametreler VARCHAR'a çevrilir: pyodbc str'yi NVARCHAR gönderir, varchar kolon
+# NVARCHAR'a yükseltilirse (SQL collation'da) index seek yerine tarama yapılır
+SEARCH_PARAM_TYPE = 'VARCHAR(' + str(2 * STOK_KODU_MAX_LENGTH + 2) + ')'
+
+# Eşleşme sırası: tam eşleşme, başında geçen, içinde geçen
+MATCH_RANK_SQL = (
+    "CASE WHEN stok_kodu = CAST(:kod AS " + SEARCH_PARAM_TYPE + ") THEN 0 "
+    "WHEN stok_kodu LIKE CAST(:onek AS " + SEARCH_PARAM_TYPE + ") ESCAPE '\\' THEN 1 ELSE 2 END"
+)
+MATCH_NAMES = {0: 'exact', 1: 'prefix', 2: 'contains'}
+
+
+def escape_like(value):
+    """LIKE joker karakterlerini (%, _, [) kaçış karakteriyle etkisizleştir"""
+    for char in ('\\', '%', '_', '['):
+        value = value.replace(char, '\\' + char)
+    return value
+
+
+def search_condition(stok_kodu, mode):
+    """Arama modu için WHERE koşulu ve parametreleri (sıralama parametreleri dahil)"""
+    if mode not in SEARCH_MODES:
+        raise ValueError("Geçersiz arama modu: " + str(mode) + " (" + ", ".join(SEARCH_MODES) + ")")
+    params = {'kod': stok_kodu, 'onek': escape_like(stok_kodu) + '%'}
+    if mode == 'exact':
+        condition = "stok_kodu = CAST(:kod AS " + SEARCH_PARAM_TYPE + ")"
+    elif mode == 'prefix':
+        condition = "stok_kodu LIKE CAST(:onek AS " + SEARCH_PARAM_TYPE + ") ESCAPE '\\'"
+    else:
+        params['desen'] = '%' + params['onek']
+        condition = "stok_kodu LIKE CAST(:desen AS " + SEARCH_PARAM_TYPE + ") ESCAPE '\\'"
+    return condition, params
+
 class JobPassportAPI:
     def __init__(self):
         self.connection_string = (
@@ -23,8 +86,18 @@ class JobPassportAPI:
             "driver=ODBC+Driver+17+for+SQL+Server&"
             "TrustServerCertificate=yes"
         )
-        self.engine = None
-        self.connection = None
+        # Süreç boyunca tek engine: bağlantılar havuzda tutulur, her istek kendi
+        # bağlantısını alıp işi bitince geri bırakır. pool_pre_ping kopmuş
+        # bağlantıyı (SQL Server yeniden başlatma, ağ kesintisi) kullanmadan önce
+        # fark edip yenisini açar. Engine bağlantıyı ilk istekte açar.
+        self.engine = create_engine(
+            self.connection_string,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True
+        )
         
         # Lemanic 1 makinası için DR Blade Açıları tablosu
         self.dr_blade_table = [
@@ -34,49 +107,92 @@ class JobPassportAPI:
             (680, 0, 26), (690, 0, 25), (700, 0, 24), (710, 0, 23), (720, 0, 21), (730, 0, 20), (740, 0, 19), (750, 0, 17), (760, 0, 16), (770, 0, 15), (780, 0, 14), (790, 0, 12), (800, 0, 11)
         ]
         
-    def connect_database(self):
-        """Veritabanına bağlan"""
-        try:
-            self.engine = create_engine(self.connection_string)
-            self.connection = self.engine.connect()
-            print("Veritabanına başarıyla bağlandı")
-            return True
-        except Exception as e:
-            print(f"Veritabanı bağlantı hatası: {e}")
-            return False
-    
-    def disconnect_database(self):
-        """Veritabanı bağlantısını kapat"""
-        if self.connection:
-            self.connection.close()
-            print("Veritabanı bağlantısı kapatıldı")
+    def pool_status(self):
+        """Bağlantı havuzunun durumu (health check için)"""
+        pool = self.engine.pool
+        return {
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'idle': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0)
+        }
     
-    def get_job_data_by_stok_kodu(self, stok_kodu):
-        """stok_kodu ile iş verilerini veritabanından çek"""
-        if not self.connection:
-            return None
-            
-        try:
-            # EGEM_GRAVUR_SIPARIS_IZLEME tablosundan veri çek
-            query = text("""
-            SELECT * FROM [EGEM2025].[dbo].[EGEM_GRAVUR_SIPARIS_IZLEME] 
-            WHERE stok_kodu LIKE :stok_kodu
-            """)
-            
-            result = self.connection.execute(query, {"stok_kodu": "%" + stok_kodu + "%"})
-            job_data = result.fetchone()
-            
-            if job_data:
-                # Result'ı dictionary'ye çevir
-                job_dict = dict(job_data._mapping)
-                return self.process_job_data(job_dict)
-            else:
+    def get_job_data_by_stok_kodu(self, stok_kodu, mode='auto'):
+        """stok_kodu ile iş verilerini veritabanından çek
+        
+        mode: exact, prefix, contains veya auto (sırayla üçü). Aynı stok
+        kodunun birden fazla siparişi varsa en son SIPARIS_NO döner.
+        Havuzdan bağlantı alınamazsa SQLAlchemyError yükseltir.
+        """
+        modes = SEARCH_MODES if mode == 'auto' else (mode,)
+        conditions = [search_condition(stok_kodu, search_mode) for search_mode in modes]
+        
+        # Bağlantı havuzdan alınır, blok bitince havuza geri döner
+        with self.engine.connect() as connection:
+            try:
+                for condition, params in conditions:
+                    # EGEM_GRAVUR_SIPARIS_IZLEME tablosundan sadece kullanılan kolonları çek
+                    query = text(
+                        "SELECT TOP 1 " + ", ".join("[" + column + "]" for column in JOB_COLUMNS) +
+                        " FROM " + JOB_TABLE +
+                        " WHERE " + condition +
+                        " ORDER BY " + MATCH_RANK_SQL + ", stok_kodu, SIPARIS_NO DESC"
+                    )
+                    job_data = connection.execute(query, params).fetchone()
+                    
+                    if job_data:
+                        # Result'ı dictionary'ye çevir
+                        job_dict = dict(job_data._mapping)
+                        return self.process_job_data(job_dict)
+                
                 print("stok_kodu '" + stok_kodu + "' ile veri bulunamadı")
                 return None
-                
-        except Exception as e:
-            print(f"Veri çekme hatası: {e}")
-            return None
+                    
+            except SQLAlchemyError as e:
+                print(f"Veri çekme hatası: {e}")
+                return None
+    
+    def search_stok_kodlari(self, query_text, mode='prefix', limit=TYPEAHEAD_DEFAULT_LIMIT, after=None):
+        """Typeahead için eşleşen stok kodlarını sıralı getir (keyset sayfalama)
+        
+        Sonuçlar (eşleşme sırası, stok_kodu) ile sıralanır; after bir önceki
+        sayfanın son (sıra, stok_kodu) çiftidir. OFFSET yerine bu çiftten
+        sonrası istendiği için derin sayfalar da aynı hızda gelir.
+        limit + 1 satır çekilir, fazlası sonraki sayfa olduğunu gösterir.
+        """
+        condition, params = search_condition(query_text, mode)
+        params['limit'] = limit + 1
+        keyset = ""
+        if after is not None:
+            keyset = " WHERE match_rank > :after_rank OR (match_rank = :after_rank AND stok_kodu > :after_kodu)"
+            params['after_rank'], params['after_kodu'] = after
+        
+        query = text(
+            "SELECT TOP (:limit) stok_kodu, match_rank, siparis_sayisi, son_siparis_no FROM ("
+            "SELECT stok_kodu, " + MATCH_RANK_SQL + " AS match_rank, "
+            "COUNT(*) AS siparis_sayisi, MAX(SIPARIS_NO) AS son_siparis_no"
+            " FROM " + JOB_TABLE +
+            " WHERE " + condition +
+            " GROUP BY stok_kodu) AS eslesmeler" + keyset +
+            " ORDER BY match_rank, stok_kodu"
+        )
+        with self.engine.connect() as connection:
+            rows = connection.execute(query, params).fetchall()
+        
+        results = [
+            {
+                'stok_kodu': row.stok_kodu,
+                'eslesme': MATCH_NAMES[row.match_rank],
+                'siparis_sayisi': row.siparis_sayisi,
+                'son_siparis_no': row.son_siparis_no
+            }
+            for row in rows[:limit]
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = str(last.match_rank) + ':' + last.stok_kodu
+        return results, next_cursor
     
     def process_job_data(self, raw_data):
         """Ham veriyi işle ve formatla"""
@@ -89,6 +205,7 @@ class JobPassportAPI:
         
         processed_data = {
             'is_adi': raw_data.get('stok_kodu', ''),
+            'siparis_no': raw_data.get('SIPARIS_NO', ''),
             'silindir_cevresi': silindir_cevresi,
             'dr_blade_angles': dr_blade_angles,  # F, V, H değerleri
             'karton': raw_data.get('hammadde_kodu', ''),
@@ -232,6 +349,7 @@ def health_check():
     return jsonify({
         'status': 'online',
         'service': 'Job Passport API',
+        'db_pool': job_api.pool_status(),
         'timestamp': datetime.now().isoformat()
     })
 
@@ -243,6 +361,7 @@ def get_job_data():
         data = request.get_json()
         print("Gelen veri: " + str(data))
         stok_kodu = data.get('stok_kodu', '').strip()
+        mode = data.get('mode', 'auto')
         
         if not stok_kodu:
             return jsonify({
@@ -250,18 +369,27 @@ def get_job_data():
                 'error': 'Stok kodu boş olamaz'
             }), 400
         
-        # Veritabanına bağlan
-        if not job_api.connect_database():
+        if len(stok_kodu) > STOK_KODU_MAX_LENGTH:
             return jsonify({
                 'success': False,
-                'error': 'Veritabanı bağlantı hatası'
-            }), 500
+                'error': 'Stok kodu en fazla ' + str(STOK_KODU_MAX_LENGTH) + ' karakter olabilir'
+            }), 400
         
-        # Veriyi çek
-        job_data = job_api.get_job_data_by_stok_kodu(stok_kodu)
+        if mode != 'auto' and mode not in SEARCH_MODES:
+            return jsonify({
+                'success': False,
+                'error': 'Geçersiz arama modu: ' + str(mode)
+            }), 400
         
-        # Bağlantıyı kapat
-        job_api.disconnect_database()
+        # Veriyi çek (bağlantı havuzdan alınıp geri bırakılır)
+        try:
+            job_data = job_api.get_job_data_by_stok_kodu(stok_kodu, mode)
+        except SQLAlchemyError as e:
+            print(f"Veritabanı bağlantı hatası: {e}")
+            return jsonify({
+                'success': False,
+                'error': 'Veritabanı bağlantı hatası'
+            }), 500
         
         if job_data:
             return jsonify({
@@ -281,6 +409,65 @@ def get_job_data():
             'error': str(e)
         }), 500
 
+@app.route('/api/job-search', methods=['GET'])
+def search_jobs():
+    """Stok kodu typeahead: en iyi eşleşen stok kodları, keyset sayfalama ile"""
+    query_text = request.args.get('q', '').strip()
+    mode = request.args.get('mode', 'prefix')
+    cursor = request.args.get('cursor')
+    
+    if not query_text:
+        return jsonify({
+            'success': False,
+            'error': 'Arama metni boş olamaz'
+        }), 400
+    
+    if len(query_text) > STOK_KODU_MAX_LENGTH:
+        return jsonify({
+            'success': False,
+            'error': 'Arama metni en fazla ' + str(STOK_KODU_MAX_LENGTH) + ' karakter olabilir'
+        }), 400
+    
+    if mode not in SEARCH_MODES:
+        return jsonify({
+            'success': False,
+            'error': 'Geçersiz arama modu: ' + str(mode)
+        }), 400
+    
+    if mode == 'contains' and len(query_text) < CONTAINS_MIN_LENGTH:
+        return jsonify({
+            'success': False,
+            'error': 'İçinde arama için en az ' + str(CONTAINS_MIN_LENGTH) + ' karakter gerekli'
+        }), 400
+    
+    try:
+        limit = min(max(int(request.args.get('limit', TYPEAHEAD_DEFAULT_LIMIT)), 1), TYPEAHEAD_MAX_LIMIT)
+        after = None
+        if cursor:
+            # Cursor: "<eşleşme sırası>:<stok_kodu>" (stok kodu ':' içerebilir)
+            rank, after_kodu = cursor.split(':', 1)
+            after = (int(rank), after_kodu)
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Geçersiz limit veya cursor'
+        }), 400
+    
+    try:
+        results, next_cursor = job_api.search_stok_kodlari(query_text, mode, limit, after)
+    except SQLAlchemyError as e:
+        print(f"Stok kodu arama hatası: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Veritabanı hatası'
+        }), 500
+    
+    return jsonify({
+        'success': True,
+        'data': results,
+        'next_cursor': next_cursor
+    })
+
 @app.route('/lpng/<path:filename>')
 def serve_image(filename):
     """PNG dosyalarını sun"""
@@ -0,0 +1,115 @@
+import pytest
+from sqlalchemy import create_engine, event, text
+
+# Modul yuklenirken mssql+pyodbc engine'i olusturulur
+pytest.importorskip('pyodbc')
+
+import job_passport_api
+from job_passport_api import app, job_api
+
+STOK_KODLARI = {
+    'AB': 2,
+    'AB:1': 1,
+    'AB:2': 3,
+    'AB_X': 1,
+    'ABC': 1,
+    'ABD-01': 2,
+    'ABD-02': 1,
+    'XAB': 1,
+    'YAB:9': 2,
+    'ZZZ': 1,
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # SQL Server yerine SQLite: tablo adi sadelesir, TOP (:limit) sondaki LIMIT'e cevrilir
+    engine = create_engine('sqlite://')
+
+    @event.listens_for(engine, 'before_cursor_execute', retval=True)
+    def top_to_limit(connection, cursor, statement, parameters, context, executemany):
+        if statement.startswith('SELECT TOP (?) '):
+            statement = 'SELECT ' + statement[len('SELECT TOP (?) '):] + ' LIMIT ?'
+            parameters = tuple(parameters[1:]) + (parameters[0],)
+        return statement, parameters
+
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE siparisler (stok_kodu VARCHAR(100), SIPARIS_NO INTEGER)'))
+        siparis_no = 0
+        for stok_kodu, count in STOK_KODLARI.items():
+            for _ in range(count):
+                siparis_no += 1
+                connection.execute(text('INSERT INTO siparisler VALUES (:kod, :no)'), {'kod': stok_kodu, 'no': siparis_no})
+
+    monkeypatch.setattr(job_passport_api, 'JOB_TABLE', 'siparisler')
+    monkeypatch.setattr(job_api, 'engine', engine)
+    yield app.test_client()
+    engine.dispose()
+
+
+def search_pages(client, query, mode, limit):
+    pages = []
+    cursor = None
+    while True:
+        params = {'q': query, 'mode': mode, 'limit': limit}
+        if cursor:
+            params['cursor'] = cursor
+        body = client.get('/api/job-search', query_string=params).get_json()
+        assert body['success']
+        pages.append(body['data'])
+        cursor = body['next_cursor']
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize('mode, query', [('prefix', 'AB'), ('prefix', 'AB:'), ('contains', 'AB:')])
+def test_cursor_pages_cover_all_matches_once_in_order(client, mode, query):
+    everything = search_pages(client, query, mode, 50)
+    assert len(everything) == 1
+    expected = everything[0]
+
+    for limit in (1, 2, 3):
+        pages = search_pages(client, query, mode, limit)
+        assert all(len(page) == limit for page in pages[:-1])
+        assert [row for page in pages for row in page] == expected
+
+
+def test_results_are_ranked_exact_prefix_contains(client):
+    # Route contains icin en az 3 karakter ister; siralama dogrudan sorguda denenir
+    rows, cursor = job_api.search_stok_kodlari('AB', 'contains', limit=50)
+    assert cursor is None
+    assert [(row['stok_kodu'], row['eslesme']) for row in rows] == [
+        ('AB', 'exact'),
+        ('AB:1', 'prefix'), ('AB:2', 'prefix'), ('ABC', 'prefix'),
+        ('ABD-01', 'prefix'), ('ABD-02', 'prefix'), ('AB_X', 'prefix'),
+        ('XAB', 'contains'), ('YAB:9', 'contains'),
+    ]
+    assert rows[2]['siparis_sayisi'] == 3
+    # LIKE jokerleri kacirilir: '_' herhangi bir karakterle eslesmez
+    assert [row['stok_kodu'] for row in search_pages(client, 'AB_', 'prefix', 50)[0]] == ['AB_X']
+
+
+def test_cursor_keeps_colons_in_stok_kodu(client):
+    body = client.get('/api/job-search', query_string={'q': 'AB', 'mode': 'prefix', 'limit': 2}).get_json()
+    assert [row['stok_kodu'] for row in body['data']] == ['AB', 'AB:1']
+    assert body['next_cursor'] == '1:AB:1'
+
+    body = client.get('/api/job-search', query_string={
+        'q': 'AB', 'mode': 'prefix', 'limit': 2, 'cursor': body['next_cursor']
+    }).get_json()
+    assert [row['stok_kodu'] for row in body['data']] == ['AB:2', 'ABC']
+
+
+def test_search_stok_kodlari_accepts_its_own_cursor(client):
+    results, cursor = job_api.search_stok_kodlari('AB', 'contains', limit=8)
+    assert results[-1]['stok_kodu'] == 'XAB' and cursor == '2:XAB'
+    rank, after_kodu = cursor.split(':', 1)
+    results, cursor = job_api.search_stok_kodlari('AB', 'contains', limit=8, after=(int(rank), after_kodu))
+    assert [row['stok_kodu'] for row in results] == ['YAB:9'] and cursor is None
+
+
+@pytest.mark.parametrize('cursor', ['AB', 'x:AB', ':AB'])
+def test_malformed_cursor_is_rejected(client, cursor):
+    response = client.get('/api/job-search', query_string={'q': 'AB', 'cursor': cursor})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Geçersiz limit veya cursor'
@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLog:
+    """PLC yazmalari icin sadece eklenen (append-only) denetim kaydi.
+
+    Kayitlar gunluk JSONL dosyalarina (audit-YYYYMMDD.jsonl) yazilir.
+    append() kaydi bellekteki tampona koyar ve hemen doner; yazici thread
+    tamponda biriken tum kayitlari tek write + tek fsync ile diske indirir
+    (group commit). Boylece yazma yoluna eklenen gecikme bir lock'tan
+    ibarettir. Kayitlar zaman sirasiyla eklendigi icin query() her dosyada
+    baslangic noktasini ikili arama ile bulur.
+
+    Yazilamayan kayitlar (disk dolu, dosya kilitli) atilmaz: tamponun basina
+    geri konup commit_interval sonra tekrar denenir. Her gun dosyasi ayri
+    yazilir ve ayri takip edilir; yazilan gunun kayitlari tekrar yazilmaz,
+    yarim kalan yazma dosyadan geri kesilir. Bekleyen kayit max_pending'i
+    asarsa en eski kayitlar atilir ve dropped'da sayilir.
+    """
+
+    def __init__(self, directory, commit_interval=0.05, max_batch=1000, max_pending=100000):
+        self.directory = directory
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self._buffer = []
+        self._in_flight = 0
+        self._last_timestamp = 0.0
+        self._condition = threading.Condition()
+        self._closed = False
+        self.appended = 0
+        self.committed = 0
+        self.fsyncs = 0
+        self.failed = 0
+        self.dropped = 0
+        self.last_error = None
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name='audit-log', daemon=True)
+        self._thread.start()
+
+    def append(self, record):
+        # Zaman damgasi lock altinda verilir; dosya icinde sira korunur
+        with self._condition:
+            timestamp = max(time.time(), self._last_timestamp)
+            self._last_timestamp = timestamp
+            self._buffer.append(dict(record, ts=timestamp))
+            self.appended += 1
+            if len(self._buffer) >= self.max_batch:
+                self._condition.notify()
+        return timestamp
+
+    def flush(self, timeout=5.0):
+        # Tampondaki kayitlar diske inene kadar bekle (kapanis ve testler icin)
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            self._condition.notify()
+            while (self._buffer or self._in_flight) and time.monotonic() < deadline:
+                self._condition.wait(0.01)
+
+    def close(self):
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+    def query(self, since=None, until=None, machine=None, limit=1000):
+        """[since, until] araligindaki kayitlari eskiden yeniye doner."""
+        records = []
+        for path in self._files(since, until):
+            try:
+                with open(path, 'rb') as f:
+                    f.seek(self._seek(f, since) if since is not None else 0)
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            # Yarim kalmis son satir (ani kapanma)
+                            continue
+                        if since is not None and record['ts'] < since:
+                            continue
+                        if until is not None and record['ts'] > until:
+                            break
+                        if machine is not None and record.get('machine') != machine:
+                            continue
+                        records.append(record)
+                        if len(records) >= limit:
+                            return records
+            except OSError as e:
+                logger.error(f"Denetim kaydi okunamadi: {path} - {e}")
+        return records
+
+    def stats(self):
+        with self._condition:
+            pending = len(self._buffer) + self._in_flight
+        return {
+            'directory': self.directory,
+            'commit_interval_ms': round(self.commit_interval * 1000, 1),
+            'appended': self.appended,
+            'committed': self.committed,
+            'pending': pending,
+            'fsyncs': self.fsyncs,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'last_error': self.last_error,
+        }
+
+    def _files(self, since, until):
+        first = self._day(since) if since is not None else None
+        last = self._day(until) if until is not None else None
+        names = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith('audit-') and name.endswith('.jsonl')
+        )
+        return [
+            os.path.join(self.directory, name) for name in names
+            if (first is None or name[6:14] >= first) and (last is None or name[6:14] <= last)
+        ]
+
+    @staticmethod
+    def _day(timestamp):
+        return datetime.fromtimestamp(timestamp).strftime('%Y%m%d')
+
+    @staticmethod
+    def _seek(f, since):
+        # ts < since olan son satirdan sonraki satir basini ikili arama ile bul
+        f.seek(0, os.SEEK_END)
+        low, high = 0, f.tell()
+        while high - low > 4096:
+            middle = (low + high) // 2
+            f.seek(middle)
+            f.readline()
+            line = f.readline()
+            try:
+                timestamp = json.loads(line)['ts']
+            except (ValueError, KeyError):
+                break
+            if timestamp < since:
+                low = middle
+            else:
+                high = middle
+        if low == 0:
+            return 0
+        f.seek(low)
+        f.readline()
+        return f.tell()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._buffer and not self._closed:
+                    self._condition.wait(self.commit_interval)
+                if self._closed and not self._buffer:
+                    return
+                batch, self._buffer = self._buffer, []
+                self._in_flight = len(batch)
+            if not batch:
+                continue
+            remaining = self._commit(batch)
+            with self._condition:
+                self._in_flight = 0
+                if remaining:
+                    # Yazilamayan kayitlar sira bozulmadan tamponun basina geri konur
+                    self._buffer[:0] = remaining
+                    overflow = len(self._buffer) - self.max_pending
+                    if overflow > 0:
+                        del self._buffer[:overflow]
+                        self.dropped += overflow
+                        logger.error(f"Denetim kaydi tamponu doldu, en eski {overflow} kayit atildi")
+                self._condition.notify_all()
+            # Bir sonraki grubun birikmesi (veya tekrar deneme) icin kisa bekle
+            time.sleep(self.commit_interval)
+
+    def _commit(self, batch):
+        """Kayitlari gun dosyalarina yazar, yazilamayan kayitlari doner."""
+        by_day = {}
+        for record in batch:
+            by_day.setdefault(self._day(record['ts']), []).append(record)
+        remaining = []
+        for day, records in by_day.items():
+            path = os.path.join(self.directory, f'audit-{day}.jsonl')
+            data = ''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records)
+            try:
+                self._append_file(path, data)
+            except OSError as e:
+                self.failed += 1
+                remaining.extend(records)
+                if str(e) != self.last_error:
+                    logger.warning(f"Denetim kaydi yazilamadi, {len(records)} kayit tekrar denenecek: {path} - {e}")
+                self.last_error = str(e)
+                continue
+            self.fsyncs += 1
+            self.committed += len(records)
+            self.last_error = None
+        return remaining
+
+    @staticmethod
+    def _append_file(path, data):
+        with open(path, 'a', encoding='utf-8') as f:
+            position = f.tell()
+            try:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            except OSError:
+                # Yarim kalan satirlar tekrar denemede ikinci kez yazilmasin
+                try:
+                    f.truncate(position)
+                except OSError:
+                    pass
+                raise
@@ -0,0 +1,150 @@
+import struct
+import sys
+from array import array
+
+from modbus_blocks import MAX_READ_REGISTERS
+from plc_address import DEFAULT_WORD_ORDER
+
+# Veri tipi -> struct karakteri (bayt sirasi Struct basinda verilir)
+_TYPE_CODES = {'WORD': 'H', 'INT': 'h', 'DWORD': 'I', 'DINT': 'i', 'REAL': 'f', 'BOOL': 'H'}
+
+# Yerel register dizisinde (array('H')) 32 bit degerin word sirasi bu ise
+# dogrudan okunur: little-endian makinede dusuk word once olan degerin baytlari
+# zaten little-endian 32 bit sayinin baytlaridir
+_NATIVE_WORD_ORDER = sys.byteorder
+_NATIVE = '<' if sys.byteorder == 'little' else '>'
+_SWAPPED = '>' if sys.byteorder == 'little' else '<'
+
+
+class BlockDecoder:
+    """Bir register blogundaki tum tipli etiketleri tek geciste cozer.
+
+    Girdi, blogun register'larini yerel bayt sirasinda tutan bir buffer'dir
+    (array('H'), memoryview.cast('H') veya paylasilan imaj bolgesi);
+    kopyalanmadan okunur. Word sirasi yerel siraya uyan alanlar tek bir
+    Struct.unpack_from ile girdiden, uymayan 32 bit alanlar register'lari
+    bayt-ters cevrilmis tek bir kopyadan ters bayt sirasiyla ikinci bir
+    unpack_from ile okunur. Sonuclar onceden ayrilmis values array('d')'sine
+    pack_into ile yazilir; etiket basina Python dongusu sadece olcekli ve
+    bit etiketleri icin calisir.
+
+    values ve names sirasi etiket sirasindan farkli olabilir (once dogrudan,
+    sonra ters cevrilen alanlar). Decoder durum tuttugu icin her thread
+    kendi decoder'ini kullanmalidir.
+    """
+
+    def __init__(self, tags, start, count, word_order=DEFAULT_WORD_ORDER):
+        if word_order not in ('big', 'little'):
+            raise ValueError(f"Gecersiz word_order: {word_order}")
+        if not 0 < count <= MAX_READ_REGISTERS:
+            raise ValueError(f"Blok 1-{MAX_READ_REGISTERS} register olmali: {count}")
+        self.start = start
+        self.count = count
+        self.word_order = word_order
+
+        direct, swapped = [], []
+        for tag in tags:
+            address = tag.address
+            if address.area == 'coil':
+                raise ValueError(f"Coil etiketi register blogunda cozulemez: {tag.name}")
+            offset = address.address - start
+            if offset < 0 or offset + address.count > count:
+                raise ValueError(f"Etiket blogun disinda: {tag.name} ({start}-{start + count - 1})")
+            if address.count == 2 and word_order != _NATIVE_WORD_ORDER:
+                swapped.append((offset, tag))
+            else:
+                direct.append((offset, tag))
+        direct.sort(key=lambda item: item[0])
+        swapped.sort(key=lambda item: item[0])
+
+        self.tags = [tag for _, tag in direct + swapped]
+        self.names = [tag.name for tag in self.tags]
+        self.values = array('d', bytes(8 * len(self.tags)))
+        self._direct = self._compile(_NATIVE, direct)
+        self._swapped = self._compile(_SWAPPED, swapped) if swapped else None
+        self._direct_out = struct.Struct(f'={len(direct)}d')
+        self._swapped_out = struct.Struct(f'={len(swapped)}d')
+        self._out = memoryview(self.values).cast('B')
+        self._scratch = array('H', bytes(2 * count))
+        self._scratch_bytes = memoryview(self._scratch).cast('B')
+        self._pack = struct.Struct(f'={count}H')
+        # Ham degerden sonra islenecekler: (indeks, scale, offset) ve (indeks, bit)
+        self._scaled = [
+            (index, tag.scale, tag.offset) for index, tag in enumerate(self.tags)
+            if tag.scale != 1.0 or tag.offset != 0.0
+        ]
+        self._bits = [
+            (index, tag.address.bit) for index, tag in enumerate(self.tags) if tag.address.area == 'register_bit'
+        ]
+
+    @staticmethod
+    def _compile(order, fields):
+        # Ofsetlere gore siralanmis alanlar; aradaki register'lar pad bayti olarak atlanir.
+        # Onceki alanla cakisan alanlar (ayni word'un bitleri gibi) ayrica kendi ofsetinden okunur
+        layout = order
+        position = 0
+        overlapping = []
+        for index, (offset, tag) in enumerate(fields):
+            if offset * 2 < position:
+                overlapping.append(index)
+                continue
+            layout += 'x' * (offset * 2 - position) + _TYPE_CODES[tag.address.data_type]
+            position = offset * 2 + tag.address.count * 2
+        return struct.Struct(layout), [
+            (index, struct.Struct(order + _TYPE_CODES[fields[index][1].address.data_type]), fields[index][0] * 2)
+            for index in overlapping
+        ]
+
+    def decode(self, registers):
+        """Yerel sirali register buffer'ini cozer, values array'ini doner."""
+        source = memoryview(registers).cast('B')
+        direct_count = self._decode_part(self._direct, source, self._direct_out, 0)
+        if self._swapped is not None:
+            self._scratch_bytes[:] = source[:self.count * 2]
+            self._scratch.byteswap()
+            self._decode_part(self._swapped, self._scratch_bytes, self._swapped_out, direct_count)
+        values = self.values
+        for index, bit in self._bits:
+            values[index] = int(values[index]) >> bit & 1
+        for index, scale, offset in self._scaled:
+            values[index] = values[index] * scale + offset
+        return values
+
+    def decode_list(self, registers):
+        """pymodbus'in register listesini (veya {adres: deger} sirasindaki degerleri) cozer."""
+        self._pack.pack_into(self._scratch, 0, *registers[:self.count])
+        return self.decode(self._scratch)
+
+    def _decode_part(self, compiled, source, out, position):
+        layout, overlapping = compiled
+        decoded = layout.unpack_from(source, 0)
+        if overlapping:
+            decoded = list(decoded)
+            for index, field, offset in overlapping:
+                decoded.insert(index, field.unpack_from(source, offset)[0])
+        out.pack_into(self._out, position * 8, *decoded)
+        return position + len(decoded)
+
+
+def compile_decoders(tags, word_order=DEFAULT_WORD_ORDER, max_gap=8):
+    """Register etiketlerini blok okumalarina boler, blok basina bir BlockDecoder doner.
+
+    Etiketler adres sirasiyla gruplanir; bir etiket iki bloga bolunmez.
+    Aradaki bosluk max_gap register'dan buyukse veya blok
+    MAX_READ_REGISTERS'i asacaksa yeni blok baslar.
+    """
+    ordered = sorted(
+        (tag for tag in tags if tag.address.area != 'coil'),
+        key=lambda tag: (tag.address.address, tag.address.count)
+    )
+    groups = []
+    for tag in ordered:
+        first = tag.address.address
+        end = first + tag.address.count
+        if groups:
+            start, block_end, members = groups[-1]
+            if first - block_end <= max_gap and max(block_end, end) - start <= MAX_READ_REGISTERS:
+                groups[-1] = (start, max(block_end, end), members + [tag])
+                continue
+        groups.append((first, end, [tag]))
+    return [BlockDecoder(members, start, end - start, word_order) for start, end, members in groups]
@@ -0,0 +1,174 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Deadband sadece analog (register) tablolarinda uygulanir
+ANALOG_TABLES = ('holding_registers', 'input_registers')
+
+
+class Subscription:
+    """Bir istemcinin izledigi tag seti ve ona gonderilecek olay kuyrugu."""
+
+    def __init__(self, machine_key, tags, max_queue=100):
+        # tags: {(table, address): (istemcinin verdigi adres, deadband)}
+        self.id = uuid.uuid4().hex
+        self.machine_key = machine_key
+        self.tags = tags
+        self.events = queue.Queue(maxsize=max_queue)
+        self.last_sent = {}
+        self.last_error = None
+        self.resync_count = 0
+        self.created = time.time()
+
+    def addresses(self):
+        result = {}
+        for table, address in self.tags:
+            result.setdefault(table, set()).add(address)
+        return result
+
+    def offer(self, table_values):
+        # Sadece degisen (ve deadband'i asan) degerleri gonder
+        changed = {}
+        for key, (label, deadband) in self.tags.items():
+            table, address = key
+            values = table_values.get(table)
+            if values is None or address not in values:
+                continue
+            value = values[address]
+            if key in self.last_sent:
+                last = self.last_sent[key]
+                if value == last:
+                    continue
+                if deadband and table in ANALOG_TABLES and abs(value - last) <= deadband:
+                    continue
+            self.last_sent[key] = value
+            changed.setdefault(table, {})[label] = value
+
+        if changed:
+            self.push('values', {'machine': self.machine_key, 'values': changed, 'timestamp': time.time()})
+
+    def report_error(self, errors):
+        message = '; '.join(sorted(set(errors))) if errors else None
+        if message == self.last_error:
+            return
+        self.last_error = message
+        self.push('status', {'machine': self.machine_key, 'ok': message is None, 'error': message,
+                             'timestamp': time.time()})
+
+    def push(self, event, payload):
+        try:
+            self.events.put_nowait((event, payload))
+        except queue.Full:
+            # Yavas istemci: kuyrugu bosalt, sonraki taramada tum degerler yeniden gonderilir
+            while True:
+                try:
+                    self.events.get_nowait()
+                except queue.Empty:
+                    break
+            self.last_sent = {}
+            self.resync_count += 1
+            self.events.put_nowait(('resync', {'machine': self.machine_key, 'timestamp': time.time()}))
+
+
+class COVHub:
+    """Abonelikleri toplayip makine basina tek merkezi tarama yapar.
+
+    Her makine icin tum abonelerin adresleri birlestirilip tek seferde
+    okunur (snapshot cache ve blok planlayici uzerinden), sonra her aboneye
+    sadece kendi tag'lerindeki degisiklikler gonderilir. Abonesi kalmayan
+    makinenin tarama thread'i kendiliginden durur.
+    """
+
+    def __init__(self, get_manager, scan_interval=0.2):
+        self.get_manager = get_manager
+        self.scan_interval = scan_interval
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+        self._scanners = {}
+        self.scan_count = 0
+
+    def subscribe(self, machine_key, tags):
+        subscription = Subscription(machine_key, tags)
+        with self._lock:
+            self._subscriptions[subscription.id] = subscription
+            if machine_key not in self._scanners:
+                scanner = threading.Thread(target=self._scan_loop, args=(machine_key,),
+                                           name=f'cov-scan-{machine_key}', daemon=True)
+                self._scanners[machine_key] = scanner
+                scanner.start()
+        logger.info(f"COV aboneligi eklendi: {subscription.id} ({machine_key}, {len(tags)} tag)")
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.pop(subscription.id, None)
+        logger.info(f"COV aboneligi kaldirildi: {subscription.id}")
+
+    def stats(self):
+        with self._lock:
+            subscriptions = list(self._subscriptions.values())
+            scanners = list(self._scanners)
+        return {
+            'scan_interval': self.scan_interval,
+            'scans': self.scan_count,
+            'active_scanners': scanners,
+            'subscriptions': [
+                {
+                    'id': subscription.id,
+                    'machine': subscription.machine_key,
+                    'tags': len(subscription.tags),
+                    'queued': subscription.events.qsize(),
+                    'resyncs': subscription.resync_count,
+                }
+                for subscription in subscriptions
+            ],
+        }
+
+    def _machine_subscriptions(self, machine_key):
+        with self._lock:
+            subscriptions = [s for s in self._subscriptions.values() if s.machine_key == machine_key]
+            if not subscriptions:
+                # Son abone gitti, thread kaydini kilit altinda sil ki yeni abone yeni thread acsin
+                self._scanners.pop(machine_key, None)
+            return subscriptions
+
+    def _scan_loop(self, machine_key):
+        manager = self.get_manager(machine_key)
+        next_scan = time.monotonic()
+        while True:
+            subscriptions = self._machine_subscriptions(machine_key)
+            if not subscriptions:
+                return
+
+            # Tum abonelerin adreslerini tablo bazinda birlestir
+            requested = {}
+            for subscription in subscriptions:
+                for table, addresses in subscription.addresses().items():
+                    requested.setdefault(table, set()).update(addresses)
+
+            table_values = {}
+            errors = []
+            for table, addresses in requested.items():
+                try:
+                    values, table_errors, _ = manager.read(table, sorted(addresses), self.scan_interval, 'background')
+                except Exception as e:
+                    values, table_errors = {}, {None: str(e)}
+                table_values[table] = values
+                errors.extend(table_errors.values())
+            self.scan_count += 1
+
+            for subscription in subscriptions:
+                subscription.offer(table_values)
+                subscription.report_error(errors)
+
+            next_scan += self.scan_interval
+            delay = next_scan - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Tarama araligi asildi, kaymayi biriktirme
+                next_scan = time.monotonic()
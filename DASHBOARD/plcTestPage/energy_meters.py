@@ -0,0 +1,332 @@
+import concurrent.futures
+import json
+import logging
+import struct
+import threading
+import time
+from collections import deque
+
+from modbus_blocks import MAX_READ_REGISTERS, read_block
+from plc_gateway import MachineRegistry, PLCGateway
+
+logger = logging.getLogger(__name__)
+
+# Makine toplamlari icin tutulan dakikalik kovalar ve raporlanan pencereler (sn)
+BUCKET_SECONDS = 60
+TOTAL_WINDOWS = {'15m': 15 * 60, '1h': 3600, '24h': 24 * 3600}
+
+METER_TABLES = {3: 'holding_registers', 4: 'input_registers'}
+
+
+class MeterLayout:
+    """Sayacin float32 register blogu.
+
+    fields: alan adi -> bloktaki register ofseti (her alan 2 register). Tum
+    alanlar tek okumada gelir ve tek struct.unpack ile cozulur; aradaki
+    kullanilmayan register'lar pad bayti olarak atlanir. word_order 'little'
+    ise (dusuk word once) her alanin iki register'i once yer degistirir.
+    """
+
+    def __init__(self, fields, start=0, function=4, word_order='big'):
+        if not fields:
+            raise ValueError("Sayac icin en az bir alan gerekli")
+        if function not in METER_TABLES:
+            raise ValueError(f"Gecersiz function code: {function} (3 veya 4)")
+        if word_order not in ('big', 'little'):
+            raise ValueError(f"Gecersiz word_order: {word_order}")
+        self.start = int(start)
+        self.function = function
+        self.table = METER_TABLES[function]
+        self.word_order = word_order
+
+        ordered = sorted((int(offset), name) for name, offset in fields.items())
+        layout = '>'
+        position = 0
+        for offset, name in ordered:
+            if offset < position:
+                raise ValueError(f"Sayac alanlari cakisiyor: {name} (register {offset})")
+            layout += 'x' * ((offset - position) * 2) + 'f'
+            position = offset + 2
+        self.count = position
+        if self.count > MAX_READ_REGISTERS:
+            raise ValueError(f"Sayac blogu tek okumaya sigmiyor: {self.count} register (en fazla {MAX_READ_REGISTERS})")
+        self.names = [name for _, name in ordered]
+        # Register sirasi: little word order'da her alanin word'leri yer degistirir
+        self._order = list(range(self.count))
+        if word_order == 'little':
+            for offset, _ in ordered:
+                self._order[offset], self._order[offset + 1] = offset + 1, offset
+        self._struct = struct.Struct(layout)
+        self._registers = struct.Struct(f'>{self.count}H')
+
+    def decode(self, registers):
+        """Blogun register listesini {alan: float} olarak cozer."""
+        if self.word_order == 'little':
+            registers = [registers[index] for index in self._order]
+        return dict(zip(self.names, self._struct.unpack(self._registers.pack(*registers[:self.count]))))
+
+
+class Meter:
+    """Tek sayacin son okumasi ve guc entegrasyonu.
+
+    Her basarili okumada guc (kW) onceki ornekle trapez kuraliyla enerjiye
+    (kWh) eklenir. Iki ornek arasi max_gap'ten uzunsa (sayac cevap vermemis)
+    o aralik entegre edilmez ve gap olarak sayilir.
+    """
+
+    def __init__(self, key, config, interval):
+        self.key = key
+        self.name = config.get('name', key)
+        self.machine = config['machine']
+        self.kind = config.get('kind', 'electric')
+        self.group = config.get('group')
+        # Ayni host:port'taki sayaclar (ornegin bir Modbus gateway arkasindakiler) tek oturumu paylasir
+        self.connection = f"{config['host']}:{int(config.get('port', 502))}"
+        self.slave_id = int(config.get('slave_id', 1))
+        self.layout = MeterLayout(
+            config['fields'],
+            start=config.get('start', 0),
+            function=int(config.get('function', 4)),
+            word_order=config.get('word_order', 'big')
+        )
+        self.power_field = config.get('power_field', 'power_kw')
+        self.power_scale = float(config.get('power_scale', 1.0))
+        if self.power_field not in self.layout.names:
+            raise ValueError(f"Sayac '{key}' icin guc alani blokta yok: {self.power_field}")
+        self.max_gap = float(config.get('max_gap', interval * 3))
+        self.values = {}
+        self.power = None
+        self.energy = 0.0
+        self.samples = 0
+        self.failures = 0
+        self.gaps = 0
+        self.last_error = None
+        self.updated_at = None
+        self._last_sample = None
+
+    def apply(self, registers, now, timestamp):
+        """Okunan blogu isler, bu ornekle eklenen enerjiyi (kWh) doner."""
+        self.values = self.layout.decode(registers)
+        power = self.values[self.power_field] * self.power_scale
+        added = 0.0
+        if self._last_sample is not None:
+            previous_time, previous_power = self._last_sample
+            elapsed = now - previous_time
+            if elapsed > self.max_gap:
+                self.gaps += 1
+            elif elapsed > 0:
+                added = (previous_power + power) / 2 * elapsed / 3600
+        self._last_sample = (now, power)
+        self.power = power
+        self.energy += added
+        self.samples += 1
+        self.last_error = None
+        self.updated_at = timestamp
+        return added
+
+    def fail(self, error):
+        self.failures += 1
+        if error != self.last_error:
+            logger.error(f"Sayac okuma hatasi ({self.key}): {error}")
+        self.last_error = error
+
+    def status(self):
+        return {
+            'name': self.name,
+            'machine': self.machine,
+            'kind': self.kind,
+            'group': self.group,
+            'connection': self.connection,
+            'slave_id': self.slave_id,
+            'values': {name: round(value, 4) for name, value in self.values.items()},
+            'power_kw': round(self.power, 4) if self.power is not None else None,
+            'energy_kwh': round(self.energy, 6),
+            'samples': self.samples,
+            'failures': self.failures,
+            'gaps': self.gaps,
+            'last_error': self.last_error,
+            'updated_at': self.updated_at,
+        }
+
+
+class MachineEnergy:
+    """Makinenin tum sayaclarindan gelen enerjinin bellekte kayan toplamlari."""
+
+    def __init__(self):
+        self.total = 0.0
+        self._buckets = deque()
+        self._lock = threading.Lock()
+
+    def add(self, timestamp, kwh):
+        bucket = int(timestamp // BUCKET_SECONDS) * BUCKET_SECONDS
+        with self._lock:
+            self.total += kwh
+            if self._buckets and self._buckets[-1][0] == bucket:
+                self._buckets[-1][1] += kwh
+            else:
+                self._buckets.append([bucket, kwh])
+            horizon = bucket - max(TOTAL_WINDOWS.values())
+            while self._buckets and self._buckets[0][0] < horizon:
+                self._buckets.popleft()
+
+    def totals(self, now=None):
+        now = now if now is not None else time.time()
+        with self._lock:
+            buckets = list(self._buckets)
+        windows = {
+            name: round(sum(kwh for bucket, kwh in buckets if bucket + BUCKET_SECONDS > now - seconds), 6)
+            for name, seconds in TOTAL_WINDOWS.items()
+        }
+        return {'total_kwh': round(self.total, 6), 'windows_kwh': windows}
+
+
+class EnergyMeters:
+    """Enerji analizorleri ve kizgin yag kalorimetreleri icin ortak okuyucu.
+
+    meters.json formati:
+    {
+        "scan_groups": {"fast": 1.0, "slow": 10.0},
+        "meters": {
+            "lemanic3_analizor": {
+                "machine": "lemanic3", "kind": "electric", "group": "fast",
+                "host": "192.168.0.120", "port": 502, "slave_id": 1,
+                "function": 4, "start": 0, "word_order": "big",
+                "fields": {"voltage_l1": 0, "current_l1": 6, "power_kw": 12, "energy_kwh": 40},
+                "power_field": "power_kw", "power_scale": 1.0
+            }
+        }
+    }
+
+    Sayaclar PLC'ler gibi kalici oturumlarda (ayri bir PLCGateway loop'unda)
+    okunur. Oturum host:port basinadir: ayni Modbus gateway'in arkasindaki
+    sayaclar tek TCP baglantisini paylasir, istek sayacin slave_id'sine
+    gider. Bir grubun tum sayaclari ayni anda istenir; ayni baglantidakiler
+    oturumun kuyrugunda sirayla gider, her sayac turda tek blok okumasina
+    mal olur. Cevap vermeyen bir slave'in zaman asimi baglantiyi yeniden
+    kurdurur; gateway'ler bu durumda genellikle exception 0x0B doner ve
+    baglanti korunur. Guc trapez kuraliyla entegre edilir, makine basina
+    toplamlar MachineEnergy'de tutulur.
+    """
+
+    def __init__(self, meters, scan_groups, **gateway_options):
+        if not meters:
+            raise ValueError("En az bir sayac tanimlanmali")
+        self.scan_groups = {name: float(interval) for name, interval in scan_groups.items()}
+        if not self.scan_groups:
+            self.scan_groups = {'default': 1.0}
+        default_group = next(iter(self.scan_groups))
+        self.meters = {}
+        for key, config in meters.items():
+            group = config.get('group', default_group)
+            if group not in self.scan_groups:
+                raise ValueError(f"Sayac '{key}' icin bilinmeyen tarama grubu: {group}")
+            config = dict(config, group=group)
+            self.meters[key] = Meter(key, config, self.scan_groups[group])
+        self.machines = {machine: MachineEnergy() for machine in {meter.machine for meter in self.meters.values()}}
+        connections = {}
+        for meter in self.meters.values():
+            host, port = meter.connection.rsplit(':', 1)
+            connections.setdefault(meter.connection, {
+                'name': meter.connection, 'host': host, 'port': int(port), 'slave_id': meter.slave_id,
+            })
+        registry = MachineRegistry(connections, next(iter(connections)))
+        self.gateway = PLCGateway(registry, **gateway_options)
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    @classmethod
+    def load(cls, path, **gateway_options):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for key, config in data.get('meters', {}).items():
+            for field in ('host', 'machine', 'fields'):
+                if field not in config:
+                    raise ValueError(f"Sayac '{key}' icin {field} gerekli")
+        return cls(data.get('meters', {}), data.get('scan_groups', {}), **gateway_options)
+
+    def start(self):
+        self.gateway.start()
+        for group, interval in self.scan_groups.items():
+            meters = [meter for meter in self.meters.values() if meter.group == group]
+            if not meters:
+                continue
+            thread = threading.Thread(target=self._run, args=(meters, interval), name=f'meters-{group}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(
+            f"Sayac okuyucu baslatildi: {len(self.meters)} sayac, {len(self.gateway.sessions)} baglanti, "
+            f"gruplar: {', '.join(self.scan_groups)}"
+        )
+
+    def stop(self):
+        self._stop_event.set()
+        self.gateway.stop()
+
+    def status(self, machine=None):
+        if machine is not None and machine not in self.machines:
+            raise ValueError(f"Makine icin sayac tanimli degil: {machine}")
+        now = time.time()
+        sessions = self.gateway.status()
+        machines = {}
+        for key, energy in self.machines.items():
+            if machine is not None and key != machine:
+                continue
+            powers = [meter.power for meter in self.meters.values() if meter.machine == key and meter.power is not None]
+            machines[key] = dict(energy.totals(now), power_kw=round(sum(powers), 4))
+        return {
+            'machines': machines,
+            'meters': {
+                key: meter.status() for key, meter in self.meters.items()
+                if machine is None or meter.machine == machine
+            },
+            'connections': {
+                key: sessions[meter.connection]['state'] for key, meter in self.meters.items()
+                if machine is None or meter.machine == machine
+            },
+        }
+
+    def _scan(self, meters):
+        # Tum sayac istekleri ayni anda gider; ayni baglantidakiler oturumda sirayla bekler
+        futures = {}
+        queued = {}
+        for meter in meters:
+            operation = read_block(meter.layout.table, meter.layout.start, meter.layout.count, slave=meter.slave_id)
+            futures[meter.key] = self.gateway.submit(
+                self.gateway.session(meter.connection).execute(operation, 'background')
+            )
+            queued[meter.connection] = queued.get(meter.connection, 0) + 1
+
+        deadline = time.monotonic() + self.gateway.request_timeout * max(queued.values())
+        for meter in meters:
+            try:
+                success, result = futures[meter.key].result(max(0.0, deadline - time.monotonic()))
+            except concurrent.futures.TimeoutError:
+                futures[meter.key].cancel()
+                success, result = False, "Sayac istegi zaman asimina ugradi"
+            if not success:
+                meter.fail(str(result))
+                continue
+            now = time.monotonic()
+            timestamp = time.time()
+            try:
+                added = meter.apply(result.registers, now, timestamp)
+            except (struct.error, ValueError) as e:
+                meter.fail(f"Sayac blogu cozulemedi: {e}")
+                continue
+            if added:
+                self.machines[meter.machine].add(timestamp, added)
+
+    def _run(self, meters, interval):
+        next_scan = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                self._scan(meters)
+            except Exception as e:
+                logger.error(f"Sayac tarama hatasi: {e}")
+
+            next_scan += interval
+            delay = next_scan - time.monotonic()
+            if delay > 0:
+                self._stop_event.wait(delay)
+            else:
+                next_scan = time.monotonic()
@@ -0,0 +1,285 @@
+import logging
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+
+logger = logging.getLogger(__name__)
+
+# Chunk basligi: ornek sayisi, ilk ornegin unix zamani; ardindan zlib ile
+# sikistirilmis int32 ardisik zaman farklari (ms) ve float64 degerler (little-endian)
+CHUNK_HEADER = struct.Struct('<Id')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS historian_tags (
+    tag_id INTEGER PRIMARY KEY,
+    machine TEXT NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (machine, name)
+);
+CREATE TABLE IF NOT EXISTS historian_chunks (
+    tag_id INTEGER NOT NULL,
+    start_ts REAL NOT NULL,
+    end_ts REAL NOT NULL,
+    count INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (tag_id, start_ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_historian_chunks_end ON historian_chunks (tag_id, end_ts);
+"""
+
+
+def encode_chunk(times, values):
+    # Sabit aralikli orneklerde zaman farklari ayni sayidir, zlib neredeyse tamamen yok eder
+    base = times[0]
+    deltas = array('i')
+    previous = 0
+    for timestamp in times:
+        offset = round((timestamp - base) * 1000)
+        deltas.append(offset - previous)
+        previous = offset
+    values = array('d', values)
+    if sys.byteorder != 'little':
+        deltas.byteswap()
+        values.byteswap()
+    return CHUNK_HEADER.pack(len(deltas), base) + zlib.compress(deltas.tobytes() + values.tobytes())
+
+
+def decode_chunk(data):
+    count, base = CHUNK_HEADER.unpack_from(data, 0)
+    raw = zlib.decompress(data[CHUNK_HEADER.size:])
+    deltas = array('i', raw[:4 * count])
+    values = array('d', raw[4 * count:])
+    if sys.byteorder != 'little':
+        deltas.byteswap()
+        values.byteswap()
+    times = array('d')
+    offset = 0
+    for delta in deltas:
+        offset += delta
+        times.append(base + offset / 1000)
+    return times, values
+
+
+class TagHistorian:
+    """Orneklenen etiket degerlerini SQLite'a toplu yazan kalici gecmis (write-behind).
+
+    append() ornegi etiket basina bellekteki array'lere ekler ve hemen doner.
+    Yazici thread tampon flush_rows ornege ulasinca veya flush_interval
+    dolunca tum etiketleri tek transaction'da yazar: her etiket icin bir
+    satir (tag_id, start_ts, end_ts, count, data) ve data'da ms cozunurlukte
+    zamanlar ile degerler zlib ile sikistirilir. Satir basina insert yerine
+    flush basina etiket sayisi kadar satir yazildigi icin tarama hizinda
+    yillarca gecmis tutulabilir. SQLite burada SQL Server icin yerel
+    yedektir; sema ayni kalir.
+
+    Geri basinc: yazilmayi bekleyen ornek sayisi max_pending'i gecerse
+    (disk yetismiyor) sadece degisen degerler kaydedilir; bekleyen sayi
+    yarisina inince tam hiza donulur. Bekleyen 2 * max_pending'e ulasirsa
+    yeni ornekler atilir. Yazilamayan chunk'lar kaybolmaz, tampona geri
+    konup flush_interval sonra tekrar denenir.
+    """
+
+    def __init__(self, path, flush_rows=5000, flush_interval=5.0, max_pending=100000):
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(_SCHEMA)
+        self._db_lock = threading.Lock()
+        self._tag_ids = {
+            (machine, name): tag_id
+            for tag_id, machine, name in self._db.execute('SELECT tag_id, machine, name FROM historian_tags')
+        }
+        self._buffers = {}
+        self._last_values = {}
+        self._pending = 0
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self.change_only = False
+        self.appended = 0
+        self.suppressed = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.chunks = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.failed = 0
+        self.last_flush_ms = None
+        self.last_error = None
+        self._thread = threading.Thread(target=self._run, name='historian', daemon=True)
+        self._thread.start()
+
+    def append(self, machine, samples, timestamp=None):
+        """[(etiket adi, deger)] orneklerini ayni zaman damgasiyla tampona ekler."""
+        timestamp = timestamp if timestamp is not None else time.time()
+        with self._condition:
+            backlog = self._pending + self._in_flight
+            if backlog >= 2 * self.max_pending:
+                self.dropped += len(samples)
+                return
+            if not self.change_only and backlog >= self.max_pending:
+                self.change_only = True
+                logger.warning(f"Historian geride kaldi ({backlog} ornek bekliyor), sadece degisimler kaydediliyor")
+            for name, value in samples:
+                key = (machine, name)
+                if self.change_only and self._last_values.get(key) == value:
+                    self.suppressed += 1
+                    continue
+                self._last_values[key] = value
+                buffer = self._buffers.get(key)
+                if buffer is None:
+                    buffer = self._buffers[key] = (array('d'), array('d'))
+                buffer[0].append(timestamp)
+                buffer[1].append(value)
+                self._pending += 1
+                self.appended += 1
+            if self._pending >= self.flush_rows:
+                self._condition.notify()
+
+    def flush(self, timeout=5.0):
+        # Tampondaki ornekler diske inene kadar bekle (kapanis ve testler icin)
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            self._condition.notify()
+            while (self._pending or self._in_flight) and time.monotonic() < deadline:
+                self._condition.wait(0.01)
+
+    def close(self):
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout=5)
+
+    def query(self, machine, name, since=None, until=None):
+        """[since, until] araligindaki ornekleri (times, values) array'leri olarak doner.
+
+        Henuz yazilmamis ornekler de dahildir.
+        """
+        times, values = array('d'), array('d')
+        tag_id = self._tag_ids.get((machine, name))
+        if tag_id is not None:
+            sql = 'SELECT data FROM historian_chunks WHERE tag_id = ?'
+            params = [tag_id]
+            if since is not None:
+                sql += ' AND end_ts >= ?'
+                params.append(since)
+            if until is not None:
+                sql += ' AND start_ts <= ?'
+                params.append(until)
+            with self._db_lock:
+                chunks = [row[0] for row in self._db.execute(sql + ' ORDER BY start_ts', params)]
+            for data in chunks:
+                chunk_times, chunk_values = decode_chunk(data)
+                times.extend(chunk_times)
+                values.extend(chunk_values)
+        with self._condition:
+            buffer = self._buffers.get((machine, name))
+            if buffer is not None:
+                times.extend(buffer[0])
+                values.extend(buffer[1])
+        if since is None and until is None:
+            return times, values
+        keep = [
+            index for index, timestamp in enumerate(times)
+            if (since is None or timestamp >= since) and (until is None or timestamp <= until)
+        ]
+        return array('d', (times[index] for index in keep)), array('d', (values[index] for index in keep))
+
+    def tags(self):
+        with self._condition:
+            known = set(self._tag_ids) | set(self._buffers)
+        return sorted(known)
+
+    def stats(self):
+        with self._condition:
+            pending = self._pending + self._in_flight
+        return {
+            'path': self.path,
+            'mode': 'change_only' if self.change_only else 'full',
+            'pending': pending,
+            'max_pending': self.max_pending,
+            'appended': self.appended,
+            'flushed': self.flushed,
+            'suppressed': self.suppressed,
+            'dropped': self.dropped,
+            'flushes': self.flushes,
+            'chunks': self.chunks,
+            'compression_ratio': round(self.raw_bytes / self.stored_bytes, 2) if self.stored_bytes else None,
+            'last_flush_ms': self.last_flush_ms,
+            'failed': self.failed,
+            'last_error': self.last_error,
+        }
+
+    def _write(self, buffers):
+        started = time.perf_counter()
+        rows = []
+        raw_bytes = 0
+        with self._db_lock, self._db:
+            for key, (times, values) in buffers.items():
+                tag_id = self._tag_ids.get(key)
+                if tag_id is None:
+                    tag_id = self._db.execute(
+                        'INSERT INTO historian_tags (machine, name) VALUES (?, ?)', key
+                    ).lastrowid
+                    self._tag_ids[key] = tag_id
+                rows.append((tag_id, times[0], times[-1], len(times), encode_chunk(times, values)))
+                raw_bytes += len(times) * 16
+            # Ayni etiketin ayni baslangic zamanli chunk'i (saat geri alinmasi) ustune yazilir
+            self._db.executemany(
+                'INSERT OR REPLACE INTO historian_chunks (tag_id, start_ts, end_ts, count, data) VALUES (?, ?, ?, ?, ?)',
+                rows
+            )
+        self.chunks += len(rows)
+        self.raw_bytes += raw_bytes
+        self.stored_bytes += sum(len(row[4]) for row in rows)
+        self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if self._pending < self.flush_rows and not self._closed:
+                    self._condition.wait(self.flush_interval)
+                if self._closed and not self._pending:
+                    return
+                buffers, self._buffers = self._buffers, {}
+                count, self._pending = self._pending, 0
+                self._in_flight = count
+            failed = False
+            if buffers:
+                try:
+                    self._write(buffers)
+                    self.flushed += count
+                    self.flushes += 1
+                    self.last_error = None
+                except sqlite3.Error as e:
+                    failed = True
+                    self.failed += 1
+                    if str(e) != self.last_error:
+                        logger.error(f"Historian yazilamadi, {count} ornek tekrar denenecek: {e}")
+                    self.last_error = str(e)
+            with self._condition:
+                self._in_flight = 0
+                if failed:
+                    # Yazilamayan ornekler tamponun basina geri konur; sinir asilirsa geri basinc devreye girer
+                    for key, (times, values) in buffers.items():
+                        newer = self._buffers.get(key)
+                        if newer is not None:
+                            times.extend(newer[0])
+                            values.extend(newer[1])
+                        self._buffers[key] = (times, values)
+                    self._pending += count
+                    self._condition.wait(self.flush_interval)
+                if self.change_only and self._pending < self.max_pending // 2:
+                    self.change_only = False
+                    logger.info("Historian yetisti, tam hizda kayda donuldu")
+                self._condition.notify_all()
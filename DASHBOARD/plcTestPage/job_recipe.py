@@ -0,0 +1,119 @@
+from modbus_blocks import MAX_WRITE_REGISTERS
+from plc_address import DATA_TYPES, encode_value, parse_plc_address
+
+# Is pasaportundaki unite sayisi (VIZ_RENK_1-12, INCELTICI1-12)
+RECIPE_UNITS = 12
+
+# DR blade acilari: job_passport_api.get_dr_blade_angles() sonucu
+DR_BLADE_FIELDS = ('F', 'V', 'H')
+
+
+class RecipeLayout:
+    """Is pasaportu recetesinin PLC'deki ardisik register blogu.
+
+    machines.json 'recipe' blogu:
+        start       blogun ilk holding register'i (zorunlu)
+        value_type  viskozite / solvent oranlarinin tipi, varsayilan REAL
+
+    Blok duzeni (start'tan itibaren):
+        DR blade F, V, H            3 x WORD
+        vizkozite unite 1-12        12 x value_type
+        solvent orani unite 1-12    12 x value_type
+
+    Blok ardisik oldugu icin yazma kuyrugu tum receteyi tek write_registers
+    istegiyle (123 register'i gecerse iki istekle) gonderir.
+    """
+
+    def __init__(self, start, value_type='REAL'):
+        value_type = str(value_type).upper()
+        if value_type not in DATA_TYPES:
+            raise ValueError(f"Gecersiz recete tipi: {value_type}")
+        self.start = int(start)
+        self.value_type = value_type
+        self.fields = []
+        address = self.start
+        for name in DR_BLADE_FIELDS:
+            self.fields.append((f'dr_blade.{name}', parse_plc_address(f'HR{address}:WORD')))
+            address += 1
+        for group in ('vizkozite', 'solvent_orani'):
+            for unit in range(1, RECIPE_UNITS + 1):
+                plc_address = parse_plc_address(f'HR{address}:{value_type}')
+                self.fields.append((f'{group}.{unit}', plc_address))
+                address += plc_address.count
+        self.count = address - self.start
+        if address - 1 > 0xFFFF:
+            raise ValueError(f"Recete blogu Modbus araliginin disinda: HR{self.start}-HR{address - 1}")
+
+    @classmethod
+    def from_config(cls, config):
+        if config.get('start') is None:
+            raise ValueError("recipe blogu icin start gerekli")
+        return cls(config['start'], config.get('value_type', 'REAL'))
+
+    @property
+    def transactions(self):
+        # Ardisik blogun gerektirdigi write_registers istegi sayisi
+        return -(-self.count // MAX_WRITE_REGISTERS)
+
+    def build(self, job):
+        """Is pasaportu verisini [(alan, PlcAddress, deger)] listesine cevirir.
+
+        job: /api/job-data cevabindaki 'data' (dr_blade_angles, vizkozite,
+        solvent_orani). Bos birakilan uniteler 0 yazilir; hatali alanlarin
+        hepsi tek ValueError'da raporlanir.
+        """
+        if not isinstance(job, dict):
+            raise ValueError("Is pasaportu verisi gerekli")
+        angles = job.get('dr_blade_angles') or {}
+        values = {f'dr_blade.{name}': angles.get(name) for name in DR_BLADE_FIELDS}
+        for group in ('vizkozite', 'solvent_orani'):
+            items = job.get(group) or []
+            if not isinstance(items, list) or len(items) > RECIPE_UNITS:
+                raise ValueError(f"{group} en fazla {RECIPE_UNITS} elemanli liste olmali")
+            for unit in range(1, RECIPE_UNITS + 1):
+                values[f'{group}.{unit}'] = items[unit - 1] if unit <= len(items) else None
+
+        writes = []
+        errors = []
+        for name, plc_address in self.fields:
+            try:
+                value = parse_setpoint(values[name])
+                if plc_address.data_type != 'REAL' and value.is_integer():
+                    value = int(value)
+                # Aralik ve tam sayi kontrolu; yazmadan once tum recete dogrulanir
+                encode_value(plc_address.data_type, value)
+                writes.append((name, plc_address, value))
+            except (TypeError, ValueError, OverflowError) as e:
+                errors.append(f"{name}: {e}")
+        if errors:
+            raise ValueError('; '.join(errors))
+        return writes
+
+    def describe(self):
+        return {
+            'start': self.start,
+            'count': self.count,
+            'value_type': self.value_type,
+            'transactions': self.transactions,
+            'fields': [
+                {'field': name, 'register': plc_address.address, 'type': plc_address.data_type}
+                for name, plc_address in self.fields
+            ],
+        }
+
+
+def parse_setpoint(value):
+    # Veritabanindan gelen metinler: '18', '18,5', '%20', '' veya None
+    if value is None:
+        return 0.0
+    if isinstance(value, bool):
+        raise ValueError(f"sayi degil: {value}")
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().replace('%', '').replace(',', '.')
+    if not text:
+        return 0.0
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError(f"sayi degil: {value}")
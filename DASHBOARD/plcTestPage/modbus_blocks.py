@@ -0,0 +1,74 @@
+# Modbus tek istekte izin verilen maksimum adetler (Modbus spesifikasyonu)
+MAX_WRITE_COILS = 1968
+MAX_READ_COILS = 2000
+MAX_WRITE_REGISTERS = 123
+MAX_READ_REGISTERS = 125
+
+
+def group_coil_writes(writes, max_count=MAX_WRITE_COILS):
+    """(coil, value) listesini ardisik coil bloklarina boler.
+
+    Ayni coil birden fazla geliyorsa son deger gecerlidir. Sonuc
+    [(start, [values])] seklinde, adrese gore sirali doner.
+    """
+    return _group_writes(((coil, bool(value)) for coil, value in writes), max_count)
+
+
+def group_register_writes(writes, max_count=MAX_WRITE_REGISTERS):
+    """(register, value) listesini ardisik register bloklarina boler."""
+    return _group_writes(((register, int(value) & 0xFFFF) for register, value in writes), max_count)
+
+
+def _group_writes(writes, max_count):
+    latest = {}
+    for address, value in writes:
+        latest[address] = value
+
+    blocks = []
+    start = None
+    values = []
+    for address in sorted(latest):
+        if start is not None and address == start + len(values) and len(values) < max_count:
+            values.append(latest[address])
+            continue
+        if start is not None:
+            blocks.append((start, values))
+        start = address
+        values = [latest[address]]
+    if start is not None:
+        blocks.append((start, values))
+    return blocks
+
+
+def plan_reads(addresses, max_count, max_gap=0):
+    """Adresleri en az sayida ardisik okuma bloguna birlestirir.
+
+    Aradaki bosluk max_gap adresi gecmiyorsa iki adres ayni bloga alinir;
+    birkac fazla adres okumak ayri bir Modbus istegi gondermekten ucuzdur.
+    Sonuc [(start, count)] seklinde doner.
+    """
+    blocks = []
+    start = None
+    end = None
+    for address in sorted(set(addresses)):
+        if start is not None and address - end - 1 <= max_gap and address - start < max_count:
+            end = address
+            continue
+        if start is not None:
+            blocks.append((start, end - start + 1))
+        start = end = address
+    if start is not None:
+        blocks.append((start, end - start + 1))
+    return blocks
+
+
+def read_block(table, start, count, slave=None):
+    """Tek blok okumasi icin oturuma verilecek operation(client, slave) fonksiyonunu doner.
+
+    slave verilirse oturumun slave_id'si yerine o cihaza gider (ayni
+    gateway arkasindaki cihazlar tek baglantiyi paylasir).
+    """
+    reader = 'read_' + table
+    if slave is not None:
+        return lambda client, _: getattr(client, reader)(start, count, slave=slave)
+    return lambda client, session_slave: getattr(client, reader)(start, count, slave=session_slave)
@@ -0,0 +1,197 @@
+import logging
+import os
+import struct
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Dosya basligi: magic + versiyon, kayit basladigi unix zamani
+CAPTURE_MAGIC = b'PLCCAP01'
+FILE_HEADER = struct.Struct('<8sd')
+# Kayit basligi: baslangictan beri mikrosaniye, olay tipi, akis no, veri uzunlugu
+RECORD_HEADER = struct.Struct('<QBBH')
+
+# Olay tipleri; istek/cevap verisi MBAP basligi dahil ham Modbus TCP cercevesidir
+EVENT_REQUEST = 0
+EVENT_RESPONSE = 1
+EVENT_CONNECT = 2       # veri: makine adi (utf-8)
+EVENT_DISCONNECT = 3
+
+# MBAP basligindaki uzunluk alani (unit id + PDU) 4. bayttan baslar
+_MBAP_LENGTH = struct.Struct('>H')
+
+# attach'in sardigi istemci noktalari
+_HOOKS = ('transport_send', 'callback_data', 'callback_disconnected')
+
+
+class ModbusCapture:
+    """PLC oturumlarinin Modbus TCP trafigini ikili dosyaya kaydeder.
+
+    Her istek ve cevap cercevesi zaman damgasiyla oldugu gibi yazilir (12
+    bayt kayit basligi + cerceve). Kayitlar bellekte biriktirilir ve ayri
+    bir thread flush_interval araliklarla dosyaya ekler; event loop diske
+    hic beklemez. Dosya max_bytes'a ulasinca kayit kendiliginden durur.
+    plc_replay.py ayni dosyayi sahte PLC olarak geri oynatir.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, flush_interval=0.2):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'wb')
+        self._file.write(FILE_HEADER.pack(CAPTURE_MAGIC, time.time()))
+        self._origin = time.perf_counter_ns()
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+        self._streams = {}
+        self.active = True
+        self.size = FILE_HEADER.size
+        self.frames = 0
+        self.dropped = 0
+        self.started_at = time.time()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='modbus-capture', daemon=True)
+        self._thread.start()
+        logger.info(f"Modbus trafik kaydi basladi: {path}")
+
+    def attach(self, client, name):
+        """pymodbus istemcisinin gonderme/alma noktalarini sarar.
+
+        pymodbus 3.5 istemcisi her istegi tek transport_send cagrisiyla
+        gonderir, gelen baytlari callback_data ile iletir; ikisi de ornek
+        niteligi uzerinden cagrildigi icin sarmalayici araya girebilir.
+        Orijinaller istemcide _capture_original'da saklanir; yeni kayit her
+        zaman onlari sarar, onceki kaydin sarmalayicisi zincirde kalmaz.
+        """
+        stream = self._streams.setdefault(name, len(self._streams))
+        if stream > 0xFF:
+            raise ValueError("En fazla 256 akis kaydedilebilir")
+        self.record(EVENT_CONNECT, stream, name.encode('utf-8'))
+
+        original = getattr(client, '_capture_original', None)
+        if original is None:
+            original = client._capture_original = {hook: getattr(client, hook) for hook in _HOOKS}
+        send = original['transport_send']
+        receive = original['callback_data']
+        disconnected = original['callback_disconnected']
+        pending = bytearray()
+
+        def transport_send(data, addr=None):
+            if self.active:
+                self.record(EVENT_REQUEST, stream, data)
+            return send(data, addr)
+
+        def callback_data(data, addr=None):
+            if self.active:
+                # TCP akisi cercevelere MBAP uzunluk alanina gore bolunur
+                pending.extend(data)
+                while len(pending) >= 6:
+                    size = 6 + _MBAP_LENGTH.unpack_from(pending, 4)[0]
+                    if len(pending) < size:
+                        break
+                    self.record(EVENT_RESPONSE, stream, bytes(pending[:size]))
+                    del pending[:size]
+            return receive(data, addr)
+
+        def callback_disconnected(reason):
+            if self.active:
+                self.record(EVENT_DISCONNECT, stream, b'')
+            return disconnected(reason)
+
+        client.transport_send = transport_send
+        client.callback_data = callback_data
+        client.callback_disconnected = callback_disconnected
+
+    @staticmethod
+    def detach(client):
+        """attach'in sardigi noktalari istemcinin orijinallerine geri dondurur."""
+        original = getattr(client, '_capture_original', None)
+        if original is None:
+            return
+        for hook, method in original.items():
+            setattr(client, hook, method)
+        del client._capture_original
+
+    def record(self, event, stream, data):
+        timestamp = (time.perf_counter_ns() - self._origin) // 1000
+        with self._lock:
+            if not self.active:
+                return
+            if self.size + RECORD_HEADER.size + len(data) > self.max_bytes:
+                self.dropped += 1
+                self.active = False
+                logger.warning(f"Modbus trafik kaydi boyut sinirina ulasti, durduruldu: {self.path}")
+                return
+            self._buffer += RECORD_HEADER.pack(timestamp, event, stream, len(data))
+            self._buffer += data
+            self.size += RECORD_HEADER.size + len(data)
+            if event in (EVENT_REQUEST, EVENT_RESPONSE):
+                self.frames += 1
+
+    def close(self):
+        with self._lock:
+            self.active = False
+        self._stop_event.set()
+        self._thread.join(timeout=5)
+        self._flush()
+        self._file.close()
+        logger.info(f"Modbus trafik kaydi kapandi: {self.path} ({self.frames} cerceve, {self.size} bayt)")
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'active': self.active,
+            'started_at': self.started_at,
+            'frames': self.frames,
+            'bytes': self.size,
+            'max_bytes': self.max_bytes,
+            'streams': list(self._streams),
+        }
+
+    def _flush(self):
+        with self._lock:
+            data, self._buffer = self._buffer, bytearray()
+        if data:
+            self._file.write(data)
+            self._file.flush()
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self._flush()
+            except OSError as e:
+                logger.error(f"Modbus trafik kaydi yazilamadi: {e}")
+                with self._lock:
+                    self.active = False
+
+
+def read_capture(path):
+    """Kayit dosyasini okur: (baslangic unix zamani, {akis: ad}, [(mikrosaniye, olay, akis, veri)])."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < FILE_HEADER.size:
+        raise ValueError(f"Gecersiz kayit dosyasi: {path}")
+    magic, started_at = FILE_HEADER.unpack_from(data, 0)
+    if magic != CAPTURE_MAGIC:
+        raise ValueError(f"Modbus kayit dosyasi degil: {path}")
+
+    streams = {}
+    records = []
+    offset = FILE_HEADER.size
+    view = memoryview(data)
+    while offset + RECORD_HEADER.size <= len(data):
+        timestamp, event, stream, length = RECORD_HEADER.unpack_from(data, offset)
+        offset += RECORD_HEADER.size
+        if offset + length > len(data):
+            # Son kayit yarim kalmis (surec kayit sirasinda kapanmis)
+            break
+        payload = bytes(view[offset:offset + length])
+        offset += length
+        if event == EVENT_CONNECT:
+            streams[stream] = payload.decode('utf-8')
+        records.append((timestamp, event, stream, payload))
+    return started_at, streams, records
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+from modbus_blocks import MAX_READ_COILS, MAX_READ_REGISTERS, MAX_WRITE_COILS, MAX_WRITE_REGISTERS
+from modbus_server import ModbusTcpServer, exception_pdu
+
+logger = logging.getLogger(__name__)
+
+# Modbus exception kodlari
+ILLEGAL_FUNCTION = 0x01
+ILLEGAL_DATA_ADDRESS = 0x02
+ILLEGAL_DATA_VALUE = 0x03
+GATEWAY_TARGET_FAILED = 0x0B
+
+# Okuma function code'u -> (snapshot tablosu, istek basina maksimum adet)
+READ_FUNCTIONS = {
+    1: ('coils', MAX_READ_COILS),
+    2: ('discrete_inputs', MAX_READ_COILS),
+    3: ('holding_registers', MAX_READ_REGISTERS),
+    4: ('input_registers', MAX_READ_REGISTERS),
+}
+
+_START_COUNT = struct.Struct('>HH')
+_MASK = struct.Struct('>HHH')
+
+
+class ModbusProxy:
+    """Asagi yondeki Modbus TCP istemcilerini makinenin tek PLC oturumuna coklar.
+
+    C# toplayicilari, HMI ve scriptler PLC yerine bu porta baglanir; PLC'deki
+    baglanti sayisi ve tarama yuku istemci sayisindan bagimsiz kalir. Okumalar
+    PLCManager'in snapshot cache'inden max_age tazeligiyle cevaplanir, eskimis
+    adresler diger okuyucularla ortak tek taramada yenilenir. Yazmalar gelis
+    sirasiyla tek tek makinenin yazma kuyruguna verilir; denetim kaydina
+    'modbus-proxy:<port>' kaynagiyla girer. Gelen unit id yok sayilir, istek
+    makinenin kendi slave id'siyle gider.
+
+    PLCManager cagrilari bloklayici oldugu icin handler onlari thread
+    havuzunda calistirir; sunucu gateway loop'unda dinleyebilir.
+    """
+
+    def __init__(self, manager, host='0.0.0.0', port=5020, max_age=None, workers=8):
+        self.manager = manager
+        self.max_age = max_age
+        self.source = f'modbus-proxy:{port}'
+        self.server = ModbusTcpServer(self.handle, host, port, serial=True)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='modbus-proxy')
+        self._write_lock = None
+        self.reads = 0
+        self.writes = 0
+        self.rejected = 0
+        self.failures = 0
+
+    def start(self, loop):
+        """Sunucuyu verilen (calisan) event loop'ta acar."""
+        asyncio.run_coroutine_threadsafe(self.server.start(), loop).result()
+
+    def stop(self, loop):
+        asyncio.run_coroutine_threadsafe(self.server.stop(), loop).result()
+        self._executor.shutdown(wait=False)
+
+    def stats(self):
+        return {
+            'address': f"{self.server.host}:{self.server.port}",
+            'clients': self.server.active_connections,
+            'connections': self.server.connection_count,
+            'requests': self.server.request_count,
+            'reads': self.reads,
+            'writes': self.writes,
+            'rejected': self.rejected,
+            'failures': self.failures,
+        }
+
+    async def handle(self, unit_id, pdu):
+        function_code = pdu[0]
+        try:
+            if function_code in READ_FUNCTIONS:
+                return await self._read(pdu)
+            if function_code in (5, 6, 15, 16, 22):
+                if self._write_lock is None:
+                    self._write_lock = asyncio.Lock()
+                # asyncio.Lock FIFO'dur: yazmalar istemciler arasinda da gelis sirasiyla gider
+                async with self._write_lock:
+                    return await self._write(pdu)
+        except (struct.error, IndexError):
+            self.rejected += 1
+            return exception_pdu(function_code, ILLEGAL_DATA_VALUE)
+        self.rejected += 1
+        return exception_pdu(function_code, ILLEGAL_FUNCTION)
+
+    async def _read(self, pdu):
+        function_code = pdu[0]
+        table, max_count = READ_FUNCTIONS[function_code]
+        start, count = _START_COUNT.unpack_from(pdu, 1)
+        if not 1 <= count <= max_count:
+            self.rejected += 1
+            return exception_pdu(function_code, ILLEGAL_DATA_VALUE)
+        if start + count > 0x10000:
+            self.rejected += 1
+            return exception_pdu(function_code, ILLEGAL_DATA_ADDRESS)
+
+        self.reads += 1
+        addresses = list(range(start, start + count))
+        values, errors, _ = await self._call(self.manager.read, table, addresses, self.max_age, 'interactive')
+        if errors or len(values) < count:
+            self.failures += 1
+            return exception_pdu(function_code, GATEWAY_TARGET_FAILED)
+
+        if function_code in (1, 2):
+            data = bytearray((count + 7) // 8)
+            for offset, address in enumerate(addresses):
+                if values[address]:
+                    data[offset // 8] |= 1 << (offset % 8)
+        else:
+            data = struct.pack(f'>{count}H', *(values[address] for address in addresses))
+        return bytes((function_code, len(data))) + bytes(data)
+
+    async def _write(self, pdu):
+        function_code = pdu[0]
+        if function_code == 5:
+            address, value = _START_COUNT.unpack_from(pdu, 1)
+            if value not in (0x0000, 0xFF00):
+                self.rejected += 1
+                return exception_pdu(function_code, ILLEGAL_DATA_VALUE)
+            results = await self._call(self.manager.write_coils, [(address, value == 0xFF00)], self.source)
+            response = bytes(pdu[:5])
+        elif function_code == 6:
+            address, value = _START_COUNT.unpack_from(pdu, 1)
+            results = await self._call(self.manager.write_registers, [(address, value)], self.source)
+            response = bytes(pdu[:5])
+        elif function_code == 15:
+            start, count = _START_COUNT.unpack_from(pdu, 1)
+            if not 1 <= count <= MAX_WRITE_COILS or pdu[5] != (count + 7) // 8 or start + count > 0x10000:
+                self.rejected += 1
+                return exception_pdu(function_code, ILLEGAL_DATA_VALUE)
+            writes = [(start + offset, bool(pdu[6 + offset // 8] >> (offset % 8) & 1)) for offset in range(count)]
+            results = await self._call(self.manager.write_coils, writes, self.source)
+            response = bytes(pdu[:5])
+        elif function_code == 16:
+            start, count = _START_COUNT.unpack_from(pdu, 1)
+            if not 1 <= count <= MAX_WRITE_REGISTERS or pdu[5] != count * 2 or start + count > 0x10000:
+                self.rejected += 1
+                return exception_pdu(function_code, ILLEGAL_DATA_VALUE)
+            values = struct.unpack_from(f'>{count}H', pdu, 6)
+            writes = [(start + offset, value) for offset, value in enumerate(values)]
+            results = await self._call(self.manager.write_registers, writes, self.source)
+            response = bytes(pdu[:5])
+        else:
+            # FC22: AND maskesinde 0 olan bitler OR maskesindeki degere zorlanir,
+            # digerleri korunur; bu tam olarak bit yazmalarinin tek maskesidir
+            register, and_mask, or_mask = _MASK.unpack_from(pdu, 1)
+            bits = [(register, bit, bool(or_mask >> bit & 1)) for bit in range(16) if not and_mask >> bit & 1]
+            response = bytes(pdu[:7])
+            if not bits:
+                return response
+            results = await self._call(self.manager.write_register_bits, bits, self.source)
+
+        self.writes += 1
+        outcome, _ = results
+        failed = [message for success, message, _ in outcome.values() if not success]
+        if failed:
+            self.failures += 1
+            logger.error(f"Proxy yazmasi PLC'ye iletilemedi: {failed[0]}")
+            return exception_pdu(function_code, GATEWAY_TARGET_FAILED)
+        return response
+
+    async def _call(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import struct
+
+logger = logging.getLogger(__name__)
+
+# MBAP basligi: transaction id, protocol id, uzunluk, unit id
+MBAP_HEADER = struct.Struct('>HHHB')
+
+
+def exception_pdu(function_code, exception_code):
+    return bytes((function_code | 0x80, exception_code))
+
+
+class ModbusTcpServer:
+    """Kucuk asyncio Modbus TCP (MBAP) sunucusu.
+
+    Gelen her istegin PDU'su handler(unit_id, pdu) coroutine'ine verilir;
+    handler cevap PDU'sunu (bytes) ya da cevap verilmeyecekse None doner.
+    Ayni baglantidaki istekler varsayilan olarak paralel islenir ve cevaplar
+    hazir oldukca transaction id ile gonderilir (pipelining); serial=True
+    verilirse her baglanti istekleri sirayla isler.
+    """
+
+    def __init__(self, handler, host='127.0.0.1', port=502, serial=False):
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.serial = serial
+        self.connection_count = 0
+        self.active_connections = 0
+        self.request_count = 0
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        logger.info(f"Modbus TCP sunucusu dinliyor: {self.host}:{self.port}")
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_connection(self, reader, writer):
+        self.connection_count += 1
+        self.active_connections += 1
+        peer = writer.get_extra_info('peername')
+        logger.info(f"Modbus istemcisi baglandi: {peer}")
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                header = await reader.readexactly(MBAP_HEADER.size)
+                transaction_id, protocol_id, length, unit_id = MBAP_HEADER.unpack(header)
+                if protocol_id != 0 or length < 2:
+                    logger.error(f"Gecersiz MBAP basligi: {peer}")
+                    break
+                pdu = await reader.readexactly(length - 1)
+                self.request_count += 1
+                if self.serial:
+                    await self._respond(writer, write_lock, transaction_id, unit_id, pdu)
+                else:
+                    task = asyncio.create_task(self._respond(writer, write_lock, transaction_id, unit_id, pdu))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            raise
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+            self.active_connections -= 1
+            logger.info(f"Modbus istemcisi ayrildi: {peer}")
+
+    async def _respond(self, writer, write_lock, transaction_id, unit_id, pdu):
+        try:
+            response = await self.handler(unit_id, pdu)
+        except Exception as e:
+            logger.error(f"Modbus istek isleme hatasi: {e}")
+            # Slave device failure
+            response = exception_pdu(pdu[0], 0x04)
+        if response is None:
+            return
+        async with write_lock:
+            if writer.is_closing():
+                return
+            writer.write(MBAP_HEADER.pack(transaction_id, 0, len(response) + 1, unit_id) + response)
+            await writer.drain()
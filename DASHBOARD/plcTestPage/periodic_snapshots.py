@@ -0,0 +1,286 @@
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from tag_database import to_engineering
+
+logger = logging.getLogger(__name__)
+
+# plan/roadmap.md: gunluk 00:00, haftalik Pazartesi, aylik ayin 1'i, ceyreklik Ocak/Nisan/Temmuz/Ekim 1'i, yillik 1 Ocak
+SNAPSHOT_TYPES = ('daily', 'weekly', 'monthly', 'quarterly', 'yearly')
+
+# Donem basina eklendiginde bir sonraki donemin icine dusen gun sayisi
+_PERIOD_SPAN_DAYS = {'daily': 1, 'weekly': 7, 'monthly': 31, 'quarterly': 92, 'yearly': 366}
+
+# SQL_CREATE_PERIODIC_SNAPSHOTS_TABLE.sql ile ayni sayac kolonlari
+COUNTER_COLUMNS = (
+    'actual_production',
+    'total_stoppage_duration',
+    'energy_consumption_kwh',
+    'wastage_before_die',
+    'wastage_after_die',
+    'paper_consumption',
+    'ethyl_alcohol_consumption',
+    'ethyl_acetate_consumption',
+    'planned_time',
+    'run_time',
+    'average_speed',
+)
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS periodic_snapshots (
+    id INTEGER PRIMARY KEY,
+    machine TEXT NOT NULL,
+    snapshot_type TEXT NOT NULL,
+    snapshot_date TEXT NOT NULL,
+    captured_at TEXT NOT NULL,
+    caught_up INTEGER NOT NULL DEFAULT 0,
+    siparis_no TEXT,
+    cycle_start_time TEXT,
+    {', '.join(column + ' REAL' for column in COUNTER_COLUMNS)},
+    full_live_data TEXT,
+    UNIQUE (machine, snapshot_type, snapshot_date)
+);
+CREATE INDEX IF NOT EXISTS ix_periodic_snapshots_date ON periodic_snapshots (snapshot_date);
+CREATE TABLE IF NOT EXISTS periodic_snapshot_state (
+    machine TEXT NOT NULL,
+    snapshot_type TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    PRIMARY KEY (machine, snapshot_type)
+);
+"""
+
+
+def period_start(snapshot_type, moment):
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if snapshot_type == 'daily':
+        return day
+    if snapshot_type == 'weekly':
+        return day - timedelta(days=day.weekday())
+    if snapshot_type == 'monthly':
+        return day.replace(day=1)
+    if snapshot_type == 'quarterly':
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    if snapshot_type == 'yearly':
+        return day.replace(month=1, day=1)
+    raise ValueError(f"Bilinmeyen snapshot tipi: {snapshot_type}")
+
+
+def next_period_start(snapshot_type, moment):
+    start = period_start(snapshot_type, moment)
+    return period_start(snapshot_type, start + timedelta(days=_PERIOD_SPAN_DAYS[snapshot_type]))
+
+
+class PeriodicSnapshotCollector:
+    """Donem sinirlarinda kumulatif PLC sayaclarini SQLite'a kaydeden zamanlayici.
+
+    machines.json 'snapshots' blogu kolon -> etiket eslemesi verir:
+        "snapshots": {"tags": {"actual_production": "ActualProduction", ...}}
+
+    Her sinirda makinenin tum etiketleri tek okumada (snapshot cache blok
+    planlamasiyla) alinir ve o an dolan tum tipler icin satirlar tek bir
+    toplu insert ile yazilir. Servis kapaliyken kacirilan sinirlar acilista
+    yakalanir: son kacirilan sinir o anki degerlerle, daha eskileri bos
+    degerlerle caught_up=1 isaretli yazilir. Okuma basarisizsa ayni donem
+    icinde retry_interval araliklarla tekrar denenir. Ilk calismada donem
+    baslangici periodic_snapshot_state'e yazilir; servis ilk sinirdan once
+    kapanirsa o sinir da acilista yakalanir.
+    """
+
+    def __init__(self, path, managers, tag_db, configs, types=SNAPSHOT_TYPES, retry_interval=30.0,
+                 grace=60.0):
+        self.path = path
+        self.managers = managers
+        self.types = tuple(types)
+        self.retry_interval = retry_interval
+        self.grace = grace
+        self.machines = {}
+        for key, config in configs.items():
+            tags = config.get('tags') or {}
+            unknown = [column for column in tags if column not in COUNTER_COLUMNS]
+            if unknown:
+                raise ValueError(f"Makine '{key}' icin bilinmeyen snapshot kolonlari: {', '.join(unknown)}")
+            if not tags:
+                raise ValueError(f"Makine '{key}' icin snapshot etiketleri gerekli")
+            self.machines[key] = (tuple(tags), tag_db.resolve(tuple(tags.values())))
+        self.captured = 0
+        self.failures = 0
+        self.last_error = None
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._last = self._load_last()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='periodic-snapshots', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def capture_due(self, now=None):
+        """Dolan sinirlar icin snapshot alir; yazilan satir sayisini doner."""
+        now = now or datetime.now()
+        rows = []
+        started = []
+        for key, (columns, tags) in self.machines.items():
+            due = []
+            for snapshot_type in self.types:
+                start = period_start(snapshot_type, now)
+                last = self._last.get((key, snapshot_type))
+                if last is None:
+                    # Ilk calisma: yarim donemi kaydetme, bir sonraki sinirdan basla.
+                    # Baslangic kalici yazilir ki kapali kalinan ilk sinir da yakalanabilsin
+                    self._last[(key, snapshot_type)] = start
+                    started.append((key, snapshot_type, start.isoformat()))
+                elif last < start:
+                    due.append((snapshot_type, start, last))
+            if not due:
+                continue
+
+            values, errors, _ = self.managers[key].read_values(
+                [tag.address for tag in tags], max_age=0, priority='background'
+            )
+            if errors:
+                self.failures += 1
+                self.last_error = f"{key}: {next(iter(errors.values()))}"
+                logger.error(f"Periyodik snapshot okunamadi ({key}), tekrar denenecek: {self.last_error}")
+                continue
+
+            data = {tag.name: to_engineering(tag, values[tag.address.text]) for tag in tags}
+            counters = [data[tag.name] for tag in tags]
+            for snapshot_type, start, last in due:
+                # Kapali kalinan donemlerin degerleri bilinmiyor, bos satir olarak isaretlenir
+                missed = next_period_start(snapshot_type, last)
+                while missed < start:
+                    rows.append(self._row(key, snapshot_type, missed, now, True, columns, None, None))
+                    missed = next_period_start(snapshot_type, missed)
+                caught_up = (now - start).total_seconds() > self.grace
+                rows.append(self._row(key, snapshot_type, start, now, caught_up, columns, counters, data))
+
+        if started:
+            with self._lock, self._db:
+                self._db.executemany(
+                    'INSERT OR IGNORE INTO periodic_snapshot_state (machine, snapshot_type, started_at) VALUES (?, ?, ?)',
+                    started
+                )
+        if rows:
+            self._insert(rows)
+        return len(rows)
+
+    def query(self, machine=None, snapshot_type=None, since=None, until=None, limit=500):
+        clauses = []
+        params = []
+        for column, operator, value in (
+            ('machine', '=', machine),
+            ('snapshot_type', '=', snapshot_type),
+            ('snapshot_date', '>=', since.isoformat() if since else None),
+            ('snapshot_date', '<=', until.isoformat() if until else None),
+        ):
+            if value is not None:
+                clauses.append(f'{column} {operator} ?')
+                params.append(value)
+        sql = 'SELECT * FROM periodic_snapshots'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY snapshot_date DESC, machine, snapshot_type LIMIT ?'
+        params.append(limit)
+
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            names = [description[0] for description in cursor.description]
+            rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+        for row in rows:
+            row['caught_up'] = bool(row['caught_up'])
+            row['full_live_data'] = json.loads(row['full_live_data']) if row['full_live_data'] else None
+        return rows
+
+    def next_boundary(self, now=None):
+        now = now or datetime.now()
+        return min(next_period_start(snapshot_type, now) for snapshot_type in self.types)
+
+    def stats(self):
+        return {
+            'machines': list(self.machines),
+            'types': list(self.types),
+            'captured': self.captured,
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'next_boundary': self.next_boundary().isoformat(),
+        }
+
+    def _row(self, key, snapshot_type, start, now, caught_up, columns, counters, data):
+        row = {
+            'machine': key,
+            'snapshot_type': snapshot_type,
+            'snapshot_date': start.isoformat(),
+            'captured_at': now.isoformat(timespec='seconds'),
+            'caught_up': int(caught_up),
+            'full_live_data': json.dumps(data) if data is not None else None,
+        }
+        row.update(zip(columns, counters or [None] * len(columns)))
+        return row
+
+    def _insert(self, rows):
+        names = ('machine', 'snapshot_type', 'snapshot_date', 'captured_at', 'caught_up', 'full_live_data') + COUNTER_COLUMNS
+        sql = (
+            f"INSERT OR IGNORE INTO periodic_snapshots ({', '.join(names)}) "
+            f"VALUES ({', '.join('?' for _ in names)})"
+        )
+        with self._lock, self._db:
+            self._db.executemany(sql, [tuple(row.get(name) for name in names) for row in rows])
+        for row in rows:
+            key = (row['machine'], row['snapshot_type'])
+            start = datetime.fromisoformat(row['snapshot_date'])
+            if self._last.get(key) is None or self._last[key] < start:
+                self._last[key] = start
+        self.captured += len(rows)
+        logger.info(f"Periyodik snapshot kaydedildi: {len(rows)} satir")
+
+    def _load_last(self):
+        # Henuz satiri olmayan tipler icin ilk calismanin baslangic donemi kullanilir
+        with self._lock:
+            last = {
+                (machine, snapshot_type): datetime.fromisoformat(date)
+                for machine, snapshot_type, date in self._db.execute(
+                    'SELECT machine, snapshot_type, started_at FROM periodic_snapshot_state'
+                )
+            }
+            cursor = self._db.execute(
+                'SELECT machine, snapshot_type, MAX(snapshot_date) FROM periodic_snapshots GROUP BY machine, snapshot_type'
+            )
+            for machine, snapshot_type, date in cursor:
+                date = datetime.fromisoformat(date)
+                if last.get((machine, snapshot_type)) is None or last[(machine, snapshot_type)] < date:
+                    last[(machine, snapshot_type)] = date
+            return last
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            pending = False
+            try:
+                self.capture_due()
+                pending = self._has_due()
+            except Exception as e:
+                logger.error(f"Periyodik snapshot hatasi: {e}")
+                pending = True
+
+            now = datetime.now()
+            delay = (self.next_boundary(now) - now).total_seconds()
+            if pending:
+                delay = min(delay, self.retry_interval)
+            # Saat degisikliklerine karsi uzun beklemeler parcalanir
+            self._stop_event.wait(max(0.05, min(delay, 300.0)))
+
+    def _has_due(self):
+        now = datetime.now()
+        return any(
+            self._last.get((key, snapshot_type)) is not None
+            and self._last[(key, snapshot_type)] < period_start(snapshot_type, now)
+            for key in self.machines for snapshot_type in self.types
+        )
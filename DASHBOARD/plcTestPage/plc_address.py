@@ -0,0 +1,140 @@
+import re
+import struct
+from collections import namedtuple
+
+# DB basina ayrilan alan: index.html'deki parseAddress ile ayni (DB1 = 0x0000, DB2 = 0x1000 coil)
+DB_BYTES = 512
+DB_COIL_SPAN = DB_BYTES * 8
+DB_REGISTER_SPAN = DB_BYTES // 2
+
+# 32 bit degerlerde register sirasi: 'little' = dusuk word once (M241 varsayilani)
+DEFAULT_WORD_ORDER = 'little'
+
+# Veri tipi -> (struct formati, register sayisi)
+DATA_TYPES = {
+    'WORD': ('>H', 1),
+    'INT': ('>h', 1),
+    'DWORD': ('>I', 2),
+    'DINT': ('>i', 2),
+    'REAL': ('>f', 2),
+}
+WORD_TYPES = ('WORD', 'INT')
+DWORD_TYPES = ('DWORD', 'DINT', 'REAL')
+
+# area: 'coil' (tek bit), 'register_bit' (word icinde bit) veya 'register' (tipli deger)
+PlcAddress = namedtuple('PlcAddress', 'text area address bit data_type count')
+
+_DB_PATTERN = re.compile(r'^DB(\d+)\.DB([XWD])(\d+)(?:\.(\d+))?(?::([A-Z]+))?$', re.IGNORECASE)
+_HR_PATTERN = re.compile(r'^HR(\d+)(?:\.(\d+))?(?::([A-Z]+))?$', re.IGNORECASE)
+
+
+def parse_plc_address(address_string):
+    """Adres metnini coil, word-bit veya tipli register adresine cevirir.
+
+    Desteklenen formatlar:
+        DB1.DBX0.0          coil (bit)
+        DB1.DBW10           holding register, WORD (veya :INT)
+        DB1.DBW10.3         holding register icindeki 3. bit (FC22 ile yazilir)
+        DB1.DBD4[:REAL]     iki register, DWORD (veya :DINT, :REAL)
+        HR100[.bit][:TYPE]  dogrudan holding register numarasi
+        42                  dogrudan coil numarasi
+    """
+    text = str(address_string).strip()
+    try:
+        match = _DB_PATTERN.match(text)
+        if match:
+            return _parse_db_address(text, match)
+
+        match = _HR_PATTERN.match(text)
+        if match:
+            register = int(match.group(1))
+            bit = match.group(2)
+            return _register_address(text, register, bit, match.group(3), 'WORD')
+
+        # Eger sadece sayi ise direkt coil numarasi olarak kullan
+        return PlcAddress(text, 'coil', _check_range(int(text), 1, text), None, 'BOOL', 1)
+
+    except Exception as e:
+        raise ValueError(f"Gecersiz adres formati: {address_string} - {e}")
+
+
+def _parse_db_address(text, match):
+    db_num = int(match.group(1))
+    area = match.group(2).upper()
+    byte_offset = int(match.group(3))
+    bit = match.group(4)
+    data_type = match.group(5)
+
+    if db_num < 1:
+        raise ValueError("DB numarasi 1'den baslar")
+    size = {'X': 1, 'W': 2, 'D': 4}[area]
+    if byte_offset + size > DB_BYTES:
+        raise ValueError(f"Byte offset DB boyutunu asiyor ({DB_BYTES} byte)")
+
+    if area == 'X':
+        if bit is None or data_type:
+            raise ValueError("DBX adresi DBx.DBXy.z formatinda olmali")
+        bit = int(bit)
+        if bit > 7:
+            raise ValueError("Bit 0-7 arasinda olmali")
+        coil = (db_num - 1) * DB_COIL_SPAN + byte_offset * 8 + bit
+        return PlcAddress(text, 'coil', _check_range(coil, 1, text), None, 'BOOL', 1)
+
+    # Word/DWord adresleri holding register'a duser; register 2 byte oldugu icin offset cift olmali
+    if byte_offset % 2:
+        raise ValueError("DBW/DBD byte offset'i cift olmali")
+    register = (db_num - 1) * DB_REGISTER_SPAN + byte_offset // 2
+    if area == 'D' and bit is not None:
+        raise ValueError("DBD adresinde bit secilemez")
+    return _register_address(text, register, bit, data_type, 'WORD' if area == 'W' else 'DWORD',
+                             allowed=WORD_TYPES if area == 'W' else DWORD_TYPES)
+
+
+def _register_address(text, register, bit, data_type, default_type, allowed=None):
+    if bit is not None:
+        if data_type:
+            raise ValueError("Bit adresinde veri tipi verilemez")
+        bit = int(bit)
+        if bit > 15:
+            raise ValueError("Word icindeki bit 0-15 arasinda olmali")
+        return PlcAddress(text, 'register_bit', _check_range(register, 1, text), bit, 'BOOL', 1)
+
+    data_type = (data_type or default_type).upper()
+    if data_type not in DATA_TYPES or (allowed and data_type not in allowed):
+        raise ValueError(f"Desteklenmeyen veri tipi: {data_type}")
+    count = DATA_TYPES[data_type][1]
+    return PlcAddress(text, 'register', _check_range(register, count, text), None, data_type, count)
+
+
+def _check_range(address, count, text):
+    # Modbus adres alani 16 bit
+    if address < 0 or address + count - 1 > 0xFFFF:
+        raise ValueError(f"Adres Modbus araliginin disinda (0-65535): {text}")
+    return address
+
+
+def encode_value(data_type, value, word_order=DEFAULT_WORD_ORDER):
+    """Degeri register listesine cevirir (tek write_registers icin)."""
+    fmt, count = DATA_TYPES[data_type]
+    if data_type == 'REAL':
+        value = float(value)
+    else:
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError(f"{data_type} icin tam sayi gerekli: {value}")
+        value = int(value)
+    try:
+        raw = struct.pack(fmt, value)
+    except struct.error:
+        raise ValueError(f"Deger {data_type} araliginin disinda: {value}")
+    registers = list(struct.unpack('>' + 'H' * count, raw))
+    if count == 2 and word_order == 'little':
+        registers.reverse()
+    return registers
+
+
+def decode_value(data_type, registers, word_order=DEFAULT_WORD_ORDER):
+    fmt, count = DATA_TYPES[data_type]
+    registers = list(registers[:count])
+    if count == 2 and word_order == 'little':
+        registers.reverse()
+    return struct.unpack(fmt, struct.pack('>' + 'H' * count, *registers))[0]
@@ -0,0 +1,163 @@
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class Benchmark:
+    """PLC server endpoint'lerini sabit eszamanlilikla yukleyen surucu."""
+
+    def __init__(self, base_url, mode, concurrency, duration, requests, machine=None,
+                 coils=64, batch_size=16, timeout=10.0):
+        self.base_url = base_url.rstrip('/')
+        self.mode = mode
+        self.concurrency = concurrency
+        self.duration = duration
+        self.requests = requests
+        self.machine = machine
+        self.coils = coils
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.latencies = []
+        self.errors = {}
+        self._lock = threading.Lock()
+        self._issued = 0
+
+    def run(self):
+        threads = [threading.Thread(target=self._worker, args=(index,)) for index in range(self.concurrency)]
+        started = time.perf_counter()
+        self._deadline = started + self.duration if self.duration else None
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self._report(time.perf_counter() - started)
+
+    def _next_ticket(self):
+        with self._lock:
+            if self.requests and self._issued >= self.requests:
+                return False
+            self._issued += 1
+            return True
+
+    def _worker(self, index):
+        rng = random.Random(index)
+        while self._next_ticket():
+            if self._deadline and time.perf_counter() >= self._deadline:
+                return
+            mode = self.mode if self.mode != 'mixed' else rng.choice(('write-bit', 'write-bits', 'read'))
+            method, path, body = self._build_request(mode, rng)
+            started = time.perf_counter()
+            error = self._send(method, path, body)
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.latencies.append(elapsed)
+                if error:
+                    self.errors[error] = self.errors.get(error, 0) + 1
+
+    def _build_request(self, mode, rng):
+        if mode == 'write-bit':
+            body = {'address': str(rng.randrange(self.coils)), 'value': rng.random() < 0.5}
+            if self.machine:
+                body['machine'] = self.machine
+            return 'POST', '/api/plc/write-bit', body
+        if mode == 'write-bits':
+            start = rng.randrange(max(1, self.coils - self.batch_size))
+            body = {'writes': [
+                {'address': str(start + offset), 'value': rng.random() < 0.5}
+                for offset in range(self.batch_size)
+            ]}
+            if self.machine:
+                body['machine'] = self.machine
+            return 'POST', '/api/plc/write-bits', body
+        if mode == 'read':
+            start = rng.randrange(max(1, self.coils - self.batch_size))
+            query = 'coils=' + ','.join(str(start + offset) for offset in range(self.batch_size))
+            if self.machine:
+                query += '&machine=' + self.machine
+            return 'GET', '/api/plc/read?' + query, None
+        raise ValueError(f"Bilinmeyen mod: {mode}")
+
+    def _send(self, method, path, body):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if data is not None:
+            request.add_header('Content-Type', 'application/json')
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+            return None
+        except urllib.error.HTTPError as e:
+            return f'HTTP {e.code}'
+        except Exception as e:
+            return type(e).__name__
+
+    def _report(self, elapsed):
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        return {
+            'mode': self.mode,
+            'concurrency': self.concurrency,
+            'requests': count,
+            'errors': sum(self.errors.values()),
+            'error_types': self.errors,
+            'elapsed_s': round(elapsed, 3),
+            'throughput_rps': round(count / elapsed, 1) if elapsed else 0.0,
+            'latency_ms': {
+                'mean': round(sum(latencies) / count * 1000, 2) if count else 0.0,
+                'p50': round(percentile(latencies, 0.50) * 1000, 2),
+                'p90': round(percentile(latencies, 0.90) * 1000, 2),
+                'p99': round(percentile(latencies, 0.99) * 1000, 2),
+                'max': round(latencies[-1] * 1000, 2) if count else 0.0,
+            },
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EGEM PLC Server yuk testi')
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--mode', choices=('write-bit', 'write-bits', 'read', 'mixed'), default='write-bit')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='saniye (0 ise --requests kullanilir)')
+    parser.add_argument('--requests', type=int, default=0, help='toplam istek sayisi (0 ise sinirsiz)')
+    parser.add_argument('--machine', default=None)
+    parser.add_argument('--coils', type=int, default=64, help='kullanilacak coil adres araligi')
+    parser.add_argument('--batch-size', type=int, default=16, help='write-bits ve read icin adres sayisi')
+    parser.add_argument('--json', action='store_true', help='sonucu JSON olarak yaz')
+    args = parser.parse_args()
+
+    if not args.duration and not args.requests:
+        parser.error('--duration veya --requests verilmeli')
+
+    benchmark = Benchmark(
+        args.url, args.mode, args.concurrency, args.duration, args.requests,
+        machine=args.machine, coils=args.coils, batch_size=args.batch_size
+    )
+    report = benchmark.run()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    latency = report['latency_ms']
+    print(f"Mod: {report['mode']}  Eszamanlilik: {report['concurrency']}")
+    print(f"Istek: {report['requests']}  Hata: {report['errors']}  Sure: {report['elapsed_s']} sn")
+    print(f"Throughput: {report['throughput_rps']} istek/sn")
+    print(f"Gecikme (ms): ort {latency['mean']}  p50 {latency['p50']}  p90 {latency['p90']}  "
+          f"p99 {latency['p99']}  max {latency['max']}")
+    for error, count in sorted(report['error_types'].items()):
+        print(f"  {error}: {count}")
+
+
+if __name__ == '__main__':
+    main()
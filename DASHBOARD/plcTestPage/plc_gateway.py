@@ -0,0 +1,227 @@
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import threading
+
+from modbus_capture import ModbusCapture
+from plc_session import PLCSession
+from write_queue import WriteQueue
+
+logger = logging.getLogger(__name__)
+
+
+class MachineRegistry:
+    """Isimli makine -> PLC baglanti bilgisi kaydi.
+
+    machines.json formati:
+    {
+        "default": "lemanic3",
+        "machines": {
+            "lemanic3": {"name": "Lemanic 3", "host": "192.168.0.104", "port": 1502, "slave_id": 1}
+        }
+    }
+
+    Makineye ait opsiyonel alt sistem ayarlari (ornegin "debounce") oldugu
+    gibi saklanir, ilgili modul kendi anahtarini okur.
+    """
+
+    def __init__(self, machines, default_key):
+        if not machines:
+            raise ValueError("En az bir makine tanimlanmali")
+        if default_key not in machines:
+            raise ValueError(f"Varsayilan makine tanimli degil: {default_key}")
+        self.machines = machines
+        self.default_key = default_key
+
+    @classmethod
+    def load(cls, path, fallback_key, fallback_host, fallback_port, fallback_slave_id):
+        # Dosya yoksa tek makinelik eski yapilandirma kullanilir
+        if not os.path.exists(path):
+            logger.info(f"Makine dosyasi bulunamadi ({path}), varsayilan PLC kullaniliyor")
+            return cls({
+                fallback_key: {
+                    'name': fallback_key,
+                    'host': fallback_host,
+                    'port': fallback_port,
+                    'slave_id': fallback_slave_id,
+                }
+            }, fallback_key)
+
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        machines = {}
+        for key, config in data.get('machines', {}).items():
+            if 'host' not in config:
+                raise ValueError(f"Makine '{key}' icin host gerekli")
+            machines[key] = dict(config)
+            machines[key].update({
+                'name': config.get('name', key),
+                'host': config['host'],
+                'port': int(config.get('port', 502)),
+                'slave_id': int(config.get('slave_id', 1)),
+            })
+        default_key = data.get('default') or next(iter(machines), None)
+        return cls(machines, default_key)
+
+    def get(self, key=None):
+        key = key or self.default_key
+        if key not in self.machines:
+            raise ValueError(f"Bilinmeyen makine: {key}")
+        return key, self.machines[key]
+
+    def keys(self):
+        return list(self.machines)
+
+
+class PLCGateway:
+    """Tum makinelerin PLC oturumlarini tek bir asyncio loop'unda calistirir.
+
+    Loop ayri bir thread'de doner; Flask thread'leri istegi loop'a birakip
+    sonucunu bekler. Her makinenin kendi oturumu ve kilidi oldugu icin yavas
+    veya kopuk bir PLC diger makinelerin isteklerini bekletmez. Yazmalar
+    makine basina bir WriteQueue uzerinden birlestirilerek gonderilir.
+
+    Makine ayarlarinda 'pipeline_depth' (ayni anda cevap bekleyen istek
+    sayisi) ve 'verify_writes' (her yazmadan sonra geri okuma) verilebilir.
+    """
+
+    def __init__(self, registry, request_timeout=5.0, write_window=0.01, pipeline_depth=1,
+                 verify_writes=False, **session_options):
+        self.registry = registry
+        self.request_timeout = request_timeout
+        self.sessions = {
+            key: PLCSession(
+                config['host'], config['port'], config['slave_id'], name=key,
+                pipeline_depth=int(config.get('pipeline_depth', pipeline_depth)), **session_options
+            )
+            for key, config in registry.machines.items()
+        }
+        self.write_queues = {
+            key: WriteQueue(
+                session, window=write_window,
+                verify=bool(registry.machines[key].get('verify_writes', verify_writes))
+            )
+            for key, session in self.sessions.items()
+        }
+        self._loop = asyncio.new_event_loop()
+        self._thread = None
+        self.capture = None
+
+    @property
+    def loop(self):
+        return self._loop
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run_loop, name='plc-gateway', daemon=True)
+        self._thread.start()
+        for session in self.sessions.values():
+            self.submit(session.start()).result()
+        logger.info(f"PLC gateway baslatildi: {', '.join(self.sessions)}")
+
+    def stop(self):
+        if self._thread is None:
+            return
+        for session in self.sessions.values():
+            self.submit(session.stop()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    def submit(self, coro):
+        """Coroutine'i gateway loop'una gonderir, concurrent.futures.Future doner."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def session(self, machine_key=None):
+        key, _ = self.registry.get(machine_key)
+        return self.sessions[key]
+
+    def call(self, machine_key, operation, timeout=None, priority='interactive'):
+        """operation(client, slave_id) coroutine'ini makinenin oturumunda calistirip bekler."""
+        session = self.session(machine_key)
+        future = self.submit(session.execute(operation, priority))
+        try:
+            return future.result(timeout or self.request_timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            return False, "PLC istegi zaman asimina ugradi"
+
+    def call_many(self, machine_key, operations, timeout=None, priority='interactive'):
+        """Birden cok islemi ayni anda oturuma verir; pipeline derinligi kadari birlikte gider.
+
+        Sonuclar operations sirasiyla [(success, result)] olarak doner.
+        """
+        session = self.session(machine_key)
+
+        async def run_all():
+            return await asyncio.gather(*(session.execute(operation, priority) for operation in operations))
+
+        future = self.submit(run_all())
+        try:
+            return future.result(timeout or self.request_timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            return [(False, "PLC istegi zaman asimina ugradi")] * len(operations)
+
+    def write(self, machine_key, table, writes, timeout=None, verify=False):
+        """[(adres, deger)] yazmalarini makinenin yazma kuyruguna verir, ack listesi doner."""
+        key, _ = self.registry.get(machine_key)
+        future = self.submit(self.write_queues[key].write(table, writes, verify))
+        try:
+            return future.result(timeout or self.request_timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            return [
+                {'success': False, 'message': "PLC istegi zaman asimina ugradi", 'value': value,
+                 'superseded': False, 'transaction': None, 'verified': None}
+                for _, value in writes
+            ]
+
+    def start_capture(self, path, max_bytes=256 * 1024 * 1024):
+        """Tum oturumlarin Modbus trafigini path'e kaydetmeye baslar."""
+        if self.capture is not None:
+            if self.capture.active:
+                raise ValueError(f"Trafik kaydi zaten acik: {self.capture.path}")
+            # Boyut sinirina ulasip durmus onceki kayit kapatilir
+            self.stop_capture()
+        capture = ModbusCapture(path, max_bytes=max_bytes)
+
+        async def attach():
+            # Istemciler loop'ta kullanildigi icin sarmalama da loop'ta yapilir
+            for session in self.sessions.values():
+                session.set_capture(capture)
+
+        self.submit(attach()).result(self.request_timeout)
+        self.capture = capture
+        return capture.stats()
+
+    def stop_capture(self):
+        if self.capture is None:
+            raise ValueError("Acik trafik kaydi yok")
+        capture, self.capture = self.capture, None
+
+        async def detach():
+            for session in self.sessions.values():
+                session.set_capture(None)
+
+        self.submit(detach()).result(self.request_timeout)
+        capture.close()
+        return capture.stats()
+
+    def capture_stats(self):
+        return self.capture.stats() if self.capture is not None else None
+
+    def write_queue(self, machine_key=None):
+        key, _ = self.registry.get(machine_key)
+        return self.write_queues[key]
+
+    def status(self):
+        return {key: session.status() for key, session in self.sessions.items()}
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
@@ -0,0 +1,384 @@
+import bisect
+import logging
+import struct
+import threading
+import time
+import zlib
+from array import array
+from multiprocessing import shared_memory
+
+from modbus_blocks import plan_reads
+from snapshot_cache import TABLES
+
+logger = logging.getLogger(__name__)
+
+# Imajda tutulan tablolar ve eleman tipleri (coil 1 bayt, register 2 bayt)
+IMAGE_TABLES = {'coils': 'B', 'holding_registers': 'H'}
+
+IMAGE_MAGIC = b'PLCI'
+IMAGE_VERSION = 1
+
+# Genel baslik: magic, versiyon, makine sayisi, yerlesim crc'si (16 bayta hizali)
+_HEADER = struct.Struct('<4sHHI4x')
+# Makine basligi: seqlock sayaci, son tarama zamani (unix), yayin sayisi (32 bayta hizali)
+_MACHINE_HEADER = struct.Struct('<QdQ8x')
+_SEQUENCE = struct.Struct('<Q')
+# Sayactan sonraki alanlar: son tarama zamani, yayin sayisi
+_MACHINE_STATE = struct.Struct('<dQ')
+
+# Okuyucu yazari bu kadar kez ust uste yakalarsa vazgecip IPC'ye duser
+_READ_RETRIES = 100
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _store_sequence(buffer, header, sequence):
+    # pack_into hedefi once sifirlar; sayac bir an 0 (cift) gorunmesin diye tek kopyayla yazilir
+    buffer[header:header + _SEQUENCE.size] = _SEQUENCE.pack(sequence)
+
+
+class ImageLayout:
+    """Paylasilan bellek imajinin yerlesimi.
+
+    I/O sureci ve web worker'lari ayni machines.json / tags.json'dan ayni
+    yerlesimi hesaplar; imaj basligindaki crc ile iki tarafin ayni
+    yerlesimi kullandigi dogrulanir. Adresler snapshot cache'in blok
+    planlamasiyla bolgelere ayrilir, her bolge imajda ardisik bir dizidir.
+    """
+
+    def __init__(self, machines):
+        # machines: {makine: {tablo: [adres, ...]}}
+        self.machines = {}
+        offset = _HEADER.size
+        for key in sorted(machines):
+            header = offset
+            offset += _MACHINE_HEADER.size
+            regions = {}
+            for table, item_format in IMAGE_TABLES.items():
+                max_count, max_gap = TABLES[table]
+                table_regions = []
+                for start, count in plan_reads(machines[key].get(table, ()), max_count, max_gap):
+                    table_regions.append((start, count, offset))
+                    offset = _align(offset + count * struct.calcsize(item_format))
+                regions[table] = table_regions
+            self.machines[key] = (header, regions)
+        self.size = offset
+        self.crc = zlib.crc32(repr(sorted(self.machines.items())).encode())
+
+    @classmethod
+    def from_config(cls, machine_configs, tags):
+        """Her makine icin tum etiket adresleri + machines.json 'image' blogundaki araliklar.
+
+        "image": {"coils": [[0, 64]], "holding_registers": [[100, 40]]}
+        """
+        tag_addresses = {table: set() for table in IMAGE_TABLES}
+        for tag in tags:
+            plc_address = tag.address
+            if plc_address.area == 'coil':
+                tag_addresses['coils'].add(plc_address.address)
+            else:
+                tag_addresses['holding_registers'].update(
+                    range(plc_address.address, plc_address.address + plc_address.count)
+                )
+
+        machines = {}
+        for key, config in machine_configs.items():
+            addresses = {table: set(values) for table, values in tag_addresses.items()}
+            for table, ranges in (config.get('image') or {}).items():
+                if table not in IMAGE_TABLES:
+                    raise ValueError(f"Makine '{key}' icin imaj tablosu desteklenmiyor: {table}")
+                for start, count in ranges:
+                    addresses[table].update(range(int(start), int(start) + int(count)))
+            machines[key] = {table: sorted(values) for table, values in addresses.items()}
+        return cls(machines)
+
+    def addresses(self, machine_key, table):
+        _, regions = self.machines[machine_key]
+        return [start + index for start, count, _ in regions[table] for index in range(count)]
+
+    def find(self, machine_key, table, address):
+        # Adresi iceren bolge: (start, count, offset) veya None
+        _, regions = self.machines[machine_key]
+        table_regions = regions.get(table, [])
+        index = bisect.bisect_right(table_regions, (address, float('inf'), float('inf'))) - 1
+        if index >= 0:
+            start, count, offset = table_regions[index]
+            if address < start + count:
+                return table_regions[index]
+        return None
+
+
+class _ImageBuffer:
+    # Yazici ve okuyucunun ortak gorunumleri; her bolge dogrudan paylasilan bellek uzerinde memoryview
+
+    def __init__(self, memory, layout):
+        self.memory = memory
+        self.layout = layout
+        self.buffer = memory.buf
+        self.views = {}
+        for key, (_, regions) in layout.machines.items():
+            for table, table_regions in regions.items():
+                item_format = IMAGE_TABLES[table]
+                size = struct.calcsize(item_format)
+                for start, count, offset in table_regions:
+                    self.views[(key, table, start)] = self.buffer[offset:offset + count * size].cast(item_format)
+
+    def release(self):
+        for view in self.views.values():
+            view.release()
+        self.views = {}
+        self.buffer = None
+        self.memory.close()
+
+
+class ImageWriter:
+    """I/O surecinin tarafi: imaji olusturur ve makine bazinda seqlock ile yayinlar.
+
+    Yayin sirasinda makine basligindaki sayac tek sayiya cekilir, degerler
+    ve zaman yazilir, sayac tekrar cift sayiya cekilir. Okuyucu tek sayi
+    veya okuma boyunca degisen sayac gorurse tekrar dener; boylece kilit
+    olmadan tutarli bir goruntu alinir.
+    """
+
+    def __init__(self, name, layout):
+        self.name = name
+        self.layout = layout
+        try:
+            memory = shared_memory.SharedMemory(name, create=True, size=layout.size)
+        except FileExistsError:
+            # Onceki I/O sureci temizlemeden kapanmis
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+            memory = shared_memory.SharedMemory(name, create=True, size=layout.size)
+        self._image = _ImageBuffer(memory, layout)
+        self._lock = threading.Lock()
+        self.publishes = 0
+        _HEADER.pack_into(self._image.buffer, 0, IMAGE_MAGIC, IMAGE_VERSION, len(layout.machines), layout.crc)
+        for header, _ in layout.machines.values():
+            _MACHINE_HEADER.pack_into(self._image.buffer, header, 0, 0.0, 0)
+
+    def publish(self, machine_key, table_values, updated_at=None):
+        """{tablo: {adres: deger}} degerlerini yazar; updated_at None ise zaman degismez."""
+        header, regions = self.layout.machines[machine_key]
+        buffer = self._image.buffer
+        with self._lock:
+            sequence, previous, count = _MACHINE_HEADER.unpack_from(buffer, header)
+            _store_sequence(buffer, header, sequence + 1)
+            try:
+                for table, values in table_values.items():
+                    for start, region_count, _ in regions.get(table, ()):
+                        view = self._image.views[(machine_key, table, start)]
+                        view[:] = array(IMAGE_TABLES[table], [
+                            int(values.get(start + index, view[index])) for index in range(region_count)
+                        ])
+            finally:
+                # Zaman sayac hala tekken yazilir, sayac en son cift yapilir; aksi halde
+                # okuyucu yeni sayaci eski zamanla birlikte tutarli sanabilir
+                _MACHINE_STATE.pack_into(
+                    buffer, header + _SEQUENCE.size, previous if updated_at is None else updated_at, count + 1
+                )
+                _store_sequence(buffer, header, sequence + 2)
+            self.publishes += 1
+
+    def close(self):
+        memory = self._image.memory
+        self._image.release()
+        memory.unlink()
+
+
+class ImageReader:
+    """Web worker tarafi: imaja baglanir ve istenen adresleri kopyalamadan okur.
+
+    I/O sureci henuz imaji olusturmadiysa veya yerlesim farkliysa (farkli
+    machines.json / tags.json) read() None doner ve cagiran IPC'ye duser.
+    """
+
+    def __init__(self, name, layout):
+        self.name = name
+        self.layout = layout
+        self._image = None
+        self._lock = threading.Lock()
+        self._last_error = None
+        self.retries = 0
+
+    def read(self, machine_key, table, addresses):
+        """({adres: deger}, son tarama zamani) veya imajda olmayan adres varsa None."""
+        image = self._attach()
+        if image is None or table not in IMAGE_TABLES:
+            return None
+        located = []
+        for address in addresses:
+            region = self.layout.find(machine_key, table, address)
+            if region is None:
+                return None
+            located.append((address, image.views[(machine_key, table, region[0])], address - region[0]))
+
+        header, _ = self.layout.machines[machine_key]
+        buffer = image.buffer
+        for _ in range(_READ_RETRIES):
+            sequence, updated_at, _ = _MACHINE_HEADER.unpack_from(buffer, header)
+            if sequence & 1:
+                self.retries += 1
+                continue
+            values = {address: view[index] for address, view, index in located}
+            if _SEQUENCE.unpack_from(buffer, header)[0] == sequence:
+                if table == 'coils':
+                    values = {address: bool(value) for address, value in values.items()}
+                return values, updated_at
+            self.retries += 1
+        return None
+
+    def read_block(self, machine_key, table, start, count):
+        """(array, son tarama zamani) veya blok tek bir imaj bolgesinde degilse None.
+
+        Blok seqlock altinda tek kopyayla alinir; BlockDecoder'a dogrudan verilir.
+        """
+        image = self._attach()
+        if image is None or table not in IMAGE_TABLES:
+            return None
+        region = self.layout.find(machine_key, table, start)
+        if region is None or start + count > region[0] + region[1]:
+            return None
+        offset = start - region[0]
+        header, _ = self.layout.machines[machine_key]
+        buffer = image.buffer
+        with image.views[(machine_key, table, region[0])][offset:offset + count].cast('B') as view:
+            for _ in range(_READ_RETRIES):
+                sequence, updated_at, _ = _MACHINE_HEADER.unpack_from(buffer, header)
+                if sequence & 1:
+                    self.retries += 1
+                    continue
+                values = array(IMAGE_TABLES[table])
+                values.frombytes(view)
+                if _SEQUENCE.unpack_from(buffer, header)[0] == sequence:
+                    return values, updated_at
+                self.retries += 1
+        return None
+
+    def close(self):
+        with self._lock:
+            if self._image is not None:
+                self._image.release()
+                self._image = None
+
+    def _attach(self):
+        if self._image is not None:
+            return self._image
+        with self._lock:
+            if self._image is not None:
+                return self._image
+            try:
+                memory = _open_shared_memory(self.name)
+            except FileNotFoundError:
+                self._log_once(f"PLC imaji bulunamadi ({self.name}), I/O sureci calisiyor mu?")
+                return None
+            magic, version, _, crc = _HEADER.unpack_from(memory.buf, 0)
+            if magic != IMAGE_MAGIC or version != IMAGE_VERSION or crc != self.layout.crc or memory.size < self.layout.size:
+                memory.close()
+                self._log_once(f"PLC imaji yerlesimi uyusmuyor ({self.name}), okumalar IPC ile yapilacak")
+                return None
+            self._image = _ImageBuffer(memory, self.layout)
+            self._last_error = None
+            logger.info(f"PLC imajina baglanildi: {self.name} ({self.layout.size} bayt)")
+            return self._image
+
+    def _log_once(self, message):
+        if message != self._last_error:
+            logger.warning(message)
+        self._last_error = message
+
+
+def _open_shared_memory(name):
+    # Baglanan surec imaji sahiplenmemeli; aksi halde cikarken resource_tracker imaji siler
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        memory = shared_memory.SharedMemory(name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(memory._name, 'shared_memory')
+        except (ImportError, AttributeError, KeyError):
+            pass
+        return memory
+
+
+class ImagePublisher:
+    """I/O surecinde imaji sabit aralikla PLC'den tazeleyen thread.
+
+    Taramalar snapshot cache uzerinden 'background' onceligiyle yapilir.
+    Hata olan turda imajin zamani ilerlemez; eskiyen imaji okuyan web
+    worker'lari IPC ile I/O surecine duser ve hatayi oradan alir.
+    """
+
+    def __init__(self, writer, managers, interval):
+        self.writer = writer
+        self.managers = managers
+        self.interval = interval
+        self.failures = 0
+        self.last_error = None
+        self._addresses = {
+            key: {table: writer.layout.addresses(key, table) for table in IMAGE_TABLES}
+            for key in writer.layout.machines if key in managers
+        }
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='plc-image', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def refresh(self, machine_key):
+        # Yazmadan sonra cache'teki degerler PLC'ye gitmeden imaja kopyalanir.
+        # Cache'ten dusmus adres varsa (ornegin FC22 bit yazmasi) imaj eskimis isaretlenir.
+        addresses = self._addresses.get(machine_key)
+        if not addresses:
+            return
+        snapshot = self.managers[machine_key].snapshot
+        table_values = {table: snapshot.peek(table, table_addresses) for table, table_addresses in addresses.items()}
+        complete = all(len(table_values[table]) == len(table_addresses) for table, table_addresses in addresses.items())
+        self.writer.publish(machine_key, table_values, None if complete else 0.0)
+
+    def stats(self):
+        return {
+            'name': self.writer.name,
+            'size': self.writer.layout.size,
+            'interval': self.interval,
+            'publishes': self.writer.publishes,
+            'failures': self.failures,
+            'last_error': self.last_error,
+        }
+
+    def _publish(self, machine_key):
+        table_values = {}
+        oldest = 0.0
+        for table, table_addresses in self._addresses[machine_key].items():
+            if not table_addresses:
+                continue
+            values, errors, age = self.managers[machine_key].read(
+                table, table_addresses, self.interval / 2, 'background'
+            )
+            if errors:
+                raise RuntimeError(next(iter(errors.values())))
+            table_values[table] = values
+            oldest = max(oldest, age)
+        self.writer.publish(machine_key, table_values, time.time() - oldest)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            for key in self._addresses:
+                try:
+                    self._publish(key)
+                    self.last_error = None
+                except Exception as e:
+                    self.failures += 1
+                    if str(e) != self.last_error:
+                        logger.error(f"PLC imaji tazelenemedi ({key}): {e}")
+                    self.last_error = str(e)
+            self._stop_event.wait(max(0.0, self.interval - (time.monotonic() - started)))
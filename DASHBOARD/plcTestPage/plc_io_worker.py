@@ -0,0 +1,48 @@
+"""
+EGEM PLC I/O sureci
+
+plc_server.py birden fazla web worker'i ile calistirildiginda her worker
+kendi PLC baglantisini acmasin diye Modbus I/O tek bir surecte toplanir:
+
+    python plc_io_worker.py
+    set PLC_IO_MODE=web
+    python -m waitress --listen=0.0.0.0:5000 --threads=16 plc_server:app
+
+Windows'ta start_io_server.bat ikisini sirayla baslatir (PLC_WEB_WORKERS ile
+5000, 5001, ... portlarinda birden fazla web worker'i). waitress tek surecte
+thread'lerle calisir; Linux'ta gunicorn -w N de ayni sekilde kullanilabilir.
+
+Bu surec PLC'ye bagli tek istemcidir. Yazma kuyrugu, snapshot cache, denetim
+kaydi, periyodik snapshot'lar, gecmis ve debounce burada calisir. Etiketlerin
+son degerleri paylasilan bellekteki imaja (PLC_IMAGE_NAME) yayinlanir; web
+worker'lari okumalari bu imajdan yapar, yazmalari 127.0.0.1:PLC_IO_PORT
+uzerinden bu surece gonderir. IPC anahtari PLC_IO_AUTHKEY ile verilmezse
+bu surec data/plc_io.key dosyasina rastgele uretir; web worker'lari ayni
+kullanici ile calismali ve dosyayi okuyabilmelidir. Tum surecler ayni
+machines.json / tags.json dosyalarini kullanmalidir.
+"""
+
+import os
+os.environ['PLC_IO_MODE'] = 'io'
+
+import logging
+import signal
+import sys
+import threading
+
+import plc_server
+
+logger = logging.getLogger(__name__)
+
+if __name__ == '__main__':
+    logger.info("EGEM PLC I/O sureci baslatiliyor...")
+    for key in plc_server.machine_registry.keys():
+        _, config = plc_server.machine_registry.get(key)
+        logger.info(f"PLC Adresi [{key}]: {config['host']}:{config['port']}")
+    logger.info(f"PLC imaji: {plc_server.PLC_IMAGE_NAME} ({plc_server.image_layout.size} bayt)")
+    # Servis yoneticisi durdururken imaj atexit ile silinsin
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        logger.info("PLC I/O sureci durduruluyor")
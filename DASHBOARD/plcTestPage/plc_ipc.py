@@ -0,0 +1,183 @@
+import functools
+import logging
+import os
+import queue
+import secrets
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+logger = logging.getLogger(__name__)
+
+AUTHKEY_BYTES = 32
+
+
+def load_authkey(path, create=False):
+    """IPC authkey'ini dosyadan okur; create ise yoksa rastgele uretip sadece sahibinin okuyabilecegi sekilde yazar.
+
+    I/O sureci create=True ile cagirir, web worker'lari ayni dosyayi okur.
+    Dosya yoksa (I/O sureci hic baslatilmamis) veya POSIX'te baskalari
+    okuyabiliyorsa RuntimeError verilir; kaynak kodda sabit bir anahtar yoktur.
+    """
+    if create:
+        try:
+            descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(descriptor, 'wb') as key_file:
+                key_file.write(secrets.token_bytes(AUTHKEY_BYTES))
+            logger.info(f"Yeni IPC anahtari olusturuldu: {path}")
+    try:
+        if os.name == 'posix' and os.stat(path).st_mode & 0o077:
+            raise RuntimeError(f"IPC anahtar dosyasini baskalari okuyabiliyor (chmod 600 gerekli): {path}")
+        with open(path, 'rb') as key_file:
+            authkey = key_file.read()
+    except FileNotFoundError:
+        raise RuntimeError(f"IPC anahtar dosyasi yok, once PLC I/O surecini baslatin: {path}")
+    if len(authkey) < AUTHKEY_BYTES:
+        raise RuntimeError(f"IPC anahtar dosyasi bozuk: {path}")
+    return authkey
+
+
+class IPCServer:
+    """I/O surecinin yerel RPC sunucusu.
+
+    Web worker'lari multiprocessing.connection ile baglanir; baglanti authkey
+    ile (HMAC challenge) dogrulanir. Her baglanti kendi thread'inde sirali
+    (hedef, metod, args, kwargs) isteklerini isler. Sadece exports'ta izin
+    verilen metodlar cagrilabilir:
+        exports = {'manager.lemanic3': (manager, ('read', '_write', 'status'))}
+    ValueError cagirana ValueError olarak doner (HTTP 400), diger hatalar
+    RuntimeError olarak.
+    """
+
+    def __init__(self, address, authkey, exports):
+        self.address = address
+        self.authkey = authkey
+        self.exports = exports
+        self.calls = 0
+        self.errors = 0
+        self._connections = 0
+        self._listener = None
+
+    def start(self):
+        self._listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self._accept_loop, name='ipc-accept', daemon=True).start()
+        logger.info(f"PLC I/O IPC sunucusu dinleniyor: {self.address[0]}:{self.address[1]}")
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.close()
+
+    def stats(self):
+        return {
+            'address': f"{self.address[0]}:{self.address[1]}",
+            'connections': self._connections,
+            'calls': self.calls,
+            'errors': self.errors,
+        }
+
+    def _accept_loop(self):
+        while True:
+            try:
+                connection = self._listener.accept()
+            except OSError:
+                # Dinleyici kapatildi
+                return
+            except Exception as e:
+                # Yanlis authkey veya yarim kalan el sikisma
+                logger.warning(f"IPC baglantisi reddedildi: {e}")
+                continue
+            threading.Thread(target=self._serve, args=(connection,), name='ipc-connection', daemon=True).start()
+
+    def _serve(self, connection):
+        self._connections += 1
+        try:
+            while True:
+                try:
+                    target, method, args, kwargs = connection.recv()
+                except (EOFError, OSError):
+                    return
+                connection.send(self._dispatch(target, method, args, kwargs))
+        finally:
+            self._connections -= 1
+            connection.close()
+
+    def _dispatch(self, target, method, args, kwargs):
+        self.calls += 1
+        try:
+            if target not in self.exports or method not in self.exports[target][1]:
+                raise ValueError(f"IPC uzerinden cagrilamaz: {target}.{method}")
+            return ('ok', getattr(self.exports[target][0], method)(*args, **kwargs))
+        except ValueError as e:
+            return ('error', 'value', str(e))
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"IPC cagrisi hatasi: {target}.{method} - {e}")
+            return ('error', 'runtime', str(e))
+
+
+class IPCClient:
+    """Web worker tarafi RPC istemcisi.
+
+    Baglantilar thread-safe olmadigi icin havuzda tutulur; her cagri bos bir
+    baglanti alir, yoksa yenisini acar. Cevap timeout icinde gelmezse
+    baglanti sirasi bozulmus sayilir ve kapatilir.
+    """
+
+    def __init__(self, address, authkey, timeout=10.0):
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+        self._pool = queue.LifoQueue()
+
+    def call(self, target, method, *args, **kwargs):
+        try:
+            connection = self._pool.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+        try:
+            connection.send((target, method, args, kwargs))
+            if not connection.poll(self.timeout):
+                raise TimeoutError("PLC I/O sureci cevap vermedi")
+            status, *payload = connection.recv()
+        except (OSError, EOFError) as e:
+            connection.close()
+            raise ConnectionError(f"PLC I/O sureci ile baglanti koptu: {e}")
+        self._pool.put(connection)
+
+        if status == 'ok':
+            return payload[0]
+        kind, message = payload
+        if kind == 'value':
+            raise ValueError(message)
+        raise RuntimeError(message)
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _connect(self):
+        try:
+            return Client(self.address, authkey=self.authkey)
+        except OSError as e:
+            raise ConnectionError(f"PLC I/O surecine baglanilamadi ({self.address[0]}:{self.address[1]}): {e}")
+        except AuthenticationError:
+            raise ConnectionError("PLC I/O sureci IPC anahtarini reddetti (PLC_IO_AUTHKEY / anahtar dosyasi farkli)")
+
+
+class RemoteObject:
+    """I/O surecindeki bir nesnenin vekili: metod cagrilari IPC istegine donusur."""
+
+    def __init__(self, client, target):
+        self._client = client
+        self._target = target
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return functools.partial(self._client.call, self._target, name)
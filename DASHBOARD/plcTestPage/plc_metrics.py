@@ -0,0 +1,167 @@
+import bisect
+import threading
+
+# Modbus ve HTTP gecikmeleri icin histogram sinirlari (saniye)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels.items())
+    if extra:
+        items.extend(extra.items())
+    if not items:
+        return ''
+    escaped = []
+    for key, value in items:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{key}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            labels = dict(zip(self.label_names, key))
+            lines.append(f'{self.name}{_format_labels(labels)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [bucket sayaclari..., +Inf], toplam
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        for key, (counts, total) in items:
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(labels, {"le": _format_value(float(bound))})} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {cumulative}')
+        return lines
+
+
+class Collector:
+    """Scrape aninda degeri hesaplanan metrik (baglanti durumu, kuyruk derinligi vb.)."""
+
+    def __init__(self, name, metric_type, help_text, callback):
+        self.name = name
+        self.metric_type = metric_type
+        self.help_text = help_text
+        self.callback = callback
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.metric_type}']
+        for labels, value in self.callback():
+            lines.append(f'{self.name}{_format_labels(labels)} {_format_value(value)}')
+        return lines
+
+
+class MetricsRegistry:
+    """Prometheus text formatinda (0.0.4) disari verilen metrik kaydi."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text, label_names=()):
+        return self._register(Counter(name, help_text, tuple(label_names)))
+
+    def histogram(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help_text, tuple(label_names), buckets))
+
+    def collector(self, name, metric_type, help_text, callback):
+        return self._register(Collector(name, metric_type, help_text, callback))
+
+    def render(self, only=None, exclude=None):
+        # only / exclude: metrik adi on ekleri (cok surecli calismada surecler kendi metriklerini verir)
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            if only and not metric.name.startswith(tuple(only)):
+                continue
+            if exclude and metric.name.startswith(tuple(exclude)):
+                continue
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metrik zaten kayitli: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+
+# Global metrik kaydi
+metrics = MetricsRegistry()
+
+MODBUS_LATENCY = metrics.histogram(
+    'plc_modbus_request_duration_seconds',
+    'Modbus istek-cevap suresi (function code bazinda)',
+    ('machine', 'function_code')
+)
+MODBUS_QUEUE_WAIT = metrics.histogram(
+    'plc_modbus_queue_wait_seconds',
+    'Istegin PLC baglantisinda slot bekleme suresi (oncelik sinifi bazinda)',
+    ('machine', 'priority')
+)
+MODBUS_ERRORS = metrics.counter(
+    'plc_modbus_errors_total',
+    'Modbus hatalari (hata tipine gore)',
+    ('machine', 'type')
+)
+HTTP_LATENCY = metrics.histogram(
+    'plc_http_request_duration_seconds',
+    'HTTP istek suresi (route bazinda)',
+    ('route', 'method')
+)
+HTTP_REQUESTS = metrics.counter(
+    'plc_http_requests_total',
+    'HTTP istek sayisi (route ve durum koduna gore)',
+    ('route', 'method', 'status')
+)
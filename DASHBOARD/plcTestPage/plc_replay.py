@@ -0,0 +1,316 @@
+import argparse
+import asyncio
+import bisect
+import logging
+import struct
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from modbus_capture import EVENT_CONNECT, EVENT_DISCONNECT, EVENT_REQUEST, EVENT_RESPONSE, read_capture
+from modbus_server import MBAP_HEADER, ModbusTcpServer, exception_pdu
+from plc_benchmark import percentile
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ILLEGAL_FUNCTION = 0x01
+
+# Kayittaki istek-cevap cifti; zamanlar mikrosaniye, response None ise PLC cevap vermemis
+Exchange = namedtuple('Exchange', 'time latency unit request response')
+
+# Function code -> imajdaki tablo
+READ_TABLES = {1: 'coils', 2: 'discrete_inputs', 3: 'holding_registers', 4: 'input_registers'}
+
+_START_COUNT = struct.Struct('>HH')
+_MASK = struct.Struct('>HHH')
+
+
+def load_exchanges(path, stream_name=None):
+    """Kayittan bir akisin istek-cevap ciftlerini zaman sirasiyla cikarir.
+
+    Cevaplar isteklere MBAP transaction id ile eslenir (pipeline'da sira
+    degisebilir). Baglanti koptugunda cevapsiz kalan istekler cevapsiz
+    (response=None) olarak tutulur; kayit kapanirken yolda olan istekler
+    atilir.
+    """
+    started_at, streams, records = read_capture(path)
+    if not streams:
+        raise ValueError(f"Kayitta akis yok: {path}")
+    if stream_name is None:
+        stream_name = streams[min(streams)]
+    matches = [stream for stream, name in streams.items() if name == stream_name]
+    if not matches:
+        raise ValueError(f"Kayitta akis yok: {stream_name} (mevcut: {', '.join(sorted(streams.values()))})")
+    stream_id = matches[0]
+
+    exchanges = []
+    pending = {}
+    connects = 0
+
+    def drop_pending():
+        for request_time, unit, pdu in pending.values():
+            exchanges.append(Exchange(request_time, None, unit, pdu, None))
+        pending.clear()
+
+    for timestamp, event, stream, payload in records:
+        if stream != stream_id:
+            continue
+        if event == EVENT_CONNECT:
+            connects += 1
+            drop_pending()
+        elif event == EVENT_DISCONNECT:
+            drop_pending()
+        elif event in (EVENT_REQUEST, EVENT_RESPONSE) and len(payload) > MBAP_HEADER.size:
+            transaction_id, _, _, unit = MBAP_HEADER.unpack_from(payload, 0)
+            pdu = payload[MBAP_HEADER.size:]
+            if event == EVENT_REQUEST:
+                pending[transaction_id] = (timestamp, unit, pdu)
+            elif transaction_id in pending:
+                request_time, unit, request = pending.pop(transaction_id)
+                exchanges.append(Exchange(request_time, timestamp - request_time, unit, request, pdu))
+    exchanges.sort(key=lambda exchange: exchange.time)
+    return started_at, stream_name, connects, exchanges
+
+
+def _unpack_bits(data, count):
+    return [bool(data[index // 8] >> (index % 8) & 1) for index in range(count)]
+
+
+def _pack_bits(values):
+    data = bytearray((len(values) + 7) // 8)
+    for index, value in enumerate(values):
+        if value:
+            data[index // 8] |= 1 << (index % 8)
+    return bytes(data)
+
+
+def image_updates(request, response):
+    """Basarili bir istek-cevap ciftinin PLC imajina etkisi: [(tablo, start, degerler)] veya FC22 icin maske."""
+    function_code = request[0]
+    if response is None or response[0] & 0x80:
+        return []
+    if function_code in (1, 2):
+        start, count = _START_COUNT.unpack_from(request, 1)
+        return [(READ_TABLES[function_code], start, _unpack_bits(response[2:], count))]
+    if function_code in (3, 4):
+        start, _ = _START_COUNT.unpack_from(request, 1)
+        count = response[1] // 2
+        return [(READ_TABLES[function_code], start, list(struct.unpack_from(f'>{count}H', response, 2)))]
+    return write_updates(request)
+
+
+def write_updates(request):
+    function_code = request[0]
+    if function_code == 5:
+        address, value = _START_COUNT.unpack_from(request, 1)
+        return [('coils', address, [value == 0xFF00])]
+    if function_code == 6:
+        address, value = _START_COUNT.unpack_from(request, 1)
+        return [('holding_registers', address, [value])]
+    if function_code == 15:
+        start, count = _START_COUNT.unpack_from(request, 1)
+        return [('coils', start, _unpack_bits(request[6:], count))]
+    if function_code == 16:
+        start, count = _START_COUNT.unpack_from(request, 1)
+        return [('holding_registers', start, list(struct.unpack_from(f'>{count}H', request, 6)))]
+    if function_code == 22:
+        return [('mask',) + _MASK.unpack_from(request, 1)]
+    return []
+
+
+class ReplayPLC:
+    """Kaydedilmis trafigi sahte PLC olarak geri oynatan ModbusTcpServer handler'i.
+
+    Zaman ilk istekle baslar ve speed katiyla ilerler. Kayitta ayni istek
+    (unit + PDU) varsa zamanca en yakin kaydin cevabi, kaydedilen gecikmeyle
+    (speed'e bolunerek) doner; kayitta cevapsiz kalmissa yine cevap verilmez.
+    Kayitta olmayan istekler (ornegin degistirilmis blok planlamasi) o anki
+    kayit zamanina kadar uygulanan okuma/yazma sonuclarindan kurulan imajdan
+    cevaplanir; gecikme olarak ayni function code'un zamanca en yakin
+    gecikmesi kullanilir. Imaj, her adres icin kayit boyunca ilk gorulen
+    degerle baslar; boylece ilk okuma cevabi zamani gelmeden yapilan
+    istekler de PLC'nin o andaki durumunu gorur. Kayitta hic okunmamis veya
+    yazilmamis adresler 0 (coil'ler False) doner. Ayni kayit ve ayni istek
+    zamanlamasi her seferinde ayni cevaplari uretir.
+    """
+
+    def __init__(self, exchanges, speed=1.0):
+        if speed <= 0:
+            raise ValueError("speed pozitif olmali")
+        if not exchanges:
+            raise ValueError("Kayitta istek yok")
+        self.speed = speed
+        self.first_time = exchanges[0].time
+        self.last_time = exchanges[-1].time
+        self._exact = {}
+        self._latencies = {}
+        timeline = []
+        for exchange in exchanges:
+            times, items = self._exact.setdefault((exchange.unit, exchange.request), ([], []))
+            times.append(exchange.time)
+            items.append(exchange)
+            if exchange.response is not None:
+                times, latencies = self._latencies.setdefault(exchange.request[0], ([], []))
+                times.append(exchange.time)
+                latencies.append(exchange.latency)
+                for update in image_updates(exchange.request, exchange.response):
+                    timeline.append((exchange.time + exchange.latency, update))
+        timeline.sort(key=lambda item: item[0])
+        self._timeline = timeline
+        self._cursor = 0
+        self._image = self._initial_image(timeline)
+        self._origin = None
+        self.stats = {'requests': 0, 'exact': 0, 'synthesized': 0, 'dropped': 0, 'unsupported': 0}
+
+    def capture_time(self):
+        # Kayit zaman ekseninde su an (mikrosaniye)
+        if self._origin is None:
+            self._origin = time.monotonic()
+        return self.first_time + (time.monotonic() - self._origin) * 1e6 * self.speed
+
+    async def handle(self, unit_id, pdu):
+        self.stats['requests'] += 1
+        now = self.capture_time()
+        self._advance(now)
+
+        candidates = self._exact.get((unit_id, bytes(pdu)))
+        if candidates is not None:
+            exchange = candidates[1][_nearest(candidates[0], now)]
+            self.stats['exact'] += 1
+            if exchange.response is None:
+                self.stats['dropped'] += 1
+                return None
+            self._apply(write_updates(pdu))
+            await asyncio.sleep(exchange.latency / 1e6 / self.speed)
+            return exchange.response
+
+        response = self._synthesize(pdu)
+        if response is None:
+            self.stats['unsupported'] += 1
+            return exception_pdu(pdu[0], ILLEGAL_FUNCTION)
+        self.stats['synthesized'] += 1
+        latencies = self._latencies.get(pdu[0])
+        if latencies:
+            await asyncio.sleep(latencies[1][_nearest(latencies[0], now)] / 1e6 / self.speed)
+        return response
+
+    def _synthesize(self, pdu):
+        function_code = pdu[0]
+        if function_code in READ_TABLES:
+            start, count = _START_COUNT.unpack_from(pdu, 1)
+            table = self._image[READ_TABLES[function_code]]
+            values = [table.get(start + offset, 0) for offset in range(count)]
+            if function_code in (1, 2):
+                data = _pack_bits(values)
+            else:
+                data = struct.pack(f'>{count}H', *values)
+            return bytes((function_code, len(data))) + data
+        updates = write_updates(pdu)
+        if not updates:
+            return None
+        self._apply(updates)
+        # Yazma cevaplari istegin basini tekrarlar
+        return bytes(pdu[:5]) if function_code in (15, 16) else bytes(pdu)
+
+    @staticmethod
+    def _initial_image(timeline):
+        # Her adresin kayittaki ilk degeri; FC22 maskesi tam degeri vermedigi icin atlanir
+        image = {table: {} for table in READ_TABLES.values()}
+        for _, update in timeline:
+            if update[0] == 'mask':
+                continue
+            table, start, values = update
+            for offset, value in enumerate(values):
+                image[table].setdefault(start + offset, value)
+        return image
+
+    def _advance(self, now):
+        while self._cursor < len(self._timeline) and self._timeline[self._cursor][0] <= now:
+            self._apply([self._timeline[self._cursor][1]])
+            self._cursor += 1
+
+    def _apply(self, updates):
+        for update in updates:
+            if update[0] == 'mask':
+                _, address, and_mask, or_mask = update
+                registers = self._image['holding_registers']
+                registers[address] = (registers.get(address, 0) & and_mask) | (or_mask & ~and_mask & 0xFFFF)
+                continue
+            table, start, values = update
+            image = self._image[table]
+            for offset, value in enumerate(values):
+                image[start + offset] = value
+
+
+def _nearest(times, now):
+    index = bisect.bisect_left(times, now)
+    if index >= len(times):
+        return len(times) - 1
+    if index > 0 and now - times[index - 1] <= times[index] - now:
+        return index - 1
+    return index
+
+
+def summarize(exchanges):
+    by_code = {}
+    for exchange in exchanges:
+        by_code.setdefault(exchange.request[0], []).append(exchange)
+    report = {}
+    for function_code, items in sorted(by_code.items()):
+        latencies = sorted(exchange.latency / 1000 for exchange in items if exchange.response is not None)
+        report[function_code] = {
+            'requests': len(items),
+            'dropped': sum(1 for exchange in items if exchange.response is None),
+            'exceptions': sum(1 for exchange in items if exchange.response is not None and exchange.response[0] & 0x80),
+            'p50': round(percentile(latencies, 0.50), 2),
+            'p90': round(percentile(latencies, 0.90), 2),
+            'p99': round(percentile(latencies, 0.99), 2),
+            'max': round(latencies[-1], 2) if latencies else 0.0,
+        }
+    return report
+
+
+async def serve(args, exchanges):
+    replay = ReplayPLC(exchanges, speed=args.speed)
+    server = ModbusTcpServer(replay.handle, args.host, args.port, serial=args.serial)
+    logger.info(
+        f"Kayit geri oynatiliyor: {len(exchanges)} istek, "
+        f"{(replay.last_time - replay.first_time) / 1e6:.1f} sn, hiz x{args.speed}"
+    )
+    try:
+        await server.serve_forever()
+    finally:
+        logger.info(f"Geri oynatma istatistikleri: {replay.stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EGEM Modbus trafik kaydini sahte PLC olarak geri oynatir')
+    parser.add_argument('capture', help='PLC server trafik kaydi (data/captures/*.bin)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=15020)
+    parser.add_argument('--speed', type=float, default=1.0, help='zaman ve gecikme hizlandirma kati')
+    parser.add_argument('--stream', default=None, help='kayittaki makine (varsayilan ilk makine)')
+    parser.add_argument('--serial', action='store_true', help='baglanti basina istekleri sirayla isle')
+    parser.add_argument('--summary', action='store_true', help='sadece kayit ozetini yaz')
+    args = parser.parse_args()
+
+    started_at, stream_name, connects, exchanges = load_exchanges(args.capture, args.stream)
+    if args.summary:
+        duration = (exchanges[-1].time - exchanges[0].time) / 1e6 if exchanges else 0.0
+        print(f"Kayit: {args.capture}  Makine: {stream_name}  Baslangic: {datetime.fromtimestamp(started_at).isoformat()}")
+        print(f"Istek: {len(exchanges)}  Sure: {duration:.1f} sn  Baglanti: {connects}")
+        for function_code, item in summarize(exchanges).items():
+            print(f"  FC{function_code:<3} istek {item['requests']:<7} cevapsiz {item['dropped']:<5} "
+                  f"exception {item['exceptions']:<5} gecikme (ms) p50 {item['p50']}  p90 {item['p90']}  "
+                  f"p99 {item['p99']}  max {item['max']}")
+        return
+
+    try:
+        asyncio.run(serve(args, exchanges))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
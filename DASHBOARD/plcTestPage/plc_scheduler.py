@@ -0,0 +1,90 @@
+import asyncio
+import collections
+
+# Trafik siniflari, yuksekten dusuge:
+#   command      operator/guvenlik yazmalari (yazma kuyrugu ve geri okumalari)
+#   interactive  HTTP okuma istekleri
+#   background   periyodik taramalar (SSE, gecmis, snapshot, keepalive)
+PRIORITY_CLASSES = ('command', 'interactive', 'background')
+
+
+class PriorityGate:
+    """Oturumun pipeline slotlarini oncelik sirasina gore dagitan kapi.
+
+    Bos slot acildiginda bekleyenlerden en yuksek oncelikli sinif alir;
+    ayni sinif icinde sira korunur. Calismakta olan bir istek kesilmez ama
+    kuyrukta bekleyen toplu okumalarin onune gecilir. Arka plan taramalari
+    iki yonden sinirlanir: ayni anda en fazla background_slots slot
+    kullanabilirler (pipeline'da yazmalara her zaman yer kalir) ve ust
+    siniflar yuzunden starvation_limit kez atlandiktan sonra bir slot
+    garanti alirlar.
+    """
+
+    def __init__(self, slots, background_slots=None, starvation_limit=8):
+        self.slots = slots
+        self.background_slots = background_slots or max(1, slots - 1)
+        self.starvation_limit = starvation_limit
+        self._busy = 0
+        self._busy_background = 0
+        self._background_skipped = 0
+        self._waiters = {priority: collections.deque() for priority in PRIORITY_CLASSES}
+        self.granted = {priority: 0 for priority in PRIORITY_CLASSES}
+
+    @property
+    def busy(self):
+        return self._busy
+
+    async def acquire(self, priority):
+        if priority not in self._waiters:
+            raise ValueError(f"Bilinmeyen oncelik sinifi: {priority}")
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(future)
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot verildikten sonra iptal edildi, slotu geri birak
+                self.release(priority)
+            elif future in self._waiters[priority]:
+                self._waiters[priority].remove(future)
+            raise
+
+    def release(self, priority):
+        self._busy -= 1
+        if priority == 'background':
+            self._busy_background -= 1
+        self._dispatch()
+
+    def waiting(self):
+        return {priority: len(waiters) for priority, waiters in self._waiters.items()}
+
+    def _dispatch(self):
+        while self._busy < self.slots:
+            priority = self._next()
+            if priority is None:
+                return
+            future = self._waiters[priority].popleft()
+            if future.done():
+                # Bekleyen iptal edilmis, slot bir sonrakine kalir
+                continue
+            self._busy += 1
+            if priority == 'background':
+                self._busy_background += 1
+            self.granted[priority] += 1
+            future.set_result(None)
+
+    def _next(self):
+        background = bool(self._waiters['background']) and self._busy_background < self.background_slots
+        if background and self._background_skipped >= self.starvation_limit:
+            self._background_skipped = 0
+            return 'background'
+        for priority in PRIORITY_CLASSES[:-1]:
+            if self._waiters[priority]:
+                if background:
+                    self._background_skipped += 1
+                return priority
+        if background:
+            self._background_skipped = 0
+            return 'background'
+        return None
@@ -1,82 +1,798 @@
 import os
 os.environ['FLASK_SKIP_DOTENV'] = '1'
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-from pymodbus.client import ModbusTcpClient
+import atexit
+import json
 import logging
+import queue
+import threading
+import time
 from datetime import datetime
 
+from plc_gateway import MachineRegistry, PLCGateway
+from modbus_blocks import read_block
+from snapshot_cache import SnapshotCache, TABLES
+from cov_stream import COVHub
+from plc_metrics import metrics, HTTP_LATENCY, HTTP_REQUESTS
+from signal_filter import RunStateMonitor, TransitionLog
+from plc_address import encode_value
+from tag_database import Tag, TagDatabase, to_engineering, to_raw
+from block_decoder import compile_decoders
+from audit_log import AuditLog
+from periodic_snapshots import PeriodicSnapshotCollector, SNAPSHOT_TYPES
+from tag_history import TagHistory, downsample, encode_binary
+from job_recipe import RecipeLayout
+from plc_image import IMAGE_TABLES, ImageLayout, ImagePublisher, ImageReader, ImageWriter
+from plc_ipc import IPCClient, IPCServer, RemoteObject, load_authkey
+from modbus_proxy import ModbusProxy
+from energy_meters import EnergyMeters
+from historian import TagHistorian
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)
 
-# PLC baglanti bilgileri
+# PLC baglanti bilgileri (machines.json yoksa kullanilir)
 PLC_IP = "192.168.0.104"
 PLC_PORT = 1502
 SLAVE_ID = 1
+DEFAULT_MACHINE = "lemanic3"
+
+# Makine kaydi dosyasi (PLC_MACHINES_FILE ile degistirilebilir)
+MACHINES_FILE = os.environ.get(
+    'PLC_MACHINES_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'machines.json')
+)
+
+# Sembolik etiket dosyasi (PLC_TAGS_FILE ile degistirilebilir)
+TAGS_FILE = os.environ.get(
+    'PLC_TAGS_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tags.json')
+)
+
+# Enerji analizoru / kalorimetre dosyasi (PLC_METERS_FILE ile degistirilebilir, yoksa sayac okunmaz)
+METERS_FILE = os.environ.get(
+    'PLC_METERS_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'meters.json')
+)
+
+# Calisma zamani verileri (gecis kaydi vb.)
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+os.makedirs(DATA_DIR, exist_ok=True)
+
+# Oturum ayarlari (saniye)
+PLC_TIMEOUT = 2.0
+PLC_KEEPALIVE_INTERVAL = 5.0
+PLC_BACKOFF_MAX = 30.0
+PLC_REQUEST_TIMEOUT = 5.0
+
+# Baglanti basina ayni anda cevap bekleyebilen Modbus istegi sayisi (1 = sirali)
+# ve yazmalardan sonra geri okuma; machines.json'da makine bazinda degistirilebilir
+PLC_PIPELINE_DEPTH = 1
+PLC_VERIFY_WRITES = False
+
+# Okuma cache'i tazelik suresi (saniye)
+SNAPSHOT_MAX_AGE = 0.5
+
+# Yazma kuyrugu birlestirme penceresi (saniye)
+WRITE_COALESCE_WINDOW = 0.01
+
+# Denetim kaydi group commit araligi (saniye)
+AUDIT_COMMIT_INTERVAL = 0.05
+
+# Degisiklik akisi (SSE) tarama araligi ve bos baglanti heartbeat suresi (saniye)
+COV_SCAN_INTERVAL = 0.2
+COV_HEARTBEAT_INTERVAL = 15.0
+
+# Cok surecli calisma (bkz. plc_io_worker.py):
+#   local  tek surec, PLC baglantisi bu surecte (varsayilan)
+#   io     PLC'ye baglanan tek surec; imaji yayinlar, IPC sunar
+#   web    web worker'i; PLC'ye baglanmaz, imajdan okur, IPC ile yazar
+PLC_IO_MODE = os.environ.get('PLC_IO_MODE', 'local')
+if PLC_IO_MODE not in ('local', 'io', 'web'):
+    raise ValueError(f"Gecersiz PLC_IO_MODE: {PLC_IO_MODE}")
+PLC_IO_ADDRESS = ('127.0.0.1', int(os.environ.get('PLC_IO_PORT', 5010)))
+# IPC anahtari: PLC_IO_AUTHKEY verilmezse I/O sureci bu dosyaya rastgele uretir, web worker'lari okur
+PLC_IO_AUTHKEY_FILE = os.environ.get('PLC_IO_AUTHKEY_FILE', os.path.join(DATA_DIR, 'plc_io.key'))
+PLC_IMAGE_NAME = os.environ.get('PLC_IMAGE_NAME', 'egem_plc_image')
+PLC_IMAGE_INTERVAL = 0.2
+
+# Modbus trafik kaydi (plc_replay.py ile geri oynatilir); PLC_CAPTURE_FILE verilirse acilista baslar
+CAPTURE_DIR = os.path.join(DATA_DIR, 'captures')
+PLC_CAPTURE_FILE = os.environ.get('PLC_CAPTURE_FILE')
+PLC_CAPTURE_MAX_MB = 256
+
+# Kalici etiket gecmisi ('history' blogunda archive: true olan makineler):
+# tampon bu kadar ornege ulasinca veya bu sure dolunca toplu yazilir;
+# bekleyen ornek HISTORIAN_MAX_PENDING'i gecerse sadece degisimler kaydedilir
+HISTORIAN_FILE = os.path.join(DATA_DIR, 'historian.db')
+HISTORIAN_FLUSH_ROWS = 5000
+HISTORIAN_FLUSH_INTERVAL = 5.0
+HISTORIAN_MAX_PENDING = 200000
+
+# Web worker'larinin kendi sundugu metrikler; digerleri I/O surecinden alinir
+WORKER_METRIC_PREFIXES = ('plc_http_', 'plc_stream_')
 
 class PLCManager:
-    def __init__(self):
-        self.client = None
+    def __init__(self, gateway, machine_key, audit_log=None):
+        self.gateway = gateway
+        self.machine_key = machine_key
+        self.audit_log = audit_log
+        self.snapshot = SnapshotCache(self.read_block, SNAPSHOT_MAX_AGE, self.read_blocks)
+        # I/O surecinde paylasilan imaj yayincisi; yazmalardan sonra imaj tazelenir
+        self.image = None
     
-    def connect(self):
-        try:
-            if self.client is None:
-                self.client = ModbusTcpClient(PLC_IP, port=PLC_PORT)
-            
-            if not self.client.is_socket_open():
-                self.client.connect()
-                logger.info(f"PLC'ye baglandi: {PLC_IP}:{PLC_PORT}")
-                return True
-            return True
-        except Exception as e:
-            logger.error(f"PLC baglanti hatasi: {e}")
-            self.client = None
-            return False
-    
-    def write_coil(self, address, value):
-        try:
-            if not self.connect():
-                return False, "PLC baglantisi kurulamadi"
-            
-            result = self.client.write_coil(address, value, unit=SLAVE_ID)
-            
-            if result.isError():
-                logger.error(f"Bit yazma hatasi: {result}")
-                self.client = None
-                return False, f"Bit yazma hatasi: {result}"
-            
-            logger.info(f"Bit yazildi: coil {address} = {value}")
-            return True, "Basari"
-            
-        except Exception as e:
-            logger.error(f"Genel hata: {e}")
-            self.client = None
-            return False, f"Genel hata: {e}"
-
-# Global PLC manager
-plc_manager = PLCManager()
+    def execute(self, operation, priority='interactive'):
+        return self.gateway.call(self.machine_key, operation, priority=priority)
+    
+    def status(self):
+        return self.gateway.session(self.machine_key).status()
+    
+    def write_stats(self):
+        return self.gateway.write_queue(self.machine_key).stats()
+    
+    def read_block(self, table, start, count, priority='interactive'):
+        success, result = self.execute(
+            lambda client, slave: getattr(client, 'read_' + table)(start, count, slave=slave), priority
+        )
+        
+        if not success:
+            logger.error(f"Okuma hatasi: {table} {start}-{start + count - 1} - {result}")
+            return False, result
+        
+        if table in ('coils', 'discrete_inputs'):
+            return True, result.bits[:count]
+        return True, result.registers[:count]
+    
+    def read_blocks(self, table, blocks, priority='interactive'):
+        # Bloklar oturuma birlikte verilir; pipeline acikse istekler ust uste biner
+        results = self.gateway.call_many(self.machine_key, [
+            read_block(table, start, count) for start, count in blocks
+        ], priority=priority)
+        
+        values = []
+        for (start, count), (success, result) in zip(blocks, results):
+            if not success:
+                logger.error(f"Okuma hatasi: {table} {start}-{start + count - 1} - {result}")
+                values.append((False, result))
+            elif table in ('coils', 'discrete_inputs'):
+                values.append((True, result.bits[:count]))
+            else:
+                values.append((True, result.registers[:count]))
+        return values
+    
+    def read(self, table, addresses, max_age=None, priority='interactive'):
+        # priority: HTTP okumalari 'interactive', periyodik taramalar 'background'
+        return self.snapshot.read(table, addresses, max_age, priority)
+    
+    def read_arrays(self, table, blocks, max_age=None, priority='interactive'):
+        # [(start, count)] -> [(array('H') veya None, hata)], en eski snapshot yasi
+        return self.snapshot.read_arrays(table, blocks, max_age, priority)
+    
+    def write_coil(self, address, value, source=None):
+        results, _ = self.write_coils([(address, value)], source)
+        return results[address]
+    
+    def write_coils(self, writes, source=None, verify=False):
+        # Yazmalar makinenin yazma kuyruguna gider; ayni anda gelen yazmalar
+        # birlesir ve ardisik coil'ler tek write_coils istegine toplanir
+        # Sonuc: {coil: (success, message)}, kullanilan Modbus islem sayisi
+        writes = [(address, bool(value)) for address, value in writes]
+        return self._write('coils', writes, source, verify)
+    
+    def write_registers(self, writes, source=None, verify=False):
+        # Ardisik register'lar tek write_registers istegine toplanir
+        # Sonuc: {register: (success, message)}, kullanilan Modbus islem sayisi
+        writes = [(address, int(value) & 0xFFFF) for address, value in writes]
+        return self._write('holding_registers', writes, source, verify)
+    
+    def write_register_bits(self, writes, source=None, verify=False):
+        # Word icindeki bitler okuma-degistirme-yazma yerine tek Mask Write
+        # Register (FC22) ile yazilir; ayni register'in bitleri tek maskede birlesir
+        # Sonuc: {(register, bit): (success, message)}, kullanilan Modbus islem sayisi
+        writes = [((register, bit), bool(value)) for register, bit, value in writes]
+        return self._write('register_bits', writes, source, verify)
+    
+    def write_values(self, writes, source=None, verify=False):
+        # [(PlcAddress, deger)] -> ([(success, message, verified)], islem sayisi)
+        # verified: geri okuma kapaliysa None, aciksa tum register'lar eslesti mi
+        # verify=True makinenin verify_writes ayarindan bagimsiz geri okuma ister
+        # Tipli degerlerin tum register'lari ayni write_registers isteginde gider
+        coils, registers, bits = [], [], []
+        for plc_address, value in writes:
+            if plc_address.area == 'coil':
+                coils.append((plc_address.address, value))
+            elif plc_address.area == 'register_bit':
+                bits.append((plc_address.address, plc_address.bit, value))
+            else:
+                encoded = encode_value(plc_address.data_type, value)
+                registers.extend((plc_address.address + offset, word) for offset, word in enumerate(encoded))
+        
+        results = {}
+        transactions = 0
+        if coils:
+            coil_results, count = self.write_coils(coils, source, verify)
+            results.update((('coil', key), result) for key, result in coil_results.items())
+            transactions += count
+        if registers:
+            register_results, count = self.write_registers(registers, source, verify)
+            results.update((('register', key), result) for key, result in register_results.items())
+            transactions += count
+        if bits:
+            bit_results, count = self.write_register_bits(bits, source, verify)
+            results.update((('register_bit', key), result) for key, result in bit_results.items())
+            transactions += count
+        
+        outcome = []
+        for plc_address, _ in writes:
+            if plc_address.area == 'coil':
+                keys = [('coil', plc_address.address)]
+            elif plc_address.area == 'register_bit':
+                keys = [('register_bit', (plc_address.address, plc_address.bit))]
+            else:
+                keys = [('register', plc_address.address + offset) for offset in range(plc_address.count)]
+            failed = [results[key] for key in keys if not results[key][0]]
+            if failed:
+                outcome.append(failed[0])
+                continue
+            checks = [results[key][2] for key in keys]
+            verified = None if None in checks else all(checks)
+            outcome.append((True, "Basari" if verified is not False else "Geri okunan deger farkli", verified))
+        return outcome, transactions
+    
+    def read_values(self, plc_addresses, max_age=None, priority='interactive'):
+        # Tipli adresleri okur: {adres metni: deger}, {adres metni: hata}, en eski snapshot yasi
+        # Register adresleri blok planina gore okunur, her blok tek BlockDecoder gecisinde cozulur
+        coils = [a.address for a in plc_addresses if a.area == 'coil']
+        coil_values, coil_errors, age = self.read('coils', coils, max_age, priority) if coils else ({}, {}, 0.0)
+        
+        decoders = _block_decoders(plc_addresses)
+        decoded = {}
+        errors = {}
+        register_age = 0.0
+        if decoders:
+            blocks, register_age = self.read_arrays(
+                'holding_registers', [(decoder.start, decoder.count) for decoder in decoders], max_age, priority
+            )
+            for decoder, (registers, error) in zip(decoders, blocks):
+                if registers is None:
+                    errors.update(dict.fromkeys(decoder.names, error or "Okunamadi"))
+                else:
+                    decoded.update(zip(decoder.names, decoder.decode(registers)))
+        
+        values = {}
+        for plc_address in plc_addresses:
+            text = plc_address.text
+            if plc_address.area == 'coil':
+                if plc_address.address in coil_values:
+                    values[text] = coil_values[plc_address.address]
+                else:
+                    errors[text] = coil_errors.get(plc_address.address, "Okunamadi")
+            elif text in decoded:
+                value = decoded[text]
+                values[text] = bool(value) if plc_address.area == 'register_bit' else (
+                    value if plc_address.data_type == 'REAL' else int(value)
+                )
+        return values, errors, max(age, register_age)
+    
+    def _write(self, table, writes, source, verify=False):
+        # Eski deger denetim kaydi icin cache'ten alinir; yazma yoluna PLC okumasi eklenmez
+        old_values = self._known_values(table, [address for address, _ in writes]) if self.audit_log else {}
+        started = time.perf_counter()
+        acks = self.gateway.write(self.machine_key, table, writes, verify=verify)
+        latency = time.perf_counter() - started
+        results = self._apply_acks(table, writes, acks, old_values, source, latency)
+        if self.image is not None:
+            self.image.refresh(self.machine_key)
+        return results
+    
+    def _known_values(self, table, addresses):
+        if table != 'register_bits':
+            return self.snapshot.peek(table, addresses)
+        registers = self.snapshot.peek('holding_registers', [register for register, _ in addresses])
+        return {
+            (register, bit): bool(registers[register] >> bit & 1)
+            for register, bit in addresses if register in registers
+        }
+    
+    def _apply_acks(self, table, writes, acks, old_values=None, source=None, latency=None):
+        results = {}
+        transactions = set()
+        for (address, value), ack in zip(writes, acks):
+            verified = ack.get('verified')
+            results[address] = (ack['success'], ack['message'], verified)
+            if ack['transaction'] is not None:
+                transactions.add(ack['transaction'])
+            label = self._write_label(table, address)
+            if ack['success']:
+                if table == 'register_bits':
+                    # Maske sonucu register'in diger bitlerini bilmiyoruz, sonraki okuma tazelesin
+                    self.snapshot.invalidate('holding_registers', [address[0]])
+                elif verified is False:
+                    # PLC degeri kabul etmedi veya hemen degistirdi; cache geri okunani tutar
+                    self.snapshot.update(table, {address: ack['read_back']})
+                else:
+                    self.snapshot.update(table, {address: ack['value']})
+                if not ack['superseded']:
+                    logger.info(f"{'Register' if table == 'holding_registers' else 'Bit'} yazildi: {label} = {ack['value']}")
+                    if self.audit_log:
+                        self.audit_log.append({
+                            'machine': self.machine_key,
+                            'table': table,
+                            'address': address if table != 'register_bits' else f"{address[0]}.{address[1]}",
+                            'old': (old_values or {}).get(address),
+                            'new': ack['value'],
+                            'source': source,
+                            'latency_ms': round(latency * 1000, 2) if latency is not None else None,
+                            'transaction': ack['transaction'],
+                        })
+            else:
+                logger.error(f"Yazma hatasi: {label} - {ack['message']}")
+        return results, len(transactions)
+    
+    @staticmethod
+    def _write_label(table, address):
+        if table == 'coils':
+            return f"coil {address}"
+        if table == 'register_bits':
+            return f"register {address[0]}.{address[1]}"
+        return f"register {address}"
+
+# read_values'in derlenmis decoder'lari: BlockDecoder durum tuttugu icin thread basina,
+# ayni adres kumesi (ayni etiket listesi/istek) tekrar derlenmez
+_decoder_cache = threading.local()
+DECODER_CACHE_SIZE = 64
+
+def _block_decoders(plc_addresses):
+    key = tuple(a.text for a in plc_addresses if a.area != 'coil')
+    if not key:
+        return []
+    cache = getattr(_decoder_cache, 'decoders', None)
+    if cache is None:
+        cache = _decoder_cache.decoders = {}
+    decoders = cache.get(key)
+    if decoders is None:
+        if len(cache) >= DECODER_CACHE_SIZE:
+            cache.clear()
+        unique = {a.text: a for a in plc_addresses if a.area != 'coil'}
+        decoders = cache[key] = compile_decoders(
+            [Tag(text, address, 1.0, 0.0, '', False, '') for text, address in unique.items()],
+            max_gap=TABLES['holding_registers'][1]
+        )
+    return decoders
+
+class RemotePLCManager(PLCManager):
+    """Web worker'indaki PLC manager: PLC'ye kendisi baglanmaz.
+    
+    Okumalar I/O surecinin paylasilan bellek imajindan kopyalamadan yapilir;
+    imajda olmayan veya istenen tazelikten eski adresler ile yazmalar IPC
+    uzerinden I/O surecindeki PLCManager'a gider. Yazmalar orada tek yazma
+    kuyrugunda birlesir, denetim kaydi da orada tutulur.
+    """
+    
+    def __init__(self, client, machine_key, image):
+        self.machine_key = machine_key
+        self.audit_log = None
+        self.image = image
+        self.remote = RemoteObject(client, f'manager.{machine_key}')
+        self.snapshot = RemoteObject(client, f'snapshot.{machine_key}')
+    
+    def status(self):
+        return self.remote.status()
+    
+    def write_stats(self):
+        return self.remote.write_stats()
+    
+    def read(self, table, addresses, max_age=None, priority='interactive'):
+        if max_age is None:
+            max_age = SNAPSHOT_MAX_AGE
+        if table in IMAGE_TABLES and addresses:
+            result = self.image.read(self.machine_key, table, addresses)
+            if result is not None:
+                values, updated_at = result
+                age = max(0.0, time.time() - updated_at)
+                if age <= max_age:
+                    return values, {}, age
+        return self.remote.read(table, addresses, max_age, priority)
+    
+    def read_arrays(self, table, blocks, max_age=None, priority='interactive'):
+        # Imajdaki taze bloklar seqlock altinda tek kopyayla alinir, digerleri tek IPC cagrisinda
+        if max_age is None:
+            max_age = SNAPSHOT_MAX_AGE
+        found = [None] * len(blocks)
+        oldest = 0.0
+        if table in IMAGE_TABLES:
+            for index, (start, count) in enumerate(blocks):
+                result = self.image.read_block(self.machine_key, table, start, count)
+                if result is not None:
+                    registers, updated_at = result
+                    age = max(0.0, time.time() - updated_at)
+                    if age <= max_age:
+                        found[index] = (registers, None)
+                        oldest = max(oldest, age)
+        missing = [index for index, item in enumerate(found) if item is None]
+        if missing:
+            remote, age = self.remote.read_arrays(table, [blocks[index] for index in missing], max_age, priority)
+            for index, item in zip(missing, remote):
+                found[index] = item
+            oldest = max(oldest, age)
+        return found, oldest
+    
+    def _write(self, table, writes, source, verify=False):
+        return self.remote._write(table, writes, source, verify)
+
+# Global makine kaydi, etiket tablosu, gateway ve makine basina PLC manager
+tag_db = TagDatabase.load(TAGS_FILE)
+machine_registry = MachineRegistry.load(MACHINES_FILE, DEFAULT_MACHINE, PLC_IP, PLC_PORT, SLAVE_ID)
+def machine_blocks(name):
+    # machines.json'da name blogu olan ve kapatilmamis makineler: {makine: blok}
+    blocks = {}
+    for key in machine_registry.keys():
+        _, config = machine_registry.get(key)
+        if config.get(name) and config[name].get('enabled', True):
+            blocks[key] = config[name]
+    return blocks
+
+def plc_io_authkey(create):
+    # Ortam degiskeni (tum sureclerde ayni olmali) veya I/O surecinin urettigi anahtar dosyasi
+    if os.environ.get('PLC_IO_AUTHKEY'):
+        return os.environ['PLC_IO_AUTHKEY'].encode()
+    return load_authkey(PLC_IO_AUTHKEY_FILE, create=create)
+
+# Cok surecli calismada her iki tarafin da hesapladigi paylasilan imaj yerlesimi
+image_layout = None
+image_publisher = None
+if PLC_IO_MODE != 'local':
+    image_layout = ImageLayout.from_config(
+        {key: machine_registry.get(key)[1] for key in machine_registry.keys()}, tag_db
+    )
+
+if PLC_IO_MODE == 'web':
+    # Web worker'i: PLC baglantisi ve arka plan servisleri I/O surecinde calisir.
+    # Okumalar paylasilan imajdan, yazmalar ve diger cagrilar IPC ile I/O surecine gider.
+    io_client = IPCClient(PLC_IO_ADDRESS, plc_io_authkey(create=False), timeout=PLC_REQUEST_TIMEOUT * 2)
+    plc_image = ImageReader(PLC_IMAGE_NAME, image_layout)
+    atexit.register(plc_image.close)
+    image_publisher = RemoteObject(io_client, 'image')
+    plc_gateway = RemoteObject(io_client, 'gateway')
+    audit_log = RemoteObject(io_client, 'audit_log')
+    plc_managers = {key: RemotePLCManager(io_client, key, plc_image) for key in machine_registry.keys()}
+    run_state_transitions = RemoteObject(io_client, 'run_state_transitions')
+    run_state_monitors = {key: RemoteObject(io_client, f'run_state.{key}') for key in machine_blocks('debounce')}
+    periodic_snapshots = RemoteObject(io_client, 'periodic_snapshots') if machine_blocks('snapshots') else None
+    tag_histories = {key: RemoteObject(io_client, f'history.{key}') for key in machine_blocks('history')}
+    modbus_proxies = {key: RemoteObject(io_client, f'proxy.{key}') for key in machine_blocks('proxy')}
+    energy_meters = RemoteObject(io_client, 'energy_meters') if os.path.exists(METERS_FILE) else None
+    historian = (
+        RemoteObject(io_client, 'historian')
+        if any(config.get('archive') for config in machine_blocks('history').values()) else None
+    )
+else:
+    plc_gateway = PLCGateway(
+        machine_registry,
+        request_timeout=PLC_REQUEST_TIMEOUT,
+        write_window=WRITE_COALESCE_WINDOW,
+        pipeline_depth=PLC_PIPELINE_DEPTH,
+        verify_writes=PLC_VERIFY_WRITES,
+        timeout=PLC_TIMEOUT,
+        keepalive_interval=PLC_KEEPALIVE_INTERVAL,
+        backoff_max=PLC_BACKOFF_MAX
+    )
+    plc_gateway.start()
+    if PLC_CAPTURE_FILE:
+        plc_gateway.start_capture(PLC_CAPTURE_FILE, PLC_CAPTURE_MAX_MB * 1024 * 1024)
+    
+    # Basarili PLC yazmalarinin kalici denetim kaydi
+    audit_log = AuditLog(os.path.join(DATA_DIR, 'audit'), commit_interval=AUDIT_COMMIT_INTERVAL)
+    plc_managers = {key: PLCManager(plc_gateway, key, audit_log) for key in machine_registry.keys()}
+    
+    # Hiz sinyali debounce motorlari (machines.json'da 'debounce' blogu olan makineler)
+    run_state_transitions = TransitionLog(os.path.join(DATA_DIR, 'run_state_transitions.jsonl'))
+    run_state_monitors = {}
+    for key, debounce_config in machine_blocks('debounce').items():
+        run_state_monitors[key] = RunStateMonitor(key, plc_managers[key], debounce_config, run_state_transitions)
+        run_state_monitors[key].start()
+    
+    # Donem sinirlarinda sayac snapshot'lari (machines.json'da 'snapshots' blogu olan makineler)
+    snapshot_configs = machine_blocks('snapshots')
+    periodic_snapshots = None
+    if snapshot_configs:
+        periodic_snapshots = PeriodicSnapshotCollector(
+            os.path.join(DATA_DIR, 'periodic_snapshots.db'), plc_managers, tag_db, snapshot_configs
+        )
+        periodic_snapshots.start()
+    
+    # Trend grafikleri icin bellekte kisa sureli gecmis (machines.json'da 'history' blogu olan makineler)
+    historian = None
+    if any(config.get('archive') for config in machine_blocks('history').values()):
+        historian = TagHistorian(
+            HISTORIAN_FILE,
+            flush_rows=HISTORIAN_FLUSH_ROWS,
+            flush_interval=HISTORIAN_FLUSH_INTERVAL,
+            max_pending=HISTORIAN_MAX_PENDING
+        )
+        atexit.register(historian.close)
+    tag_histories = {}
+    for key, history_config in machine_blocks('history').items():
+        tag_histories[key] = TagHistory(key, plc_managers[key], tag_db, history_config, historian)
+        tag_histories[key].start()
+    
+    # Asagi yondeki Modbus istemcileri icin coklayici proxy (machines.json'da 'proxy' blogu olan makineler)
+    modbus_proxies = {}
+    for key, proxy_config in machine_blocks('proxy').items():
+        modbus_proxies[key] = ModbusProxy(
+            plc_managers[key],
+            host=proxy_config.get('host', '0.0.0.0'),
+            port=int(proxy_config['port']),
+            max_age=float(proxy_config.get('max_age', SNAPSHOT_MAX_AGE))
+        )
+        modbus_proxies[key].start(plc_gateway.loop)
+    
+    # Enerji analizorleri ve kalorimetreler (meters.json varsa), kendi oturumlarinda
+    energy_meters = None
+    if os.path.exists(METERS_FILE):
+        energy_meters = EnergyMeters.load(
+            METERS_FILE,
+            request_timeout=PLC_REQUEST_TIMEOUT,
+            timeout=PLC_TIMEOUT,
+            keepalive_interval=PLC_KEEPALIVE_INTERVAL,
+            backoff_max=PLC_BACKOFF_MAX
+        )
+        energy_meters.start()
+
+if PLC_IO_MODE == 'io':
+    # PLC I/O sureci: son tag imajini paylasilan bellege yayinlar, web worker'larina IPC sunar
+    image_writer = ImageWriter(PLC_IMAGE_NAME, image_layout)
+    atexit.register(image_writer.close)
+    image_publisher = ImagePublisher(image_writer, plc_managers, PLC_IMAGE_INTERVAL)
+    for manager in plc_managers.values():
+        manager.image = image_publisher
+    image_publisher.start()
+    
+    io_exports = {
+        'gateway': (plc_gateway, ('status', 'start_capture', 'stop_capture', 'capture_stats')),
+        'audit_log': (audit_log, ('query', 'stats')),
+        'run_state_transitions': (run_state_transitions, ('recent',)),
+        'metrics': (metrics, ('render',)),
+        'image': (image_publisher, ('stats',)),
+    }
+    if periodic_snapshots is not None:
+        io_exports['periodic_snapshots'] = (periodic_snapshots, ('query', 'stats'))
+    for key, manager in plc_managers.items():
+        io_exports[f'manager.{key}'] = (manager, ('read', 'read_arrays', '_write', 'status', 'write_stats'))
+        io_exports[f'snapshot.{key}'] = (manager.snapshot, ('stats',))
+    for key, monitor in run_state_monitors.items():
+        io_exports[f'run_state.{key}'] = (monitor, ('status', 'configure'))
+    for key, history in tag_histories.items():
+        io_exports[f'history.{key}'] = (history, ('since', 'stats'))
+    for key, proxy in modbus_proxies.items():
+        io_exports[f'proxy.{key}'] = (proxy, ('stats',))
+    if energy_meters is not None:
+        io_exports['energy_meters'] = (energy_meters, ('status',))
+    if historian is not None:
+        io_exports['historian'] = (historian, ('query', 'stats'))
+    io_server = IPCServer(PLC_IO_ADDRESS, plc_io_authkey(create=True), io_exports)
+    io_server.start()
+
+def get_plc_manager(machine_key=None):
+    key, _ = machine_registry.get(machine_key)
+    return plc_managers[key]
+
+# Degisiklik akisi aboneleri icin merkezi tarayici (web worker'larinda imaji tarar)
+cov_hub = COVHub(get_plc_manager, scan_interval=COV_SCAN_INTERVAL)
+
+# Is pasaportu recete blogu (machines.json'da 'recipe' blogu olan makineler)
+recipe_layouts = {}
+for key in machine_registry.keys():
+    _, config = machine_registry.get(key)
+    if config.get('recipe'):
+        recipe_layouts[key] = RecipeLayout.from_config(config['recipe'])
+
+def get_recipe_layout(machine_key=None):
+    key, _ = machine_registry.get(machine_key)
+    if key not in recipe_layouts:
+        raise ValueError(f"Makine icin recete blogu tanimli degil: {key}")
+    return recipe_layouts[key]
+
+def get_run_state_monitor(machine_key=None):
+    key, _ = machine_registry.get(machine_key)
+    if key not in run_state_monitors:
+        raise ValueError(f"Makine icin debounce tanimli degil: {key}")
+    return run_state_monitors[key]
+
+# Scrape aninda okunan metrikler
+metrics.collector(
+    'plc_connection_up', 'gauge', 'PLC baglantisi acik mi (1/0)',
+    lambda: [({'machine': key}, 1 if session.state == 'connected' else 0) for key, session in plc_gateway.sessions.items()]
+)
+metrics.collector(
+    'plc_reconnects_total', 'counter', 'Kopan baglantidan sonra yeniden baglanma sayisi',
+    lambda: [({'machine': key}, session.reconnect_count) for key, session in plc_gateway.sessions.items()]
+)
+metrics.collector(
+    'plc_modbus_waiting', 'gauge', 'Oturum slotu bekleyen Modbus istekleri (oncelik sinifina gore)',
+    lambda: [
+        ({'machine': key, 'priority': priority}, count)
+        for key, session in plc_gateway.sessions.items()
+        for priority, count in session.status()['waiting'].items()
+    ]
+)
+metrics.collector(
+    'plc_write_queue_depth', 'gauge', 'Yazma kuyrugunda bekleyen yazma sayisi',
+    lambda: [({'machine': key}, write_queue.stats()['pending_writes']) for key, write_queue in plc_gateway.write_queues.items()]
+)
+metrics.collector(
+    'plc_write_queue_in_flight', 'gauge', 'PLC cevabi beklenen kuyruk islemleri',
+    lambda: [({'machine': key}, write_queue.stats()['in_flight']) for key, write_queue in plc_gateway.write_queues.items()]
+)
+metrics.collector(
+    'plc_write_coalesced_total', 'counter', 'Birlestirilerek PLC\'ye gitmeyen yazmalar',
+    lambda: [({'machine': key}, write_queue.coalesced) for key, write_queue in plc_gateway.write_queues.items()]
+)
+metrics.collector(
+    'plc_write_verify_mismatches_total', 'counter', 'Geri okumada yazilan degerden farkli cikan adresler',
+    lambda: [({'machine': key}, write_queue.verify_mismatches) for key, write_queue in plc_gateway.write_queues.items()]
+)
+metrics.collector(
+    'plc_snapshot_scans_total', 'counter', 'Snapshot cache icin yapilan PLC taramalari',
+    lambda: [({'machine': key}, manager.snapshot.scan_count) for key, manager in plc_managers.items()]
+)
+metrics.collector(
+    'plc_stream_subscriptions', 'gauge', 'Aktif SSE abonelikleri',
+    lambda: [({}, len(cov_hub.stats()['subscriptions']))]
+)
+metrics.collector(
+    'plc_audit_pending', 'gauge', 'Diske yazilmayi bekleyen denetim kayitlari',
+    lambda: [({}, audit_log.stats()['pending'])]
+)
+metrics.collector(
+    'plc_audit_fsyncs_total', 'counter', 'Denetim kaydi icin yapilan fsync sayisi',
+    lambda: [({}, audit_log.fsyncs)]
+)
+metrics.collector(
+    'plc_audit_dropped_total', 'counter', 'Tampon dolunca atilan denetim kayitlari',
+    lambda: [({}, audit_log.stats()['dropped'])]
+)
+metrics.collector(
+    'plc_proxy_clients', 'gauge', 'Modbus proxy\'ye bagli istemciler',
+    lambda: [({'machine': key}, proxy.server.active_connections) for key, proxy in modbus_proxies.items()]
+)
+metrics.collector(
+    'plc_historian_pending', 'gauge', 'Historian\'da diske yazilmayi bekleyen ornekler',
+    lambda: [({}, historian.stats()['pending'])] if historian is not None else []
+)
+metrics.collector(
+    'plc_historian_change_only', 'gauge', 'Historian geri basinc nedeniyle sadece degisimleri mi kaydediyor (1/0)',
+    lambda: [({}, 1 if historian.change_only else 0)] if historian is not None else []
+)
+metrics.collector(
+    'plc_historian_suppressed_total', 'counter', 'Geri basinc sirasinda kaydedilmeyen degismemis ornekler',
+    lambda: [({}, historian.suppressed)] if historian is not None else []
+)
+metrics.collector(
+    'plc_historian_dropped_total', 'counter', 'Tampon dolu oldugu icin atilan ornekler',
+    lambda: [({}, historian.dropped)] if historian is not None else []
+)
+metrics.collector(
+    'plc_meter_power_kw', 'gauge', 'Sayacin son okunan gucu (kW)',
+    lambda: [
+        ({'meter': key, 'machine': meter.machine}, meter.power)
+        for key, meter in (energy_meters.meters.items() if energy_meters is not None else ())
+        if meter.power is not None
+    ]
+)
+metrics.collector(
+    'plc_meter_energy_kwh_total', 'counter', 'Sunucu basladigindan beri entegre edilen enerji (kWh)',
+    lambda: [
+        ({'meter': key, 'machine': meter.machine}, meter.energy)
+        for key, meter in (energy_meters.meters.items() if energy_meters is not None else ())
+    ]
+)
+metrics.collector(
+    'plc_meter_read_failures_total', 'counter', 'Basarisiz sayac okumalari',
+    lambda: [
+        ({'meter': key, 'machine': meter.machine}, meter.failures)
+        for key, meter in (energy_meters.meters.items() if energy_meters is not None else ())
+    ]
+)
+metrics.collector(
+    'plc_proxy_requests_total', 'counter', 'Modbus proxy\'nin cevapladigi istekler',
+    lambda: [({'machine': key}, proxy.server.request_count) for key, proxy in modbus_proxies.items()]
+)
+
+metrics.collector(
+    'plc_machine_running', 'gauge', 'Debounce sonrasi makine calisiyor mu (1/0)',
+    lambda: [({'machine': key}, 0 if monitor.debouncer.stopped else 1) for key, monitor in run_state_monitors.items()]
+)
+metrics.collector(
+    'plc_speed_samples_rejected_total', 'counter', 'Filtrede reddedilen hiz ornekleri',
+    lambda: [({'machine': key}, monitor.filter.rejected) for key, monitor in run_state_monitors.items()]
+)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = getattr(g, 'request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_LATENCY.observe(time.perf_counter() - started, route=route, method=request.method)
+        HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    return response
 
 def parse_address(address_string):
+    # Coil adresi: etiket adi, DB1.DBX0.0 veya direkt coil numarasi
+    plc_address = tag_db.lookup(address_string).address
+    if plc_address.area != 'coil':
+        raise ValueError(f"Coil adresi degil: {address_string}")
+    return plc_address.address
+
+def parse_write_tag(address_string):
+    tag = tag_db.lookup(address_string)
+    if not tag.writable:
+        raise ValueError(f"Etiket salt okunur: {address_string}")
+    return tag
+
+def parse_bit_address(address_string):
+    # Bit yazma adresi: coil veya word icindeki bit (DB1.DBW10.3)
+    tag = parse_write_tag(address_string)
+    if tag.address.area == 'register':
+        raise ValueError(f"Bit adresi degil: {address_string}")
+    return tag
+
+def request_source(data):
+    # Denetim kaydi icin yazmayi yapan: istemcinin verdigi 'source' veya IP adresi
+    source = data.get('source') if isinstance(data, dict) else None
+    return str(source) if source else request.remote_addr
+
+def parse_time(value):
+    # Unix zamani (sn), ISO 8601 veya sifir/negatif ise simdiden geriye saniye (-600: son 10 dk)
+    if value is None or value == '':
+        return None
     try:
-        # DB1.DBX0.0 formatindan parse et
-        if 'DB' in address_string and 'DBX' in address_string:
-            parts = address_string.split('.')
-            if len(parts) == 3:
-                db_num = int(parts[0].replace('DB', ''))
-                byte_offset = int(parts[1].replace('DBX', ''))
-                bit_offset = int(parts[2])
-                coil_address = (db_num - 1) * 100 + byte_offset * 8 + bit_offset
-                return coil_address
-        
-        # Eger sadece sayi ise direkt kullan
-        return int(address_string)
-        
-    except Exception as e:
-        raise ValueError(f"Gecersiz adres formati: {address_string} - {e}")
+        seconds = float(value)
+    except ValueError:
+        pass
+    else:
+        return time.time() + seconds if seconds <= 0 else seconds
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f"Gecersiz zaman: {value}")
+
+def describe_address(plc_address):
+    if plc_address.area == 'coil':
+        return {'coil_address': plc_address.address}
+    if plc_address.area == 'register_bit':
+        return {'register': plc_address.address, 'bit': plc_address.bit}
+    return {'register': plc_address.address, 'count': plc_address.count, 'type': plc_address.data_type}
+
+def check_modbus_address(address, address_string):
+    # Modbus adres alani 16 bit
+    if not 0 <= address <= 0xFFFF:
+        raise ValueError(f"Adres Modbus araliginin disinda (0-65535): {address_string}")
+    return address
+
+def parse_read_address(table, address_string):
+    # Bit tablolari DB formatini da kabul eder, register tablolari sayi veya tek register'lik etiket
+    if table in ('coils', 'discrete_inputs'):
+        return parse_address(address_string)
+    if address_string in tag_db:
+        plc_address = tag_db.lookup(address_string).address
+        if plc_address.area != 'register' or plc_address.count != 1:
+            raise ValueError(f"Etiket tek register degil: {address_string}")
+        return plc_address.address
+    try:
+        address = int(address_string)
+    except (TypeError, ValueError):
+        raise ValueError(f"Gecersiz register adresi: {address_string}")
+    return check_modbus_address(address, address_string)
 
 @app.route('/api/plc/write-bit', methods=['POST'])
 def write_bit():
@@ -88,20 +804,25 @@ def write_bit():
         if not address_string:
             return jsonify({'success': False, 'error': 'Adres gerekli'}), 400
         
-        coil_address = parse_address(address_string)
+        plc_manager = get_plc_manager(data.get('machine'))
+        plc_address = parse_bit_address(address_string).address
         
-        # PLC'ye bit yaz
-        success, message = plc_manager.write_coil(coil_address, value)
+        # PLC'ye bit yaz (word icindeki bitler FC22 mask write ile)
+        [(success, message, verified)], _ = plc_manager.write_values([(plc_address, bool(value))], request_source(data))
         
         if success:
-            return jsonify({
+            response = {
                 'success': True, 
                 'message': f'Bit yazildi: {address_string} = {value}',
+                'machine': plc_manager.machine_key,
                 'address': address_string,
-                'coil_address': coil_address,
                 'value': value,
                 'timestamp': datetime.now().isoformat()
-            })
+            }
+            response.update(describe_address(plc_address))
+            if verified is not None:
+                response['verified'] = verified
+            return jsonify(response)
         else:
             return jsonify({'success': False, 'error': message}), 500
         
@@ -111,19 +832,563 @@ def write_bit():
         logger.error(f"Genel hata: {e}")
         return jsonify({'success': False, 'error': f'Genel hata: {e}'}), 500
 
+@app.route('/api/plc/write-bits', methods=['POST'])
+def write_bits():
+    return write_many(parse_bit_address, lambda value: bool(value))
+
+@app.route('/api/plc/write-values', methods=['POST'])
+def write_values():
+    # {"writes": [{"address": "DB1.DBD4:REAL", "value": 12.5}, {"address": "DB1.DBW10.3", "value": true}]}
+    return write_many(parse_write_tag, lambda value: value)
+
+def write_many(parse, convert):
+    try:
+        data = request.get_json()
+        items = data.get('writes') if data else None
+        
+        if not items or not isinstance(items, list):
+            return jsonify({'success': False, 'error': 'writes listesi gerekli'}), 400
+        
+        plc_manager = get_plc_manager(data.get('machine'))
+        
+        # Once tum adresleri ve degerleri coz, gecersiz olan varsa hicbir sey yazma
+        parsed = []
+        errors = []
+        for item in items:
+            address_string = str(item.get('address', '')) if isinstance(item, dict) else ''
+            if not address_string:
+                errors.append({'address': None, 'error': 'Adres gerekli'})
+                continue
+            try:
+                tag = parse(address_string)
+                value = convert(item.get('value', False))
+                raw = to_raw(tag, value)
+                if tag.address.area == 'register':
+                    encode_value(tag.address.data_type, raw)
+                parsed.append((address_string, tag.address, raw, value))
+            except (TypeError, ValueError) as e:
+                errors.append({'address': address_string, 'error': str(e)})
+        
+        if errors:
+            return jsonify({'success': False, 'error': 'Gecersiz adres', 'errors': errors}), 400
+        
+        outcome, transactions = plc_manager.write_values(
+            [(plc_address, raw) for _, plc_address, raw, _ in parsed], request_source(data)
+        )
+        
+        # Ayni adrese ait onceki degerler sonrakiyle ezilir
+        last_index = {(a.area, a.address, a.bit): index for index, (_, a, _, _) in enumerate(parsed)}
+        
+        results = []
+        for index, ((address_string, plc_address, _, value), (success, message, verified)) in enumerate(zip(parsed, outcome)):
+            result = {
+                'address': address_string,
+                'value': value,
+                'success': success
+            }
+            result.update(describe_address(plc_address))
+            if last_index[(plc_address.area, plc_address.address, plc_address.bit)] != index:
+                result['superseded'] = True
+            if verified is not None:
+                result['verified'] = verified
+            if not success:
+                result['error'] = message
+            results.append(result)
+        
+        all_success = all(result['success'] for result in results)
+        return jsonify({
+            'success': all_success,
+            'machine': plc_manager.machine_key,
+            'results': results,
+            'transactions': transactions,
+            'timestamp': datetime.now().isoformat()
+        }), 200 if all_success else 500
+        
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Genel hata: {e}")
+        return jsonify({'success': False, 'error': f'Genel hata: {e}'}), 500
+
+@app.route('/api/plc/recipe', methods=['GET', 'POST'])
+def download_recipe():
+    # GET: makinenin recete blogu duzeni
+    # POST: {"machine": "lemanic3", "job": <job-data cevabindaki data>, "dry_run": false}
+    try:
+        if request.method == 'GET':
+            layout = get_recipe_layout(request.args.get('machine'))
+            return jsonify({'success': True, 'layout': layout.describe()})
+        
+        data = request.get_json() or {}
+        plc_manager = get_plc_manager(data.get('machine'))
+        layout = get_recipe_layout(plc_manager.machine_key)
+        
+        # Tum recete yazmadan once dogrulanir; hatali alan varsa PLC'ye hicbir sey gitmez
+        writes = layout.build(data.get('job'))
+        registers = [
+            {'field': name, 'register': plc_address.address, 'type': plc_address.data_type, 'value': value}
+            for name, plc_address, value in writes
+        ]
+        if data.get('dry_run'):
+            return jsonify({
+                'success': True,
+                'machine': plc_manager.machine_key,
+                'dry_run': True,
+                'start': layout.start,
+                'count': layout.count,
+                'registers': registers
+            })
+        
+        # Blok ardisik: yazma kuyrugu tek (en fazla iki) write_registers istegi gonderir,
+        # ardindan ayni aralik geri okunup her alan karsilastirilir
+        started = time.perf_counter()
+        outcome, transactions = plc_manager.write_values(
+            [(plc_address, value) for _, plc_address, value in writes], request_source(data), verify=True
+        )
+        elapsed = time.perf_counter() - started
+        
+        mismatches = []
+        failed = []
+        for register, (success, message, verified) in zip(registers, outcome):
+            register['verified'] = verified
+            if not success:
+                failed.append(register['field'])
+                register['error'] = message
+            elif verified is not True:
+                mismatches.append(register['field'])
+        
+        success = not failed and not mismatches
+        if success:
+            logger.info(
+                f"Recete yuklendi: {plc_manager.machine_key} {data['job'].get('is_adi', '')} "
+                f"HR{layout.start}-HR{layout.start + layout.count - 1} ({transactions} islem)"
+            )
+        else:
+            logger.error(f"Recete yuklenemedi: {plc_manager.machine_key} hatali {failed}, uyusmayan {mismatches}")
+        return jsonify({
+            'success': success,
+            'machine': plc_manager.machine_key,
+            'start': layout.start,
+            'count': layout.count,
+            'transactions': transactions,
+            'failed': failed,
+            'mismatches': mismatches,
+            'registers': registers,
+            'elapsed_ms': round(elapsed * 1000, 1),
+            'timestamp': datetime.now().isoformat()
+        }), 200 if success else 500
+        
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Genel hata: {e}")
+        return jsonify({'success': False, 'error': f'Genel hata: {e}'}), 500
+
+@app.route('/api/plc/read', methods=['GET', 'POST'])
+def read_values():
+    try:
+        # POST: {"coils": [...], "holding_registers": [...], "tags": ["DB1.DBD4:REAL"], "max_age": 0.5}
+        # GET:  ?coils=DB1.DBX0.0,5&holding_registers=10,11&tags=DB1.DBW10.3&max_age=0.5
+        if request.method == 'POST':
+            data = request.get_json() or {}
+            requested = {table: data.get(table) or [] for table in TABLES}
+            tags = data.get('tags') or []
+            max_age = data.get('max_age')
+            machine_key = data.get('machine')
+        else:
+            requested = {
+                table: [item for item in request.args.get(table, '').split(',') if item]
+                for table in TABLES
+            }
+            tags = [item for item in request.args.get('tags', '').split(',') if item]
+            max_age = request.args.get('max_age')
+            machine_key = request.args.get('machine')
+        
+        plc_manager = get_plc_manager(machine_key)
+        
+        if not any(requested.values()) and not tags:
+            return jsonify({'success': False, 'error': 'En az bir adres gerekli'}), 400
+        
+        if max_age is not None:
+            max_age = float(max_age)
+            if max_age < 0:
+                raise ValueError('max_age negatif olamaz')
+        
+        values = {}
+        errors = {}
+        snapshot_age = 0.0
+        for table, address_strings in requested.items():
+            if not address_strings:
+                continue
+            parsed = [(str(item), parse_read_address(table, str(item))) for item in address_strings]
+            table_values, table_errors, age = plc_manager.read(
+                table, [address for _, address in parsed], max_age
+            )
+            snapshot_age = max(snapshot_age, age)
+            values[table] = {
+                address_string: table_values[address]
+                for address_string, address in parsed if address in table_values
+            }
+            if table_errors:
+                errors[table] = {
+                    address_string: table_errors[address]
+                    for address_string, address in parsed if address in table_errors
+                }
+        
+        if tags:
+            # Etiketler ve tipli adresler (DBW/DBD/REAL, word icindeki bitler) tek adimda
+            # cozulur, decode ve olceklenmis doner
+            resolved = tag_db.resolve(tuple(str(item) for item in tags))
+            tag_values, tag_errors, age = plc_manager.read_values(
+                [tag.address for tag in resolved], max_age
+            )
+            snapshot_age = max(snapshot_age, age)
+            values['tags'] = {
+                tag.name: to_engineering(tag, tag_values[tag.address.text])
+                for tag in resolved if tag.address.text in tag_values
+            }
+            if tag_errors:
+                errors['tags'] = tag_errors
+        
+        response = {
+            'success': not errors,
+            'machine': plc_manager.machine_key,
+            'values': values,
+            'snapshot_age_ms': round(snapshot_age * 1000, 1),
+            'timestamp': datetime.now().isoformat()
+        }
+        if errors:
+            response['errors'] = errors
+        return jsonify(response), 200 if not errors else 500
+        
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Genel hata: {e}")
+        return jsonify({'success': False, 'error': f'Genel hata: {e}'}), 500
+
+@app.route('/api/plc/stream', methods=['GET'])
+def stream_values():
+    # EventSource: /api/plc/stream?machine=lemanic3&coils=DB1.DBX0.0,5&holding_registers=10,11&deadband=10:0.5
+    try:
+        plc_manager = get_plc_manager(request.args.get('machine'))
+        
+        deadbands = {}
+        for item in request.args.get('deadband', '').split(','):
+            if not item:
+                continue
+            address_string, _, deadband = item.partition(':')
+            deadbands[address_string] = float(deadband)
+        
+        tags = {}
+        for table in TABLES:
+            for address_string in request.args.get(table, '').split(','):
+                if not address_string:
+                    continue
+                address = parse_read_address(table, address_string)
+                tags[(table, address)] = (address_string, deadbands.get(address_string, 0.0))
+        
+        if not tags:
+            return jsonify({'success': False, 'error': 'En az bir adres gerekli'}), 400
+        
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    subscription = cov_hub.subscribe(plc_manager.machine_key, tags)
+    
+    def generate():
+        try:
+            yield f"retry: 2000\nevent: subscribed\ndata: {json.dumps({'id': subscription.id, 'machine': plc_manager.machine_key})}\n\n"
+            while True:
+                try:
+                    event, payload = subscription.events.get(timeout=COV_HEARTBEAT_INTERVAL)
+                except queue.Empty:
+                    # Kopmus istemcileri tespit etmek icin yorum satiri gonder
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        finally:
+            cov_hub.unsubscribe(subscription)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/plc/audit', methods=['GET'])
+def audit_entries():
+    # /api/plc/audit?since=2024-05-01T08:00:00&until=...&machine=lemanic3&limit=500
+    # since/until: unix zamani, ISO 8601 veya negatif ise simdiden geriye saniye
+    try:
+        since = parse_time(request.args.get('since'))
+        until = parse_time(request.args.get('until'))
+        limit = int(request.args.get('limit', 1000))
+        machine_key = None
+        if request.args.get('machine'):
+            machine_key, _ = machine_registry.get(request.args.get('machine'))
+        if limit < 1:
+            raise ValueError('limit 1 veya daha buyuk olmali')
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    entries = audit_log.query(since, until, machine_key, limit)
+    return jsonify({
+        'success': True,
+        'entries': entries,
+        'count': len(entries),
+        'truncated': len(entries) >= limit,
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/plc/snapshots', methods=['GET'])
+def snapshot_entries():
+    # /api/plc/snapshots?machine=lemanic3&type=daily&since=2024-05-01&until=2024-06-01&limit=100
+    # since/until: unix zamani, ISO 8601 veya negatif ise simdiden geriye saniye
+    if periodic_snapshots is None:
+        return jsonify({'success': False, 'error': 'Periyodik snapshot tanimli degil'}), 404
+    try:
+        machine_key = None
+        if request.args.get('machine'):
+            machine_key, _ = machine_registry.get(request.args.get('machine'))
+        snapshot_type = request.args.get('type') or None
+        if snapshot_type is not None and snapshot_type not in SNAPSHOT_TYPES:
+            raise ValueError(f"Gecersiz snapshot tipi: {snapshot_type}")
+        since = parse_time(request.args.get('since'))
+        until = parse_time(request.args.get('until'))
+        since = datetime.fromtimestamp(since) if since is not None else None
+        until = datetime.fromtimestamp(until) if until is not None else None
+        limit = int(request.args.get('limit', 500))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'snapshots': periodic_snapshots.query(machine_key, snapshot_type, since, until, limit),
+        'collector': periodic_snapshots.stats(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+def series_response(key, tag_name, times, values, args, **extra):
+    # /api/plc/history ve /api/plc/archive ortak cevabi: points'e gore seyreltme, json veya binary
+    try:
+        points = int(args.get('points', 0))
+        output = args.get('format', 'json')
+        if output not in ('json', 'binary'):
+            raise ValueError(f"Gecersiz format: {output}")
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    times, means, minimums, maximums = downsample(times, values, points)
+    
+    if output == 'binary':
+        return Response(encode_binary(times, means), mimetype='application/octet-stream', headers={
+            'X-History-Machine': key,
+            'X-History-Tag': tag_name,
+        })
+    
+    response = {
+        'success': True,
+        'machine': key,
+        'tag': tag_name,
+        **extra,
+        't': times.tolist(),
+        'v': means.tolist(),
+        'timestamp': datetime.now().isoformat()
+    }
+    if means is not values:
+        response['min'] = minimums.tolist()
+        response['max'] = maximums.tolist()
+    return jsonify(response)
+
+@app.route('/api/plc/history', methods=['GET'])
+def history_values():
+    # /api/plc/history?machine=lemanic3&tag=RollerSpeedValue&since=-600&points=500&format=json
+    # since: unix zamani, ISO 8601 veya negatif ise simdiden geriye saniye
+    try:
+        key, _ = machine_registry.get(request.args.get('machine'))
+        if key not in tag_histories:
+            raise ValueError(f"Makine icin gecmis tanimli degil: {key}")
+        history = tag_histories[key]
+        tag_name = request.args.get('tag')
+        if not tag_name:
+            raise ValueError('tag gerekli')
+        since = parse_time(request.args.get('since'))
+        times, values = history.since(tag_name, since)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return series_response(key, tag_name, times, values, request.args, interval=history.stats()['interval'])
+
+@app.route('/api/plc/archive', methods=['GET'])
+def archive_values():
+    # /api/plc/archive?machine=lemanic3&tag=RollerSpeedValue&since=-86400&until=...&points=1000&format=json
+    # Kalici gecmis; since/until /api/plc/history ile ayni bicimde
+    try:
+        if historian is None:
+            raise ValueError("Kalici gecmis kapali (history blogunda archive: true yok)")
+        key, _ = machine_registry.get(request.args.get('machine'))
+        tag_name = request.args.get('tag')
+        if not tag_name:
+            raise ValueError('tag gerekli')
+        since = parse_time(request.args.get('since'))
+        until = parse_time(request.args.get('until'))
+        times, values = historian.query(key, tag_name, since, until)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return series_response(key, tag_name, times, values, request.args)
+
+@app.route('/api/plc/run-state', methods=['GET'])
+def run_state():
+    try:
+        monitor = get_run_state_monitor(request.args.get('machine'))
+        limit = int(request.args.get('limit', 50))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    status = monitor.status()
+    return jsonify({
+        'success': True,
+        'run_state': status,
+        'transitions': run_state_transitions.recent(status['machine'], limit),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/plc/run-state/config', methods=['POST'])
+def run_state_config():
+    try:
+        data = request.get_json() or {}
+        monitor = get_run_state_monitor(data.get('machine'))
+        monitor.configure(
+            stop_threshold=data.get('stop_threshold'),
+            run_threshold=data.get('run_threshold'),
+            run_delay=data.get('run_delay'),
+            max_speed=data.get('max_speed')
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'run_state': monitor.status(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/plc/capture', methods=['GET', 'POST'])
+def modbus_capture():
+    # POST {"action": "start", "max_mb": 64} veya {"action": "stop"}; GET acik kaydin durumu
+    try:
+        if request.method == 'GET':
+            return jsonify({'success': True, 'capture': plc_gateway.capture_stats()})
+        
+        data = request.get_json() or {}
+        action = data.get('action')
+        if action == 'start':
+            max_mb = float(data.get('max_mb', PLC_CAPTURE_MAX_MB))
+            if max_mb <= 0:
+                raise ValueError('max_mb pozitif olmali')
+            path = os.path.join(CAPTURE_DIR, f"capture-{datetime.now().strftime('%Y%m%d-%H%M%S')}.bin")
+            capture = plc_gateway.start_capture(path, int(max_mb * 1024 * 1024))
+        elif action == 'stop':
+            capture = plc_gateway.stop_capture()
+        else:
+            raise ValueError("action 'start' veya 'stop' olmali")
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Genel hata: {e}")
+        return jsonify({'success': False, 'error': f'Genel hata: {e}'}), 500
+    
+    return jsonify({
+        'success': True,
+        'capture': capture,
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/energy', methods=['GET'])
+def energy_status():
+    # Sayaclarin son degerleri, guc ve makine basina kayan kWh toplamlari
+    if energy_meters is None:
+        return jsonify({'success': False, 'error': 'Sayac tanimli degil (meters.json yok)'}), 404
+    try:
+        status = energy_meters.status(request.args.get('machine'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return jsonify(dict(status, success=True, timestamp=datetime.now().isoformat()))
+
+@app.route('/api/plc/status', methods=['GET'])
+def plc_status():
+    try:
+        plc_manager = get_plc_manager(request.args.get('machine'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'machine': plc_manager.machine_key,
+        'connection': plc_manager.status(),
+        'snapshot': plc_manager.snapshot.stats(),
+        'write_queue': plc_manager.write_stats(),
+        'stream': cov_hub.stats(),
+        'audit': audit_log.stats(),
+        'image': image_publisher.stats() if image_publisher is not None else None,
+        'proxy': modbus_proxies[plc_manager.machine_key].stats() if plc_manager.machine_key in modbus_proxies else None,
+        'historian': historian.stats() if historian is not None else None,
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/plc/tags', methods=['GET'])
+def list_tags():
+    return jsonify({
+        'success': True,
+        'tags': tag_db.describe(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/plc/machines', methods=['GET'])
+def list_machines():
+    connections = plc_gateway.status()
+    machines = []
+    for key in machine_registry.keys():
+        _, config = machine_registry.get(key)
+        machines.append({
+            'key': key,
+            'name': config['name'],
+            'default': key == machine_registry.default_key,
+            'connection': connections[key]
+        })
+    return jsonify({
+        'success': True,
+        'machines': machines,
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    if PLC_IO_MODE == 'web':
+        # HTTP ve akis metrikleri bu worker'in, PLC metrikleri I/O surecinin
+        text = metrics.render(only=WORKER_METRIC_PREFIXES) + io_client.call(
+            'metrics', 'render', exclude=WORKER_METRIC_PREFIXES
+        )
+        return Response(text, mimetype='text/plain; version=0.0.4')
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({
         'status': 'healthy',
         'service': 'EGEM PLC Test Server',
-        'plc_port': PLC_PORT,
+        'plc_connections': plc_gateway.status(),
         'timestamp': datetime.now().isoformat()
     })
 
 if __name__ == '__main__':
     try:
         logger.info("EGEM PLC Test Server baslatiliyor...")
-        logger.info(f"PLC Adresi: {PLC_IP}:{PLC_PORT}")
+        for key in machine_registry.keys():
+            _, config = machine_registry.get(key)
+            logger.info(f"PLC Adresi [{key}]: {config['host']}:{config['port']}")
         app.run(host='127.0.0.1', port=5000, debug=False)
     except Exception as e:
         logger.error(f"Server hatasi: {e}")
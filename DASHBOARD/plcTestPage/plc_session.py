@@ -0,0 +1,292 @@
+import asyncio
+import logging
+import struct
+import time
+
+from pymodbus.client import AsyncModbusTcpClient
+from pymodbus.pdu import ExceptionResponse
+
+from plc_metrics import MODBUS_ERRORS, MODBUS_LATENCY, MODBUS_QUEUE_WAIT
+from plc_scheduler import PriorityGate
+
+logger = logging.getLogger(__name__)
+
+# Oturum durumlari
+STATE_DISCONNECTED = 'disconnected'
+STATE_CONNECTED = 'connected'
+STATE_BACKOFF = 'backoff'
+STATE_STOPPED = 'stopped'
+
+
+class PLCSession:
+    """Tek PLC icin kalici asyncio Modbus TCP oturumu.
+
+    Varsayilan olarak islemler sirayla gider (pipeline_depth=1). Daha buyuk
+    pipeline_depth verilirse ayni baglantida o kadar istek ayni anda
+    cevap bekleyebilir; cevaplar Modbus TCP transaction id ile eslenir.
+    Slotlar PriorityGate ile dagitilir: yazmalar kuyrukta bekleyen okumalarin,
+    HTTP okumalari arka plan taramalarinin onune gecer. Bosta kalan
+    baglanti keepalive okumasiyla sicak tutulur. Baglanti koparsa arka plan gorevi
+    ustel bekleme ile yeniden baglanir; bu sirada gelen istekler beklemeden
+    hata doner. Tum metotlar gateway'in event loop'unda calisir.
+    """
+
+    def __init__(self, host, port, slave_id, timeout=2.0, keepalive_interval=5.0,
+                 backoff_initial=0.5, backoff_max=30.0, probe_address=0, name=None, pipeline_depth=1):
+        if pipeline_depth < 1:
+            raise ValueError("pipeline_depth en az 1 olmali")
+        self.name = name or f'{host}:{port}'
+        self.host = host
+        self.port = port
+        self.slave_id = slave_id
+        self.timeout = timeout
+        self.keepalive_interval = keepalive_interval
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.probe_address = probe_address
+        self.pipeline_depth = pipeline_depth
+
+        self._gate = None
+        self._connect_lock = None
+        self._in_flight = 0
+        self._client = None
+        self._state = STATE_DISCONNECTED
+        self._backoff = backoff_initial
+        self._next_retry = 0.0
+        self._last_activity = 0.0
+        self._last_error = None
+        self._connected_since = None
+        self._reconnect_count = 0
+        self._failure_count = 0
+        self._task = None
+        # Acikken yeni baglantilarin trafigi kaydedilir (ModbusCapture)
+        self.capture = None
+
+    async def start(self):
+        # Kilitler loop icinde olusturulur (eski Python surumlerinde loop'a baglanir)
+        if self._gate is None:
+            self._gate = PriorityGate(self.pipeline_depth)
+            self._connect_lock = asyncio.Lock()
+        if self._task is None:
+            self._state = STATE_DISCONNECTED
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._state = STATE_STOPPED
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._close_client()
+
+    async def execute(self, operation, priority='interactive'):
+        """operation(client, slave_id) coroutine'ini bos bir pipeline slotunda calistirir.
+
+        priority: 'command', 'interactive' veya 'background'.
+        (True, response) veya (False, hata_mesaji) doner.
+        """
+        if self._state == STATE_STOPPED or self._gate is None:
+            return False, "PLC oturumu calismiyor"
+
+        # Bekleme suresi dolmadiysa cagirani bloklama, arka plan yeniden baglanacak
+        message = self._backoff_message()
+        if message:
+            return False, message
+
+        queued = time.perf_counter()
+        await self._gate.acquire(priority)
+        MODBUS_QUEUE_WAIT.observe(time.perf_counter() - queued, machine=self.name, priority=priority)
+        try:
+            return await self._execute(operation)
+        finally:
+            self._gate.release(priority)
+
+    async def _execute(self, operation):
+        # Slot beklenirken onceki islem baglantiyi dusurmus olabilir
+        message = self._backoff_message()
+        if message:
+            return False, message
+        if self._client is None:
+            async with self._connect_lock:
+                message = self._backoff_message()
+                if message:
+                    return False, message
+                if self._client is None and not await self._connect():
+                    return False, "PLC baglantisi kurulamadi"
+
+        client = self._client
+        started = time.perf_counter()
+        self._in_flight += 1
+        try:
+            result = await asyncio.wait_for(operation(client, self.slave_id), self.timeout + 1)
+        except asyncio.CancelledError:
+            raise
+        except (struct.error, ValueError, TypeError) as e:
+            # Istek yerelde kodlanamadi (gecersiz adres/deger), baglanti saglam
+            MODBUS_ERRORS.inc(machine=self.name, type='invalid_request')
+            return False, f"Gecersiz istek: {e}"
+        except Exception as e:
+            MODBUS_LATENCY.observe(time.perf_counter() - started, machine=self.name, function_code='none')
+            MODBUS_ERRORS.inc(machine=self.name, type=type(e).__name__)
+            self._mark_failed(e, client)
+            return False, f"Genel hata: {e}"
+        finally:
+            self._in_flight -= 1
+
+        function_code = getattr(result, 'original_code', None) or getattr(result, 'function_code', 'none')
+        MODBUS_LATENCY.observe(time.perf_counter() - started, machine=self.name, function_code=function_code)
+
+        if result.isError():
+            # Exception response PLC'nin cevap verdigi anlamina gelir, baglanti saglam
+            if isinstance(result, ExceptionResponse):
+                MODBUS_ERRORS.inc(machine=self.name, type=f'exception_code_{result.exception_code}')
+                self._last_activity = time.monotonic()
+                return False, f"Modbus hatasi: {result}"
+            MODBUS_ERRORS.inc(machine=self.name, type=type(result).__name__)
+            self._mark_failed(result, client)
+            return False, f"Modbus hatasi: {result}"
+
+        self._last_activity = time.monotonic()
+        return True, result
+
+    def status(self):
+        now = time.monotonic()
+        info = {
+            'host': self.host,
+            'port': self.port,
+            'slave_id': self.slave_id,
+            'state': self._state,
+            'pipeline_depth': self.pipeline_depth,
+            'in_flight': self._in_flight,
+            'waiting': self._gate.waiting() if self._gate else {},
+            'granted': dict(self._gate.granted) if self._gate else {},
+            'reconnect_count': self._reconnect_count,
+            'consecutive_failures': self._failure_count,
+            'last_error': self._last_error,
+            'idle_seconds': round(now - self._last_activity, 3) if self._last_activity else None,
+            'connected_seconds': round(now - self._connected_since, 3) if self._connected_since else None,
+        }
+        if self._state == STATE_BACKOFF:
+            info['retry_in_seconds'] = round(max(0.0, self._next_retry - now), 3)
+        return info
+
+    def _backoff_message(self):
+        if self._state != STATE_BACKOFF:
+            return None
+        remaining = self._next_retry - time.monotonic()
+        if remaining <= 0:
+            return None
+        return f"PLC baglantisi yok, yeniden deneme {remaining:.1f} sn sonra"
+
+    @property
+    def state(self):
+        return self._state
+
+    @property
+    def reconnect_count(self):
+        return self._reconnect_count
+
+    async def _connect(self):
+        client = await self._open_client()
+        if client is None:
+            return False
+        self._install_client(client)
+        return True
+
+    async def _open_client(self):
+        # pymodbus'un kendi yeniden baglanma dongusu yerine oturumun backoff'u kullanilir
+        client = AsyncModbusTcpClient(self.host, port=self.port, timeout=self.timeout, retries=0)
+        try:
+            if await client.connect():
+                return client
+            error = "baglanti reddedildi"
+        except Exception as e:
+            error = str(e)
+        client.close()
+        MODBUS_ERRORS.inc(machine=self.name, type='connect_failed')
+        self._mark_failed(error)
+        return None
+
+    def set_capture(self, capture):
+        # Acik baglantida onceki kaydin sarmalayicilari kaldirilir, yenisi orijinalleri sarar
+        if self._client is not None:
+            if self.capture is not None:
+                self.capture.detach(self._client)
+            if capture is not None:
+                capture.attach(self._client, self.name)
+        self.capture = capture
+
+    def _install_client(self, client):
+        self._close_client()
+        self._client = client
+        if self.capture is not None:
+            self.capture.attach(client, self.name)
+        if self._failure_count:
+            self._reconnect_count += 1
+        self._state = STATE_CONNECTED
+        self._backoff = self.backoff_initial
+        self._failure_count = 0
+        self._last_error = None
+        self._connected_since = time.monotonic()
+        self._last_activity = self._connected_since
+        logger.info(f"PLC'ye baglandi: {self.host}:{self.port}")
+
+    def _close_client(self):
+        if self._client is not None:
+            try:
+                self._client.close()
+            except Exception:
+                pass
+            self._client = None
+        self._connected_since = None
+
+    def _mark_failed(self, error, client=None):
+        if client is not None and client is not self._client:
+            # Pipeline'daki diger istekler ayni kopuk baglantidan hata alir; bir kez sayilir
+            return
+        self._last_error = str(error)
+        self._failure_count += 1
+        self._close_client()
+        if self._state != STATE_STOPPED:
+            self._state = STATE_BACKOFF
+            self._next_retry = time.monotonic() + self._backoff
+            logger.error(f"PLC baglanti hatasi ({self.host}): {error} - {self._backoff:.1f} sn sonra tekrar denenecek")
+            self._backoff = min(self._backoff * 2, self.backoff_max)
+
+    async def _run(self):
+        tick = min(1.0, self.keepalive_interval / 2)
+        while self._state != STATE_STOPPED:
+            await asyncio.sleep(tick)
+            try:
+                if self._state == STATE_BACKOFF and time.monotonic() >= self._next_retry:
+                    await self._reconnect()
+                elif self._state == STATE_CONNECTED:
+                    await self._keepalive()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"PLC oturum gorevi hatasi ({self.host}): {e}")
+
+    async def _reconnect(self):
+        # Baglanti kilit disinda kurulur, cagiranlar bu sure boyunca beklemez
+        client = await self._open_client()
+        if client is None:
+            return
+        if self._state == STATE_STOPPED:
+            client.close()
+            return
+        async with self._connect_lock:
+            self._install_client(client)
+
+    async def _keepalive(self):
+        if time.monotonic() - self._last_activity < self.keepalive_interval:
+            return
+        # Cevap bekleyen istek varsa zaten trafik var, probe gerekmez
+        if self._in_flight or self._client is None:
+            return
+        await self.execute(
+            lambda client, slave: client.read_coils(self.probe_address, 1, slave=slave), priority='background'
+        )
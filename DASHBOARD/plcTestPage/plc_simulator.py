@@ -0,0 +1,103 @@
+import argparse
+import asyncio
+import logging
+import random
+
+from pymodbus.datastore import ModbusSequentialDataBlock, ModbusServerContext, ModbusSlaveContext
+from pymodbus.factory import ServerDecoder
+
+from modbus_server import ModbusTcpServer, exception_pdu
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Modbus exception kodlari
+ILLEGAL_FUNCTION = 0x01
+SLAVE_DEVICE_BUSY = 0x06
+
+
+class PLCSimulator:
+    """pymodbus datastore uzerinde calisan sahte PLC.
+
+    Coil, discrete input ve register tablolari PLC ile ayni adres alanini
+    (0 tabanli) kullanir. Her istege sabit gecikme + rastgele jitter eklenir;
+    fault_rate oraninda 'slave device busy' exception'i, drop_rate oraninda
+    hic cevap vermeyerek istemci timeout'u uretilir.
+    """
+
+    def __init__(self, coils=4000, registers=2000, latency=0.0, jitter=0.0,
+                 fault_rate=0.0, drop_rate=0.0, seed=None):
+        store = ModbusSlaveContext(
+            co=ModbusSequentialDataBlock(0, [0] * coils),
+            di=ModbusSequentialDataBlock(0, [0] * coils),
+            hr=ModbusSequentialDataBlock(0, [0] * registers),
+            ir=ModbusSequentialDataBlock(0, [0] * registers),
+            zero_mode=True
+        )
+        self.context = ModbusServerContext(slaves=store, single=True)
+        self.decoder = ServerDecoder()
+        self.latency = latency
+        self.jitter = jitter
+        self.fault_rate = fault_rate
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+        self.stats = {'requests': 0, 'faults': 0, 'drops': 0}
+
+    async def handle(self, unit_id, pdu):
+        self.stats['requests'] += 1
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+
+        roll = self.random.random()
+        if roll < self.drop_rate:
+            self.stats['drops'] += 1
+            return None
+        if roll < self.drop_rate + self.fault_rate:
+            self.stats['faults'] += 1
+            return exception_pdu(pdu[0], SLAVE_DEVICE_BUSY)
+
+        request = self.decoder.decode(pdu)
+        if request is None:
+            return exception_pdu(pdu[0], ILLEGAL_FUNCTION)
+        request.slave_id = unit_id
+        response = request.execute(self.context[unit_id])
+        return bytes((response.function_code,)) + response.encode()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='EGEM PLC Simulator (Modbus TCP)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=15020)
+    parser.add_argument('--coils', type=int, default=4000, help='coil ve discrete input sayisi')
+    parser.add_argument('--registers', type=int, default=2000, help='holding ve input register sayisi')
+    parser.add_argument('--latency', type=float, default=0.0, help='istek basina sabit gecikme (ms)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='istek basina rastgele ek gecikme (ms)')
+    parser.add_argument('--fault-rate', type=float, default=0.0, help='exception cevap orani (0-1)')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='cevapsiz birakilan istek orani (0-1)')
+    parser.add_argument('--serial', action='store_true', help='baglanti basina istekleri sirayla isle')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    simulator = PLCSimulator(
+        coils=args.coils,
+        registers=args.registers,
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        fault_rate=args.fault_rate,
+        drop_rate=args.drop_rate,
+        seed=args.seed
+    )
+    server = ModbusTcpServer(simulator.handle, args.host, args.port, serial=args.serial)
+    logger.info(
+        f"PLC simulator: gecikme {args.latency} ms (+{args.jitter} ms), "
+        f"fault %{args.fault_rate * 100:.1f}, drop %{args.drop_rate * 100:.1f}"
+    )
+    await server.serve_forever()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
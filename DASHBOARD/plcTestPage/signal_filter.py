@@ -0,0 +1,268 @@
+import collections
+import json
+import logging
+import math
+import threading
+import time
+
+from plc_address import decode_value
+
+logger = logging.getLogger(__name__)
+
+# MAKINE_DURUM_DEBOUNCE.st ile ayni varsayilanlar
+DEFAULT_STOP_THRESHOLD = 24.0
+DEFAULT_RUN_THRESHOLD = 24.5
+DEFAULT_RUN_DELAY = 2.0
+
+
+class SpeedFilter:
+    """Ham hiz/period orneklerinden gurultuyu ayiklar.
+
+    PERIODMETER_AYARLARI.md'deki sorunlar burada ele alinir: negatif period
+    (ters donus) ve bounce kaynakli cok kucuk period degerleri reddedilir,
+    pulse gelmemesi (period 0 veya timeout ustu) hiz 0 kabul edilir, kalan
+    ornekler kayan medyandan gecirilerek tekil sivri degerler bastirilir.
+    """
+
+    def __init__(self, window=5, max_speed=400.0, min_period=None, max_period=None):
+        self.max_speed = max_speed
+        self.min_period = min_period
+        self.max_period = max_period
+        self._samples = collections.deque(maxlen=window)
+        self.accepted = 0
+        self.rejected = 0
+
+    def update(self, speed, period=None):
+        """Filtrelenmis hizi, ornek reddedildiyse None doner."""
+        if period is not None:
+            if period < 0 or (self.min_period and 0 < period < self.min_period):
+                self.rejected += 1
+                return None
+            if period == 0 or (self.max_period and period > self.max_period):
+                speed = 0.0
+
+        if speed is None or math.isnan(speed) or speed < 0 or speed > self.max_speed:
+            self.rejected += 1
+            return None
+
+        self.accepted += 1
+        self._samples.append(speed)
+        ordered = sorted(self._samples)
+        return ordered[len(ordered) // 2]
+
+
+class RunStopDebouncer:
+    """MAKINE_DURUM_DEBOUNCE.st'deki calisti/durdu mantiginin Python karsiligi.
+
+    Durma aninda bildirilir (hiz < stop_threshold veya durdurma sinyali);
+    calisma icin hizin run_delay saniye boyunca run_threshold'un ustunde
+    kalmasi gerekir. Aradaki bantta zamanlayici sifirlanir ve onceki durum
+    korunur.
+    """
+
+    def __init__(self, stop_threshold=DEFAULT_STOP_THRESHOLD, run_threshold=DEFAULT_RUN_THRESHOLD,
+                 run_delay=DEFAULT_RUN_DELAY):
+        self.configure(stop_threshold, run_threshold, run_delay)
+        self.stopped = True
+        self._run_since = None
+
+    def configure(self, stop_threshold, run_threshold, run_delay):
+        if run_threshold < stop_threshold:
+            raise ValueError("run_threshold, stop_threshold'dan kucuk olamaz")
+        if run_delay < 0:
+            raise ValueError("run_delay negatif olamaz")
+        self.stop_threshold = stop_threshold
+        self.run_threshold = run_threshold
+        self.run_delay = run_delay
+
+    def update(self, speed, stop_signal, now):
+        """Durum degistiyse True doner."""
+        if speed < self.stop_threshold or stop_signal:
+            self._run_since = None
+            if not self.stopped:
+                self.stopped = True
+                return True
+            return False
+
+        if speed > self.run_threshold:
+            # TON: kosul ilk saglandiginda zamanlayiciyi baslat
+            if self._run_since is None:
+                self._run_since = now
+            if self.stopped and now - self._run_since >= self.run_delay:
+                self.stopped = False
+                return True
+            return False
+
+        # Ara bant: zamanlayiciyi sifirla, onceki durumu koru
+        self._run_since = None
+        return False
+
+
+class TransitionLog:
+    """Sadece calisti/durdu gecislerini tutan kompakt degisiklik kaydi.
+
+    Son gecisler bellekte tutulur; path verilirse her gecis JSON satiri
+    olarak dosyaya eklenir.
+    """
+
+    def __init__(self, path=None, max_entries=1000):
+        self.path = path
+        self._entries = collections.deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+
+    def append(self, machine_key, stopped, speed, timestamp):
+        entry = {
+            'machine': machine_key,
+            'state': 'stopped' if stopped else 'running',
+            'speed': round(speed, 3),
+            'timestamp': timestamp,
+        }
+        with self._lock:
+            self._entries.append(entry)
+            if self.path:
+                try:
+                    with open(self.path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(entry) + '\n')
+                except OSError as e:
+                    logger.error(f"Gecis kaydi yazilamadi: {e}")
+        return entry
+
+    def recent(self, machine_key=None, limit=50):
+        with self._lock:
+            entries = [entry for entry in self._entries if machine_key is None or entry['machine'] == machine_key]
+        return entries[-limit:]
+
+
+class RunStateMonitor:
+    """Bir makinenin hiz sinyalini yuksek hizda orneklayip debounce eden thread.
+
+    config (machines.json 'debounce' blogu):
+        speed_register   REAL hiz degerinin ilk holding register'i (zorunlu)
+        period_register  REAL period degerinin ilk register'i (opsiyonel)
+        stop_coil        durdurma sinyali coil'i, ST'deki g_Coils[4] (opsiyonel)
+        word_order       'little' (dusuk word once) veya 'big'
+        sample_interval  ornekleme araligi (sn)
+        stop_threshold, run_threshold, run_delay, max_speed, min_period, max_period
+    """
+
+    def __init__(self, machine_key, manager, config, transitions):
+        if config.get('speed_register') is None:
+            raise ValueError(f"Makine '{machine_key}' icin speed_register gerekli")
+        self.machine_key = machine_key
+        self.manager = manager
+        self.transitions = transitions
+        self.speed_register = int(config['speed_register'])
+        self.period_register = config.get('period_register')
+        self.stop_coil = config.get('stop_coil')
+        self.word_order = config.get('word_order', 'little')
+        self.sample_interval = float(config.get('sample_interval', 0.05))
+        self.filter = SpeedFilter(
+            window=int(config.get('median_window', 5)),
+            max_speed=float(config.get('max_speed', 400.0)),
+            min_period=config.get('min_period'),
+            max_period=config.get('max_period')
+        )
+        self.debouncer = RunStopDebouncer(
+            float(config.get('stop_threshold', DEFAULT_STOP_THRESHOLD)),
+            float(config.get('run_threshold', DEFAULT_RUN_THRESHOLD)),
+            float(config.get('run_delay', DEFAULT_RUN_DELAY))
+        )
+        self.raw_speed = None
+        self.filtered_speed = None
+        self.state_since = time.time()
+        self.last_error = None
+        self.samples = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f'run-state-{self.machine_key}', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def configure(self, stop_threshold=None, run_threshold=None, run_delay=None, max_speed=None):
+        # Esikler PLC koduna dokunmadan canli degistirilebilir
+        self.debouncer.configure(
+            self.debouncer.stop_threshold if stop_threshold is None else float(stop_threshold),
+            self.debouncer.run_threshold if run_threshold is None else float(run_threshold),
+            self.debouncer.run_delay if run_delay is None else float(run_delay)
+        )
+        if max_speed is not None:
+            self.filter.max_speed = float(max_speed)
+        logger.info(
+            f"Debounce ayarlari guncellendi ({self.machine_key}): durma < {self.debouncer.stop_threshold}, "
+            f"calisma > {self.debouncer.run_threshold} / {self.debouncer.run_delay} sn"
+        )
+
+    def status(self):
+        return {
+            'machine': self.machine_key,
+            'state': 'stopped' if self.debouncer.stopped else 'running',
+            'state_since': self.state_since,
+            'raw_speed': self.raw_speed,
+            'filtered_speed': self.filtered_speed,
+            'samples': self.samples,
+            'accepted': self.filter.accepted,
+            'rejected': self.filter.rejected,
+            'last_error': self.last_error,
+            'config': {
+                'stop_threshold': self.debouncer.stop_threshold,
+                'run_threshold': self.debouncer.run_threshold,
+                'run_delay': self.debouncer.run_delay,
+                'max_speed': self.filter.max_speed,
+                'sample_interval': self.sample_interval,
+            },
+        }
+
+    def _sample(self):
+        registers = [self.speed_register, self.speed_register + 1]
+        if self.period_register is not None:
+            registers += [int(self.period_register), int(self.period_register) + 1]
+        values, errors, _ = self.manager.read('holding_registers', registers, self.sample_interval / 2, 'background')
+        if errors:
+            raise RuntimeError(next(iter(errors.values())))
+
+        speed = decode_value('REAL', [values[self.speed_register], values[self.speed_register + 1]], self.word_order)
+        period = None
+        if self.period_register is not None:
+            start = int(self.period_register)
+            period = decode_value('REAL', [values[start], values[start + 1]], self.word_order)
+
+        stop_signal = False
+        if self.stop_coil is not None:
+            coils, errors, _ = self.manager.read('coils', [int(self.stop_coil)], self.sample_interval / 2, 'background')
+            if errors:
+                raise RuntimeError(next(iter(errors.values())))
+            stop_signal = bool(coils[int(self.stop_coil)])
+        return speed, period, stop_signal
+
+    def _run(self):
+        next_sample = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                speed, period, stop_signal = self._sample()
+                self.last_error = None
+                self.samples += 1
+                self.raw_speed = speed
+                filtered = self.filter.update(speed, period)
+                if filtered is not None:
+                    self.filtered_speed = filtered
+                    if self.debouncer.update(filtered, stop_signal, time.monotonic()):
+                        self.state_since = time.time()
+                        entry = self.transitions.append(
+                            self.machine_key, self.debouncer.stopped, filtered, self.state_since
+                        )
+                        logger.info(f"Makine durumu degisti: {self.machine_key} -> {entry['state']} (hiz {filtered:.2f})")
+            except Exception as e:
+                if str(e) != self.last_error:
+                    logger.error(f"Hiz ornekleme hatasi ({self.machine_key}): {e}")
+                self.last_error = str(e)
+
+            next_sample += self.sample_interval
+            delay = next_sample - time.monotonic()
+            if delay > 0:
+                self._stop_event.wait(delay)
+            else:
+                next_sample = time.monotonic()
@@ -0,0 +1,239 @@
+import threading
+import time
+from array import array
+
+from modbus_blocks import MAX_READ_COILS, MAX_READ_REGISTERS, plan_reads
+from plc_scheduler import PRIORITY_CLASSES
+
+# Tablo adi -> (blok basina maksimum adet, birlestirilecek maksimum bosluk)
+TABLES = {
+    'coils': (MAX_READ_COILS, 32),
+    'discrete_inputs': (MAX_READ_COILS, 32),
+    'holding_registers': (MAX_READ_REGISTERS, 8),
+    'input_registers': (MAX_READ_REGISTERS, 8),
+}
+
+# Taranan bloklari ham register dizisi (array('H')) olarak da tutan tablolar
+BLOCK_TABLES = ('holding_registers', 'input_registers')
+
+
+class SnapshotCache:
+    """PLC okumalari icin paylasilan anlik goruntu.
+
+    Tazelik suresi icindeki degerler PLC'ye gitmeden cache'ten doner. Eskimis
+    adresler blok okumalarla tek seferde yenilenir; ayni anda gelen istekler
+    tarama kilidinde bekler ve ilk taramanin sonucunu kullanir, boylece N
+    sekme N degil tek PLC taramasina mal olur. Tarama kilidi oncelik sinifi
+    basinadir: HTTP okumasi arka plan taramasinin bitmesini beklemez, iki
+    tarama da oturumun oncelik kapisina birlikte gider.
+
+    Register tablolarinda her taramanin blogu ayrica array('H') olarak
+    saklanir; read_arrays tipli etiketleri cozen BlockDecoder'a bu diziyi
+    adres basina sozluk aramasi yapmadan verir. Yazilan veya silinen adresi
+    iceren blok atilir, yerine adres bazli degerler kullanilir.
+    """
+
+    def __init__(self, reader, max_age, batch_reader=None):
+        # reader(table, start, count, priority) -> (True, values) veya (False, hata_mesaji)
+        # batch_reader(table, [(start, count)], priority) verilirse bloklar tek seferde (pipeline) okunur
+        self.reader = reader
+        self.batch_reader = batch_reader
+        self.max_age = max_age
+        self._values = {table: {} for table in TABLES}
+        # Tablo -> {blok baslangici: (array('H'), okuma zamani)}; bloklar cakismaz, yerinde degismez
+        self._blocks = {table: {} for table in BLOCK_TABLES}
+        self._lock = threading.Lock()
+        self._scan_locks = {priority: threading.Lock() for priority in PRIORITY_CLASSES}
+        self.scan_count = 0
+        self.hit_count = 0
+
+    def read(self, table, addresses, max_age=None, priority='interactive'):
+        """{adres: deger}, {adres: hata} ve en eski degerin yasini (sn) doner.
+
+        priority, gerekirse yapilacak PLC taramasinin oncelik sinifidir.
+        """
+        if table not in TABLES:
+            raise ValueError(f"Gecersiz tablo: {table}")
+        if max_age is None:
+            max_age = self.max_age
+
+        errors = {}
+        stale = self._stale(table, addresses, max_age)
+        if stale:
+            with self._scan_locks[priority]:
+                # Kilit beklenirken baska bir istek taramis olabilir
+                stale = self._stale(table, stale, max_age)
+                if stale:
+                    errors = self._scan(table, stale, priority)
+        else:
+            self.hit_count += 1
+
+        now = time.monotonic()
+        values = {}
+        oldest = 0.0
+        with self._lock:
+            entries = self._values[table]
+            for address in addresses:
+                if address in errors or address not in entries:
+                    continue
+                value, timestamp = entries[address]
+                values[address] = value
+                oldest = max(oldest, now - timestamp)
+        return values, errors, oldest
+
+    def read_arrays(self, table, blocks, max_age=None, priority='interactive'):
+        """[(start, count)] bloklarini [(array('H') veya None, hata)] ve en eski yas (sn) olarak doner.
+
+        Taze bir taramanin blogu donen diziyle ayni nesnedir veya ondan bir
+        dilimdir; cagiran diziyi degistirmemelidir. Eksik bloklar tek
+        taramada (pipeline varsa birlikte) okunur.
+        """
+        if table not in BLOCK_TABLES:
+            raise ValueError(f"Blok okumasi desteklenmiyor: {table}")
+        if max_age is None:
+            max_age = self.max_age
+
+        found = self._find_blocks(table, blocks, max_age)
+        if None in found:
+            with self._scan_locks[priority]:
+                found = self._find_blocks(table, blocks, max_age)
+                missing = [block for block, item in zip(blocks, found) if item is None]
+                if missing:
+                    self.scan_count += 1
+                    fetched = dict(zip(missing, self._fetch(table, missing, priority)))
+                    now = time.monotonic()
+                    for index, block in enumerate(blocks):
+                        if found[index] is None:
+                            success, result = fetched[block]
+                            found[index] = (result, None, now) if success else (None, result, now)
+        else:
+            self.hit_count += 1
+
+        now = time.monotonic()
+        oldest = max((now - timestamp for registers, _, timestamp in found if registers is not None), default=0.0)
+        return [(registers, error) for registers, error, _ in found], oldest
+
+    def peek(self, table, addresses):
+        # PLC'ye gitmeden bilinen son degerler (yas kontrolu yok): {adres: deger}
+        with self._lock:
+            entries = self._values[table]
+            return {address: entries[address][0] for address in addresses if address in entries}
+
+    def update(self, table, values):
+        # Basarili yazmalardan sonra cache'i guncel tut
+        now = time.monotonic()
+        with self._lock:
+            entries = self._values[table]
+            for address, value in values.items():
+                entries[address] = (value, now)
+            self._drop_blocks(table, values)
+
+    def invalidate(self, table=None, addresses=None):
+        with self._lock:
+            for name in ([table] if table else TABLES):
+                if addresses is None:
+                    self._values[name].clear()
+                    self._blocks.get(name, {}).clear()
+                    continue
+                for address in addresses:
+                    self._values[name].pop(address, None)
+                self._drop_blocks(name, addresses)
+
+    def stats(self):
+        with self._lock:
+            cached = {table: len(entries) for table, entries in self._values.items()}
+        return {
+            'max_age': self.max_age,
+            'scans': self.scan_count,
+            'hits': self.hit_count,
+            'cached': cached,
+        }
+
+    def _stale(self, table, addresses, max_age):
+        now = time.monotonic()
+        with self._lock:
+            entries = self._values[table]
+            return [
+                address for address in addresses
+                if address not in entries or now - entries[address][1] > max_age
+            ]
+
+    def _scan(self, table, addresses, priority):
+        max_count, max_gap = TABLES[table]
+        errors = {}
+        self.scan_count += 1
+        blocks = plan_reads(addresses, max_count, max_gap)
+        for (start, count), (success, result) in zip(blocks, self._fetch(table, blocks, priority)):
+            if not success:
+                for address in addresses:
+                    if start <= address < start + count:
+                        errors[address] = result
+        return errors
+
+    def _fetch(self, table, blocks, priority):
+        # Bloklari okur ve cache'e yazar: [(True, degerler) veya (False, hata_mesaji)]
+        if self.batch_reader is not None and len(blocks) > 1:
+            results = self.batch_reader(table, blocks, priority)
+        else:
+            results = [self.reader(table, start, count, priority) for start, count in blocks]
+        fetched = []
+        for (start, count), (success, result) in zip(blocks, results):
+            if success:
+                # Bosluk icin okunan adresler de cache'e girer
+                result = self._store(table, start, result[:count])
+            fetched.append((success, result))
+        return fetched
+
+    def _store(self, table, start, values):
+        now = time.monotonic()
+        if table in BLOCK_TABLES:
+            values = array('H', values)
+        with self._lock:
+            entries = self._values[table]
+            for offset, value in enumerate(values):
+                entries[start + offset] = (value, now)
+            if table in BLOCK_TABLES:
+                blocks = self._blocks[table]
+                end = start + len(values)
+                for other in [
+                    other for other, (registers, _) in blocks.items() if other < end and start < other + len(registers)
+                ]:
+                    del blocks[other]
+                blocks[start] = (values, now)
+        return values
+
+    def _drop_blocks(self, table, addresses):
+        # _lock tutulurken cagrilir
+        blocks = self._blocks.get(table)
+        if not blocks:
+            return
+        addresses = list(addresses)
+        for start in [
+            start for start, (registers, _) in blocks.items()
+            if any(start <= address < start + len(registers) for address in addresses)
+        ]:
+            del blocks[start]
+
+    def _find_blocks(self, table, blocks, max_age):
+        # Blok basina (array('H'), None, okuma zamani) veya None. Kapsayan taze blok yoksa
+        # (ornegin yazmadan sonra) tum adresleri taze ise adres bazli degerlerden kurulur
+        now = time.monotonic()
+        found = []
+        with self._lock:
+            stored = self._blocks[table]
+            entries = self._values[table]
+            for start, count in blocks:
+                item = None
+                for first, (registers, timestamp) in stored.items():
+                    if first <= start and start + count <= first + len(registers) and now - timestamp <= max_age:
+                        if first == start and count == len(registers):
+                            item = (registers, None, timestamp)
+                        else:
+                            item = (registers[start - first:start - first + count], None, timestamp)
+                        break
+                if item is None:
+                    cached = [entries.get(address) for address in range(start, start + count)]
+                    if None not in cached and all(now - timestamp <= max_age for _, timestamp in cached):
+                        item = (array('H', [value for value, _ in cached]), None, min(t for _, t in cached))
+                found.append(item)
+        return found
@@ -0,0 +1,38 @@
+@echo off
+echo EGEM Makine Takip Sistemi - PLC Server (I/O sureci + web worker'lari)
+echo ====================================================================
+echo.
+
+echo Python paketleri yukleniyor...
+pip install -r requirements.txt
+
+rem Web worker sayisi; her worker 5000'den baslayan ayri bir portta dinler
+if "%PLC_WEB_WORKERS%"=="" set PLC_WEB_WORKERS=1
+if "%PLC_WEB_THREADS%"=="" set PLC_WEB_THREADS=16
+
+echo.
+echo PLC I/O sureci baslatiliyor...
+start "EGEM PLC I/O" python plc_io_worker.py
+
+rem I/O sureci IPC anahtarini ilk acilista data\plc_io.key dosyasina uretir
+if not "%PLC_IO_AUTHKEY%"=="" goto start_web
+:wait_key
+if exist data\plc_io.key goto start_web
+timeout /t 1 /nobreak >nul
+goto wait_key
+
+:start_web
+set PLC_IO_MODE=web
+set /a LAST_PORT=5000 + %PLC_WEB_WORKERS% - 1
+for /L %%p in (5000,1,%LAST_PORT%) do (
+    echo Web worker baslatiliyor: http://localhost:%%p
+    start "EGEM PLC Web %%p" python -m waitress --listen=0.0.0.0:%%p --threads=%PLC_WEB_THREADS% plc_server:app
+)
+
+echo.
+echo API: http://localhost:5000
+echo Test Sayfasi: http://localhost:5000/index.html
+echo Durdurmak icin acilan pencereleri kapatin.
+echo.
+
+pause
@@ -0,0 +1,17 @@
+@echo off
+echo EGEM Makine Takip Sistemi - PLC Simulator
+echo ===========================================
+echo.
+
+echo Python paketleri yukleniyor...
+pip install -r requirements.txt
+
+echo.
+echo PLC Simulator baslatiliyor (Modbus TCP 127.0.0.1:15020)...
+echo Server icin: set PLC_MACHINES_FILE=machines.simulator.json ^&^& python plc_server.py
+echo Yuk testi icin: python plc_benchmark.py --mode mixed --concurrency 16
+echo.
+
+python plc_simulator.py --latency 5 --jitter 2
+
+pause
@@ -0,0 +1,142 @@
+import functools
+import json
+import logging
+import os
+import re
+from collections import namedtuple
+
+from plc_address import parse_plc_address
+
+logger = logging.getLogger(__name__)
+
+# Cozulmus etiket: adres bir kez parse edilir, olcekleme bilgisiyle birlikte saklanir
+Tag = namedtuple('Tag', 'name address scale offset unit writable description')
+
+# Ham adres gibi gorunen metinler (DB1..., HR..., sayi); digerleri etiket adi sayilir
+_RAW_ADDRESS = re.compile(r'^(DB\d|HR\d|\d)', re.IGNORECASE)
+
+
+class TagDatabase:
+    """Sembolik etiket adi -> onceden cozulmus PLC adresi tablosu.
+
+    tags.json formati:
+    {
+        "tags": {
+            "RollerSpeedValue": {"address": "HR100:REAL", "unit": "m/min"},
+            "makinaDurdu": {"address": "HR104.0", "writable": false},
+            "sicaklik": {"address": "HR110:INT", "scale": 0.1, "unit": "C"}
+        }
+    }
+
+    Muhendislik degeri = ham deger * scale + offset. Tabloda olmayan metinler
+    ham adres olarak (DB1.DBX0.0, DB1.DBD4:REAL, 42) parse edilir; parse
+    sonuclari da cache'lenir, boylece istek yolunda tekrar parse yapilmaz.
+    """
+
+    def __init__(self, tags=None):
+        self._tags = {}
+        for name, config in (tags or {}).items():
+            self._tags[name] = self._compile(name, config)
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            logger.info(f"Etiket dosyasi bulunamadi ({path}), sadece ham adresler kullanilabilir")
+            return cls()
+
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        database = cls(data.get('tags', {}))
+        logger.info(f"{len(database._tags)} etiket yuklendi: {path}")
+        return database
+
+    def __contains__(self, name):
+        return name in self._tags
+
+    def __len__(self):
+        return len(self._tags)
+
+    def __iter__(self):
+        return iter(self._tags.values())
+
+    def lookup(self, text):
+        """Etiket adi veya ham adres metnini Tag'e cevirir."""
+        text = str(text).strip()
+        tag = self._tags.get(text)
+        if tag is not None:
+            return tag
+        if not _RAW_ADDRESS.match(text):
+            raise ValueError(f"Bilinmeyen etiket: {text}")
+        return _raw_tag(text)
+
+    @functools.lru_cache(maxsize=256)
+    def resolve(self, names):
+        """Etiket listesini (tuple) tek adimda cozer; bilinmeyenlerin hepsi tek hatada raporlanir."""
+        tags = []
+        errors = []
+        for name in names:
+            try:
+                tags.append(self.lookup(name))
+            except ValueError as e:
+                errors.append(str(e))
+        if errors:
+            raise ValueError('; '.join(errors))
+        return tuple(tags)
+
+    def describe(self):
+        return [
+            {
+                'name': tag.name,
+                'address': tag.address.text,
+                'type': tag.address.data_type,
+                'scale': tag.scale,
+                'offset': tag.offset,
+                'unit': tag.unit,
+                'writable': tag.writable,
+                'description': tag.description,
+            }
+            for tag in self._tags.values()
+        ]
+
+    @staticmethod
+    def _compile(name, config):
+        if isinstance(config, str):
+            config = {'address': config}
+        if not config.get('address'):
+            raise ValueError(f"Etiket '{name}' icin address gerekli")
+        address = parse_plc_address(config['address'])
+        scale = float(config.get('scale', 1.0))
+        offset = float(config.get('offset', 0.0))
+        if scale == 0:
+            raise ValueError(f"Etiket '{name}' icin scale 0 olamaz")
+        if address.data_type == 'BOOL' and (scale != 1.0 or offset != 0.0):
+            raise ValueError(f"Etiket '{name}' bit adresi, olceklenemez")
+        return Tag(
+            name,
+            # Okuma sonuclari etiket adiyla anahtarlanir
+            address._replace(text=name),
+            scale,
+            offset,
+            config.get('unit'),
+            bool(config.get('writable', True)),
+            config.get('description', '')
+        )
+
+
+@functools.lru_cache(maxsize=4096)
+def _raw_tag(text):
+    return Tag(text, parse_plc_address(text), 1.0, 0.0, None, True, '')
+
+
+def to_engineering(tag, raw):
+    if tag.scale == 1.0 and tag.offset == 0.0:
+        return raw
+    return raw * tag.scale + tag.offset
+
+
+def to_raw(tag, value):
+    if tag.scale == 1.0 and tag.offset == 0.0:
+        return value
+    raw = (float(value) - tag.offset) / tag.scale
+    # Tam sayi tiplerde olceklenmis deger en yakin ham degere yuvarlanir
+    return raw if tag.address.data_type == 'REAL' else round(raw)
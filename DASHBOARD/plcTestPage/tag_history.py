@@ -0,0 +1,206 @@
+import bisect
+import logging
+import struct
+import sys
+import threading
+import time
+from array import array
+
+from block_decoder import compile_decoders
+from plc_address import DEFAULT_WORD_ORDER
+
+logger = logging.getLogger(__name__)
+
+# Binary cevap basligi: ornek sayisi (uint32), ardindan float64 zamanlar ve float32 degerler (little-endian)
+BINARY_HEADER = struct.Struct('<I')
+
+
+class RingBuffer:
+    """Sabit kapasiteli (zaman, deger) halka tamponu.
+
+    Veriler iki array('d') icinde tutulur, bellek kapasiteyle sabittir.
+    Zamanlar artan sirada eklendigi icin since() baslangici ikili arama ile
+    bulur.
+    """
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("Kapasite en az 1 olmali")
+        self.capacity = capacity
+        self._times = array('d', bytes(8 * capacity))
+        self._values = array('d', bytes(8 * capacity))
+        self._head = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp, value):
+        with self._lock:
+            self._times[self._head] = timestamp
+            self._values[self._head] = value
+            self._head = (self._head + 1) % self.capacity
+            if self._count < self.capacity:
+                self._count += 1
+
+    def since(self, timestamp=None):
+        """timestamp'ten yeni ornekleri (times, values) array'leri olarak eskiden yeniye doner."""
+        with self._lock:
+            start = (self._head - self._count) % self.capacity
+            if start + self._count <= self.capacity:
+                times = self._times[start:start + self._count]
+                values = self._values[start:start + self._count]
+            else:
+                times = self._times[start:] + self._times[:self._head]
+                values = self._values[start:] + self._values[:self._head]
+        if timestamp is not None:
+            index = bisect.bisect_right(times, timestamp)
+            times, values = times[index:], values[index:]
+        return times, values
+
+
+def downsample(times, values, points):
+    """Ornekleri en fazla points kovaya indirir: kova baslangic zamani, ortalama, min, max."""
+    count = len(times)
+    if points <= 0 or count <= points:
+        return times, values, values, values
+    bucket_times = array('d')
+    means = array('d')
+    minimums = array('d')
+    maximums = array('d')
+    for bucket in range(points):
+        start = bucket * count // points
+        end = (bucket + 1) * count // points
+        if start == end:
+            continue
+        chunk = values[start:end]
+        bucket_times.append(times[start])
+        means.append(sum(chunk) / len(chunk))
+        minimums.append(min(chunk))
+        maximums.append(max(chunk))
+    return bucket_times, means, minimums, maximums
+
+
+def encode_binary(times, values):
+    # Grafik istemcisi Float64Array / Float32Array olarak dogrudan okuyabilir
+    times = array('d', times)
+    values = array('f', values)
+    if sys.byteorder != 'little':
+        times.byteswap()
+        values.byteswap()
+    return BINARY_HEADER.pack(len(times)) + times.tobytes() + values.tobytes()
+
+
+class TagHistory:
+    """Makinenin secili etiketlerini sabit aralikla orneklayip halka tamponlarda tutar.
+
+    config (machines.json 'history' blogu):
+        tags      orneklenecek etiket adlari veya adresler (zorunlu)
+        interval  ornekleme araligi (sn), varsayilan 1
+        hours     tutulacak gecmis (saat), varsayilan 4
+        archive   true ise ornekler historian'a da (kalici gecmis) verilir
+        word_order  32 bit etiketlerin register sirasi, varsayilan 'little'
+
+    Tum etiketler her turda tek okumada (snapshot cache uzerinden) alinir.
+    Register bloklari cache'ten ham dizi olarak alinip BlockDecoder ile tek
+    geciste cozulur.
+    Okunamayan turlarda ornek eklenmez; grafikte bosluk olarak gorunur.
+    """
+
+    def __init__(self, machine_key, manager, tag_db, config, historian=None):
+        names = tuple(config.get('tags') or ())
+        if not names:
+            raise ValueError(f"Makine '{machine_key}' icin history etiketleri gerekli")
+        self.machine_key = machine_key
+        self.manager = manager
+        self.tags = tag_db.resolve(names)
+        self.interval = float(config.get('interval', 1.0))
+        self.hours = float(config.get('hours', 4.0))
+        if self.interval <= 0:
+            raise ValueError("history interval pozitif olmali")
+        capacity = max(1, int(self.hours * 3600 / self.interval))
+        self.buffers = {tag.name: RingBuffer(capacity) for tag in self.tags}
+        self.historian = historian if config.get('archive') else None
+        self.decoders = compile_decoders(self.tags, config.get('word_order', DEFAULT_WORD_ORDER))
+        self._blocks = [(decoder.start, decoder.count) for decoder in self.decoders]
+        self._coils = [tag for tag in self.tags if tag.address.area == 'coil']
+        self.samples = 0
+        self.failures = 0
+        self.last_error = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f'history-{self.machine_key}', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def buffer(self, tag_name):
+        if tag_name not in self.buffers:
+            raise ValueError(f"Etiket icin gecmis tutulmuyor: {tag_name}")
+        return self.buffers[tag_name]
+
+    def since(self, tag_name, timestamp=None):
+        return self.buffer(tag_name).since(timestamp)
+
+    def stats(self):
+        return {
+            'machine': self.machine_key,
+            'tags': list(self.buffers),
+            'interval': self.interval,
+            'hours': self.hours,
+            'capacity': next(iter(self.buffers.values())).capacity,
+            'samples': self.samples,
+            'archive': self.historian is not None,
+            'failures': self.failures,
+            'last_error': self.last_error,
+        }
+
+    def _sample(self):
+        max_age = self.interval / 2
+        samples = []
+        errors = {}
+        if self.decoders:
+            blocks, _ = self.manager.read_arrays('holding_registers', self._blocks, max_age, 'background')
+            for decoder, (registers, error) in zip(self.decoders, blocks):
+                if registers is None:
+                    errors[decoder.start] = error
+                elif not errors:
+                    samples.extend(zip(decoder.names, decoder.decode(registers)))
+        if self._coils and not errors:
+            values, errors, _ = self.manager.read(
+                'coils', [tag.address.address for tag in self._coils], max_age, 'background'
+            )
+            if not errors:
+                samples.extend((tag.name, float(values[tag.address.address])) for tag in self._coils)
+        if errors:
+            raise RuntimeError(next(iter(errors.values())))
+
+        now = time.time()
+        for name, value in samples:
+            self.buffers[name].append(now, value)
+        if self.historian is not None and samples:
+            self.historian.append(self.machine_key, samples, now)
+
+    def _run(self):
+        next_sample = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                self._sample()
+                self.samples += 1
+                self.last_error = None
+            except Exception as e:
+                self.failures += 1
+                if str(e) != self.last_error:
+                    logger.error(f"Gecmis ornekleme hatasi ({self.machine_key}): {e}")
+                self.last_error = str(e)
+
+            next_sample += self.interval
+            delay = next_sample - time.monotonic()
+            if delay > 0:
+                self._stop_event.wait(delay)
+            else:
+                next_sample = time.monotonic()
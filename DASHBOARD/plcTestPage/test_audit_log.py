@@ -0,0 +1,93 @@
+import os
+import time
+from datetime import datetime
+
+import pytest
+
+import audit_log
+from audit_log import AuditLog
+
+
+def test_query_returns_records_in_range(tmp_path):
+    log = AuditLog(str(tmp_path), commit_interval=0.01)
+    stamps = [log.append({'machine': 'm1' if index % 2 else 'm2', 'index': index}) for index in range(20)]
+    log.close()
+
+    records = log.query(since=stamps[5], until=stamps[14])
+    assert [record['index'] for record in records] == list(range(5, 15))
+    assert [record['index'] for record in log.query(machine='m1', limit=3)] == [1, 3, 5]
+
+
+def test_failed_day_is_retried_without_rewriting_committed_day(tmp_path, monkeypatch):
+    log = AuditLog(str(tmp_path), commit_interval=0.01)
+    yesterday = datetime(2026, 1, 1, 23, 59).timestamp()
+    today = datetime(2026, 1, 2, 0, 1).timestamp()
+    original = AuditLog._append_file
+    attempts = []
+
+    def flaky(path, data):
+        attempts.append(os.path.basename(path))
+        # 2 Ocak dosyasi ilk iki denemede yazilamaz
+        if path.endswith('20260102.jsonl') and attempts.count('audit-20260102.jsonl') <= 2:
+            raise OSError(28, 'No space left on device')
+        original(path, data)
+
+    monkeypatch.setattr(AuditLog, '_append_file', staticmethod(flaky))
+    with log._condition:
+        log._buffer.extend([{'ts': yesterday, 'index': 0}, {'ts': today, 'index': 1}])
+        log.appended += 2
+        log._condition.notify()
+    log.flush()
+    log.close()
+
+    assert attempts.count('audit-20260101.jsonl') == 1
+    assert attempts.count('audit-20260102.jsonl') == 3
+    with open(tmp_path / 'audit-20260101.jsonl') as f:
+        assert len(f.readlines()) == 1
+    assert [record['index'] for record in log.query()] == [0, 1]
+    stats = log.stats()
+    assert (stats['committed'], stats['failed'], stats['dropped'], stats['pending']) == (2, 2, 0, 0)
+
+
+def test_pending_is_bounded_while_disk_fails(tmp_path, monkeypatch):
+    def broken(path, data):
+        raise OSError(28, 'No space left on device')
+
+    monkeypatch.setattr(AuditLog, '_append_file', staticmethod(broken))
+    log = AuditLog(str(tmp_path), commit_interval=0.01, max_pending=10)
+    for index in range(25):
+        log.append({'index': index})
+    deadline = time.monotonic() + 2
+    while log.dropped < 15 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert log.dropped == 15
+    with log._condition:
+        assert [record['index'] for record in log._buffer] == list(range(15, 25))
+
+
+def test_partial_write_is_truncated(tmp_path, monkeypatch):
+    path = tmp_path / 'audit-20260101.jsonl'
+    path.write_text('{"ts":1}\n')
+
+    class FailingFile:
+        def __init__(self, f):
+            self.f = f
+
+        def __getattr__(self, name):
+            return getattr(self.f, name)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return self.f.__exit__(*exc)
+
+        def flush(self):
+            self.f.flush()
+            raise OSError(5, 'I/O error')
+
+    monkeypatch.setattr(audit_log, 'open', lambda *args, **kwargs: FailingFile(open(*args, **kwargs)), raising=False)
+    with pytest.raises(OSError):
+        AuditLog._append_file(str(path), '{"ts":2}\n{"ts":3}\n')
+    assert path.read_text() == '{"ts":1}\n'
@@ -0,0 +1,130 @@
+import math
+import random
+from array import array
+
+import pytest
+
+from block_decoder import BlockDecoder, compile_decoders
+from modbus_blocks import MAX_READ_REGISTERS
+from plc_address import decode_value, parse_plc_address
+from tag_database import Tag, to_engineering
+
+
+def make_tag(name, address, scale=1.0, offset=0.0):
+    return Tag(name, parse_plc_address(address), scale, offset, '', False, '')
+
+
+# Bosluklu, cakisan (ayni word'un bitleri, REAL'in yarisini okuyan WORD) ve olcekli etiketler
+TAGS = [
+    make_tag('speed', 'HR100:REAL'),
+    make_tag('speed_low', 'HR100'),
+    make_tag('period', 'HR102:REAL', scale=0.1, offset=-2.0),
+    make_tag('count', 'HR104:DINT'),
+    make_tag('total', 'HR106:DWORD'),
+    make_tag('temp', 'HR109:INT', scale=0.5),
+    make_tag('status', 'HR110'),
+    make_tag('running', 'HR110.0'),
+    make_tag('alarm', 'HR110.15'),
+    make_tag('odd_real', 'HR111:REAL'),
+    make_tag('far', 'HR120:REAL'),
+]
+
+
+def reference(tag, registers, start, word_order):
+    # Etiket basina eski yol: decode_value + bit + olcek
+    address = tag.address
+    offset = address.address - start
+    if address.area == 'register_bit':
+        return float(registers[offset] >> address.bit & 1)
+    raw = decode_value(address.data_type, registers[offset:offset + address.count], word_order)
+    return float(to_engineering(tag, raw))
+
+
+def same(a, b):
+    return (math.isnan(a) and math.isnan(b)) or a == b
+
+
+@pytest.mark.parametrize('word_order', ['big', 'little'])
+def test_decode_matches_per_tag_decoding(word_order):
+    decoder = BlockDecoder(TAGS, 100, 22, word_order)
+    assert sorted(decoder.names) == sorted(tag.name for tag in TAGS)
+    rng = random.Random(word_order)
+    for _ in range(500):
+        registers = [rng.randrange(0x10000) for _ in range(22)]
+        for values in (decoder.decode(array('H', registers)), decoder.decode_list(registers)):
+            for name, value in zip(decoder.names, values):
+                tag = next(tag for tag in TAGS if tag.name == name)
+                assert same(value, reference(tag, registers, 100, word_order)), name
+
+
+def test_known_values():
+    decoder = BlockDecoder(TAGS, 100, 22, 'little')
+    registers = [0] * 22
+    registers[0:2] = [0x0000, 0x3FC0]       # speed = 1.5 (dusuk word once)
+    registers[4:6] = [0xFFFE, 0xFFFF]       # count = -2
+    registers[9] = 0xFFF6                   # temp = -10 * 0.5
+    registers[10] = 0x8001                  # running, alarm
+    values = dict(zip(decoder.names, decoder.decode_list(registers)))
+    assert values['speed'] == 1.5
+    assert values['speed_low'] == 0
+    assert values['count'] == -2
+    assert values['temp'] == -5.0
+    assert (values['status'], values['running'], values['alarm']) == (0x8001, 1, 1)
+    assert values['period'] == -2.0
+
+
+def test_decode_reads_snapshot_block_and_image_slices():
+    decoder = BlockDecoder([make_tag('a', 'HR10'), make_tag('b', 'HR12:DINT')], 10, 4, 'big')
+    block = array('H', [1, 7, 99, 0xFFFF, 0xFFFF, 5])
+    # Daha buyuk bir blogun (snapshot cache veya paylasilan imaj) dilimi kopyalanmadan okunur
+    values = decoder.decode(memoryview(block)[1:5])
+    assert dict(zip(decoder.names, values)) == {'a': 7, 'b': -1}
+
+
+def test_decode_reuses_values_array():
+    decoder = BlockDecoder([make_tag('a', 'HR0')], 0, 1)
+    first = decoder.decode_list([1])
+    second = decoder.decode_list([2])
+    assert first is second is decoder.values
+    assert list(second) == [2.0]
+
+
+@pytest.mark.parametrize('tags, start, count, word_order', [
+    ([make_tag('coil', '5')], 0, 10, 'big'),
+    ([make_tag('a', 'HR9')], 10, 5, 'big'),
+    ([make_tag('a', 'HR14:REAL')], 10, 5, 'big'),
+    ([make_tag('a', 'HR10')], 10, 0, 'big'),
+    ([make_tag('a', 'HR10')], 10, MAX_READ_REGISTERS + 1, 'big'),
+    ([make_tag('a', 'HR10')], 10, 1, 'middle'),
+])
+def test_invalid_blocks(tags, start, count, word_order):
+    with pytest.raises(ValueError):
+        BlockDecoder(tags, start, count, word_order)
+
+
+def test_compile_decoders_splits_on_gap():
+    tags = [
+        make_tag('a', 'HR0'),
+        make_tag('b', 'HR5:REAL'),       # bosluk 4 <= max_gap: ayni blok
+        make_tag('c', 'HR20'),           # bosluk 13 > max_gap: yeni blok
+        make_tag('x', '3'),              # coil'ler atlanir
+    ]
+    decoders = compile_decoders(tags, 'big', max_gap=8)
+    assert [(decoder.start, decoder.count, sorted(decoder.names)) for decoder in decoders] == [
+        (0, 7, ['a', 'b']),
+        (20, 1, ['c']),
+    ]
+
+
+def test_compile_decoders_respects_block_size_without_splitting_tags():
+    tags = [
+        make_tag('c', 'HR20'),
+        make_tag('d', 'HR143:REAL'),     # 20-144 = 125 register, sigar
+        make_tag('e', 'HR144'),          # ayni register araliginda
+        make_tag('f', 'HR145:REAL'),     # 126'yi asar: yeni blok, REAL bolunmez
+    ]
+    decoders = compile_decoders(tags, 'big', max_gap=200)
+    assert [(decoder.start, decoder.count, sorted(decoder.names)) for decoder in decoders] == [
+        (20, 125, ['c', 'd', 'e']),
+        (145, 2, ['f']),
+    ]
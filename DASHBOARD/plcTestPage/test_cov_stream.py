@@ -0,0 +1,99 @@
+import threading
+import time
+
+from cov_stream import COVHub, Subscription
+
+
+def drain(subscription):
+    events = []
+    while not subscription.events.empty():
+        events.append(subscription.events.get_nowait())
+    return events
+
+
+def sent_values(subscription):
+    return [payload['values'] for event, payload in drain(subscription) if event == 'values']
+
+
+def test_deadband_applies_to_registers_only():
+    subscription = Subscription('m1', {
+        ('holding_registers', 10): ('hiz', 5),
+        ('coils', 3): ('motor', 5),
+    })
+    subscription.offer({'holding_registers': {10: 100}, 'coils': {3: False}})
+    assert sent_values(subscription) == [{'holding_registers': {'hiz': 100}, 'coils': {'motor': False}}]
+
+    # Deadband icindeki degisim gonderilmez; coil degisimi her zaman gider
+    subscription.offer({'holding_registers': {10: 105}, 'coils': {3: True}})
+    assert sent_values(subscription) == [{'coils': {'motor': True}}]
+
+    # Karsilastirma son gonderilen degere gore: 100 -> 106 deadband'i asar
+    subscription.offer({'holding_registers': {10: 106}, 'coils': {3: True}})
+    subscription.offer({'holding_registers': {10: 106}, 'coils': {3: True}})
+    assert sent_values(subscription) == [{'holding_registers': {'hiz': 106}}]
+
+
+def test_zero_deadband_sends_every_change_and_skips_missing_values():
+    subscription = Subscription('m1', {('input_registers', 0): ('sicaklik', 0)})
+    subscription.offer({'input_registers': {0: 20}})
+    subscription.offer({'input_registers': {}})
+    subscription.offer({'input_registers': {0: 21}})
+    assert sent_values(subscription) == [{'input_registers': {'sicaklik': 20}}, {'input_registers': {'sicaklik': 21}}]
+
+
+def test_full_queue_resyncs_and_resends_everything():
+    subscription = Subscription('m1', {('holding_registers', 0): ('a', 0)}, max_queue=2)
+    for value in range(3):
+        subscription.offer({'holding_registers': {0: value}})
+    assert [event for event, _ in drain(subscription)] == ['resync']
+    assert subscription.resync_count == 1
+
+    # Kuyruk bosaltildi, ayni deger bile yeniden gonderilir
+    subscription.offer({'holding_registers': {0: 2}})
+    assert sent_values(subscription) == [{'holding_registers': {'a': 2}}]
+
+
+def test_error_status_is_sent_only_when_it_changes():
+    subscription = Subscription('m1', {})
+    subscription.report_error([])
+    subscription.report_error(['zaman asimi', 'zaman asimi'])
+    subscription.report_error(['zaman asimi'])
+    subscription.report_error([])
+    assert [(payload['ok'], payload['error']) for _, payload in drain(subscription)] == [
+        (False, 'zaman asimi'), (True, None)
+    ]
+
+
+class FakeManager:
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def read(self, table, addresses, max_age=None, priority='interactive'):
+        with self.lock:
+            self.calls.append((table, addresses, priority))
+        return {address: address * 10 for address in addresses}, {}, 0.0
+
+
+def test_hub_scans_the_union_once_per_machine_and_stops_without_subscribers():
+    manager = FakeManager()
+    hub = COVHub(lambda machine_key: manager, scan_interval=0.01)
+    first = hub.subscribe('m1', {('holding_registers', 1): ('a', 0), ('holding_registers', 2): ('b', 0)})
+    second = hub.subscribe('m1', {('holding_registers', 2): ('b2', 0), ('coils', 7): ('c', 0)})
+    deadline = time.monotonic() + 3
+    while hub.scan_count < 3 and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+    hub.unsubscribe(first)
+    hub.unsubscribe(second)
+    deadline = time.monotonic() + 3
+    while hub.stats()['active_scanners'] and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+    assert hub.stats()['active_scanners'] == []
+    # Iki abonenin ortak adresi (2) tek okumada istenir
+    assert {(table, tuple(addresses), priority) for table, addresses, priority in manager.calls} == {
+        ('holding_registers', (1, 2), 'background'), ('coils', (7,), 'background')
+    }
+    assert sent_values(first)[0] == {'holding_registers': {'a': 10, 'b': 20}}
+    assert sent_values(second)[0] == {'holding_registers': {'b2': 20}, 'coils': {'c': 70}}
@@ -0,0 +1,125 @@
+import asyncio
+import struct
+import threading
+
+import pytest
+
+from energy_meters import BUCKET_SECONDS, EnergyMeters, MachineEnergy, Meter, MeterLayout
+from modbus_server import ModbusTcpServer
+from plc_simulator import PLCSimulator
+
+
+def float_registers(*values, word_order='big'):
+    registers = []
+    for value in values:
+        high, low = struct.unpack('>2H', struct.pack('>f', value))
+        registers.extend((high, low) if word_order == 'big' else (low, high))
+    return registers
+
+
+@pytest.mark.parametrize('word_order', ['big', 'little'])
+def test_layout_decodes_fields_with_gaps(word_order):
+    layout = MeterLayout({'power_kw': 4, 'voltage': 0}, start=100, function=3, word_order=word_order)
+    assert (layout.table, layout.count, layout.names) == ('holding_registers', 6, ['voltage', 'power_kw'])
+    registers = float_registers(230.5, 0.0, 12.25, word_order=word_order)
+    assert layout.decode(registers) == {'voltage': 230.5, 'power_kw': 12.25}
+
+
+@pytest.mark.parametrize('fields, options', [
+    ({}, {}),
+    ({'a': 0, 'b': 1}, {}),
+    ({'a': 0}, {'function': 1}),
+    ({'a': 0}, {'word_order': 'middle'}),
+    ({'a': 0, 'b': 124}, {}),
+])
+def test_layout_rejects_invalid_blocks(fields, options):
+    with pytest.raises(ValueError):
+        MeterLayout(fields, **options)
+
+
+def make_meter(**config):
+    config = dict({'machine': 'm1', 'host': '127.0.0.1', 'fields': {'power_kw': 0}}, **config)
+    return Meter('meter', config, interval=60.0)
+
+
+def test_power_is_integrated_with_trapezoid_rule():
+    meter = make_meter(max_gap=600)
+    assert meter.apply(float_registers(10.0), 0.0, 1000.0) == 0.0
+    # 10 kW -> 20 kW, 6 dakika: ortalama 15 kW * 0.1 saat
+    assert meter.apply(float_registers(20.0), 360.0, 1360.0) == pytest.approx(1.5)
+    assert meter.apply(float_registers(20.0), 540.0, 1540.0) == pytest.approx(1.0)
+    assert meter.energy == pytest.approx(2.5)
+    assert (meter.power, meter.samples, meter.gaps) == (20.0, 3, 0)
+
+
+def test_gap_longer_than_max_gap_is_not_integrated():
+    meter = make_meter(max_gap=30, power_scale=0.001)
+    meter.apply(float_registers(5000.0), 0.0, 0.0)
+    assert meter.apply(float_registers(5000.0), 31.0, 31.0) == 0.0
+    assert meter.gaps == 1
+    # Bosluktan sonraki ornek yeni baslangic noktasidir; guc olceklenir (W -> kW)
+    assert meter.apply(float_registers(5000.0), 31.0 + 3.6, 34.6) == pytest.approx(5 * 3.6 / 3600)
+
+
+def test_machine_energy_windows():
+    energy = MachineEnergy()
+    now = 100 * 24 * 3600.0
+    energy.add(now - 2 * 3600, 4.0)
+    energy.add(now - 10 * 60, 2.0)
+    energy.add(now - 5, 1.0)
+    energy.add(now - 2, 0.5)
+    totals = energy.totals(now)
+    assert totals['total_kwh'] == 7.5
+    assert totals['windows_kwh'] == {'15m': 3.5, '1h': 3.5, '24h': 7.5}
+    # Ayni dakikadaki eklemeler tek kovada
+    assert len(energy._buckets) == 3
+    energy.add(now + 2 * 24 * 3600 + BUCKET_SECONDS, 0.0)
+    assert len(energy._buckets) == 1
+
+
+@pytest.fixture
+def gateway_device():
+    # Sahte Modbus gateway: gelen isteklerin slave id'lerini kaydeder
+    simulator = PLCSimulator(registers=64)
+    simulator.context[1].setValues(3, 0, float_registers(1.5, 2.5))
+    simulator.context[1].setValues(3, 10, float_registers(7.0))
+    units = []
+
+    async def handle(unit_id, pdu):
+        units.append(unit_id)
+        return await simulator.handle(unit_id, pdu)
+
+    loop = asyncio.new_event_loop()
+    server = ModbusTcpServer(handle, '127.0.0.1', 0)
+    loop.run_until_complete(server.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield server, server._server.sockets[0].getsockname()[1], units
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+
+
+def test_meters_behind_one_gateway_share_a_connection(gateway_device):
+    server, port, units = gateway_device
+    meters = EnergyMeters({
+        'a': {'machine': 'm1', 'host': '127.0.0.1', 'port': port, 'slave_id': 3, 'function': 3,
+              'fields': {'power_kw': 0, 'energy_kwh': 2}},
+        'b': {'machine': 'm2', 'host': '127.0.0.1', 'port': port, 'slave_id': 7, 'function': 3,
+              'start': 10, 'fields': {'power_kw': 0}},
+    }, {'fast': 1.0}, request_timeout=5.0, timeout=2.0)
+    meters.gateway.start()
+    try:
+        meters._scan(list(meters.meters.values()))
+        meters._scan(list(meters.meters.values()))
+        status = meters.status()
+    finally:
+        meters.stop()
+
+    assert list(meters.gateway.sessions) == [f'127.0.0.1:{port}']
+    assert server.connection_count == 1
+    assert sorted(set(units)) == [3, 7]
+    assert status['meters']['a']['values'] == {'power_kw': 1.5, 'energy_kwh': 2.5}
+    assert status['meters']['b']['power_kw'] == 7.0
+    assert status['connections'] == {'a': 'connected', 'b': 'connected'}
+    assert meters.meters['a'].samples == 2 and meters.meters['a'].energy > 0
@@ -0,0 +1,68 @@
+import pytest
+
+from job_recipe import RecipeLayout, parse_setpoint
+
+
+@pytest.mark.parametrize('value_type, count', [('REAL', 51), ('int', 27), ('DINT', 51)])
+def test_layout_is_one_contiguous_block(value_type, count):
+    layout = RecipeLayout(1000, value_type)
+    assert (layout.count, layout.transactions) == (count, 1)
+
+    addresses = [plc_address for _, plc_address in layout.fields]
+    assert addresses[0].address == 1000
+    # Alanlar bosluksuz ve ust uste binmeden arka arkaya dizilir
+    for previous, current in zip(addresses, addresses[1:]):
+        assert current.address == previous.address + previous.count
+    assert addresses[-1].address + addresses[-1].count == 1000 + count
+
+    described = layout.describe()
+    assert [field['field'] for field in described['fields'][:5]] == [
+        'dr_blade.F', 'dr_blade.V', 'dr_blade.H', 'vizkozite.1', 'vizkozite.2'
+    ]
+    assert described['fields'][-1]['field'] == 'solvent_orani.12'
+    assert {field['type'] for field in described['fields'][3:]} == {value_type.upper()}
+
+
+@pytest.mark.parametrize('start, value_type', [(0xFFFF - 10, 'REAL'), (0, 'STRING')])
+def test_layout_rejects_bad_config(start, value_type):
+    with pytest.raises(ValueError):
+        RecipeLayout(start, value_type)
+    with pytest.raises(ValueError):
+        RecipeLayout.from_config({'value_type': 'REAL'})
+
+
+def test_build_fills_missing_units_with_zero_and_parses_text():
+    layout = RecipeLayout(0, 'INT')
+    writes = layout.build({
+        'dr_blade_angles': {'F': 450, 'V': 43, 'H': 36},
+        'vizkozite': ['18', '18,0', '', None],
+        'solvent_orani': ['%20'],
+    })
+    values = {name: value for name, _, value in writes}
+    assert len(writes) == len(layout.fields)
+    assert [values[f'dr_blade.{name}'] for name in 'FVH'] == [450, 43, 36]
+    assert [values[f'vizkozite.{unit}'] for unit in range(1, 6)] == [18, 18, 0, 0, 0]
+    assert values['solvent_orani.1'] == 20 and values['solvent_orani.12'] == 0
+    assert all(isinstance(value, int) for value in values.values())
+
+
+def test_build_reports_every_bad_field_at_once():
+    layout = RecipeLayout(0, 'INT')
+    with pytest.raises(ValueError) as error:
+        layout.build({'vizkozite': ['abc', '18,5'], 'dr_blade_angles': {'F': 70000}})
+    message = str(error.value)
+    assert 'vizkozite.1' in message and 'vizkozite.2' in message and 'dr_blade.F' in message
+
+    with pytest.raises(ValueError):
+        layout.build({'vizkozite': [0] * 13})
+
+
+@pytest.mark.parametrize('value, expected', [(None, 0.0), ('', 0.0), (' 12,5 ', 12.5), ('%7', 7.0), (3, 3.0)])
+def test_parse_setpoint(value, expected):
+    assert parse_setpoint(value) == expected
+
+
+@pytest.mark.parametrize('value', [True, 'yok'])
+def test_parse_setpoint_rejects_non_numbers(value):
+    with pytest.raises(ValueError):
+        parse_setpoint(value)
@@ -0,0 +1,68 @@
+import pytest
+
+from modbus_blocks import (
+    MAX_READ_REGISTERS, MAX_WRITE_REGISTERS, group_coil_writes, group_register_writes, plan_reads, read_block
+)
+
+
+def test_plan_reads_merges_contiguous_addresses():
+    assert plan_reads([3, 1, 2, 2], MAX_READ_REGISTERS) == [(1, 3)]
+
+
+def test_plan_reads_splits_on_gap():
+    assert plan_reads([0, 1, 10, 11], MAX_READ_REGISTERS) == [(0, 2), (10, 2)]
+
+
+@pytest.mark.parametrize('max_gap, expected', [
+    (3, [(0, 2), (6, 1)]),
+    (4, [(0, 7)]),
+])
+def test_plan_reads_bridges_gaps_up_to_max_gap(max_gap, expected):
+    # 1 ile 6 arasinda 4 adreslik bosluk var
+    assert plan_reads([0, 1, 6], MAX_READ_REGISTERS, max_gap=max_gap) == expected
+
+
+def test_plan_reads_respects_max_count():
+    blocks = plan_reads(range(300), MAX_READ_REGISTERS)
+    assert blocks == [(0, 125), (125, 125), (250, 50)]
+    assert all(count <= MAX_READ_REGISTERS for _, count in blocks)
+
+
+def test_plan_reads_max_count_with_gap_bridging():
+    blocks = plan_reads([0, 5, 124, 125], MAX_READ_REGISTERS, max_gap=200)
+    assert blocks == [(0, 125), (125, 1)]
+
+
+def test_plan_reads_empty():
+    assert plan_reads([], MAX_READ_REGISTERS) == []
+
+
+def test_group_register_writes_last_value_wins_and_masks_to_16_bits():
+    blocks = group_register_writes([(11, 5), (10, 1), (11, 7), (12, -1)])
+    assert blocks == [(10, [1, 7, 0xFFFF])]
+
+
+def test_group_register_writes_splits_non_contiguous_and_long_runs():
+    writes = [(address, address) for address in range(MAX_WRITE_REGISTERS + 1)] + [(500, 1)]
+    blocks = group_register_writes(writes)
+    assert [(start, len(values)) for start, values in blocks] == [(0, MAX_WRITE_REGISTERS), (MAX_WRITE_REGISTERS, 1), (500, 1)]
+
+
+def test_group_coil_writes_converts_to_bool():
+    assert group_coil_writes([(2, 1), (1, 0), (3, 'x')]) == [(1, [False, True, True])]
+
+
+def test_read_block_calls_table_reader():
+    calls = []
+
+    class Client:
+        def read_input_registers(self, start, count, slave):
+            calls.append((start, count, slave))
+            return 'result'
+
+    operations = [read_block('input_registers', start, 2) for start in (10, 20)]
+    assert [operation(Client(), 3) for operation in operations] == ['result', 'result']
+    assert calls == [(10, 2, 3), (20, 2, 3)]
+    # Gateway arkasindaki cihaz icin oturumun slave'i yerine verilen slave kullanilir
+    read_block('input_registers', 30, 1, slave=9)(Client(), 3)
+    assert calls[-1] == (30, 1, 9)
@@ -0,0 +1,55 @@
+import asyncio
+
+from modbus_capture import _HOOKS, ModbusCapture
+from modbus_server import ModbusTcpServer
+from plc_session import PLCSession
+from plc_simulator import PLCSimulator
+
+
+def read_coil(client, slave):
+    return client.read_coils(0, 1, slave=slave)
+
+
+def test_capture_cycles_do_not_stack_wrappers(tmp_path):
+    async def main():
+        server = ModbusTcpServer(PLCSimulator(coils=16, registers=16).handle, '127.0.0.1', 0)
+        await server.start()
+        port = server._server.sockets[0].getsockname()[1]
+        session = PLCSession('127.0.0.1', port, 1, timeout=2.0)
+        await session.start()
+        try:
+            assert (await session.execute(read_coil))[0]
+            client = session._client
+            original = {hook: getattr(client, hook) for hook in _HOOKS}
+
+            captures = []
+            for cycle in range(3):
+                capture = ModbusCapture(str(tmp_path / f'{cycle}.cap'))
+                session.set_capture(capture)
+                # Sarmalayici her seferinde dogrudan orijinali cagirir
+                assert client._capture_original == original
+                assert (await session.execute(read_coil))[0]
+                session.set_capture(None)
+                capture.close()
+                captures.append(capture)
+
+            assert {hook: getattr(client, hook) for hook in _HOOKS} == original
+            assert not hasattr(client, '_capture_original')
+            assert (await session.execute(read_coil))[0]
+            return [capture.frames for capture in captures]
+        finally:
+            await session.stop()
+            await server.stop()
+
+    # Her kayit sadece kendi acikken gecen istek ve cevabi gorur
+    assert asyncio.run(main()) == [2, 2, 2]
+
+
+def test_detach_without_attach_is_a_no_op():
+    class Client:
+        def transport_send(self, data, addr=None):
+            return data
+
+    client = Client()
+    ModbusCapture.detach(client)
+    assert 'transport_send' not in vars(client)
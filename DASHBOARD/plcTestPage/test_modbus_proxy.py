@@ -0,0 +1,108 @@
+import asyncio
+import struct
+import threading
+import time
+
+import pytest
+
+from modbus_proxy import GATEWAY_TARGET_FAILED, ILLEGAL_DATA_VALUE, ILLEGAL_FUNCTION, ModbusProxy
+
+
+class FakeManager:
+    """Yazmalari kaydeden, her birinde biraz bekleyen sahte PLCManager."""
+
+    def __init__(self, delays=()):
+        self.values = {'coils': {0: True, 2: True, 9: True}, 'holding_registers': {10: 0x1234, 11: 0xABCD}}
+        self.delays = list(delays)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.writes = []
+        self.fail = False
+
+    def read(self, table, addresses, max_age=None, priority='interactive'):
+        values = self.values.get(table, {})
+        return {address: values.get(address, 0) for address in addresses}, {}, 0.0
+
+    def _write(self, kind, writes, source):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            delay = self.delays.pop(0) if self.delays else 0.0
+        time.sleep(delay)
+        with self.lock:
+            self.active -= 1
+            self.writes.append((kind, writes, source))
+        return {key: (not self.fail, 'PLC hatasi' if self.fail else 'Basari', None) for key, *_ in writes}, 1
+
+    def write_coils(self, writes, source=None, verify=False):
+        return self._write('coils', writes, source)
+
+    def write_registers(self, writes, source=None, verify=False):
+        return self._write('registers', writes, source)
+
+    def write_register_bits(self, writes, source=None, verify=False):
+        return self._write('bits', [((register, bit), value) for register, bit, value in writes], source)
+
+
+def run(proxy, *pdus):
+    async def main():
+        return await asyncio.gather(*(proxy.handle(1, pdu) for pdu in pdus))
+
+    try:
+        return asyncio.run(main())
+    finally:
+        proxy._executor.shutdown(wait=True)
+
+
+def test_reads_are_packed_like_a_plc():
+    proxy = ModbusProxy(FakeManager(), port=0)
+    coils, registers = run(proxy, struct.pack('>BHH', 1, 0, 10), struct.pack('>BHH', 3, 10, 2))
+    assert coils == bytes((1, 2, 0b0000_0101, 0b0000_0010))
+    assert registers == bytes((3, 4)) + struct.pack('>HH', 0x1234, 0xABCD)
+    assert proxy.stats()['reads'] == 2
+
+
+@pytest.mark.parametrize('pdu, code', [
+    (struct.pack('>BHH', 3, 0, 0), ILLEGAL_DATA_VALUE),
+    (struct.pack('>BHH', 3, 0, 126), ILLEGAL_DATA_VALUE),
+    (struct.pack('>BHH', 5, 1, 0x1234), ILLEGAL_DATA_VALUE),
+    (struct.pack('>BHHB', 16, 0, 2, 2) + b'\x00\x01', ILLEGAL_DATA_VALUE),
+    (bytes((3, 0)), ILLEGAL_DATA_VALUE),
+    (bytes((43, 14, 1, 0)), ILLEGAL_FUNCTION),
+])
+def test_malformed_requests_get_exception_responses(pdu, code):
+    proxy = ModbusProxy(FakeManager(), port=0)
+    assert run(proxy, pdu) == [bytes((pdu[0] | 0x80, code))]
+    assert proxy.stats()['rejected'] == 1
+
+
+def test_writes_are_serialised_in_arrival_order():
+    # Ilk yazma en yavasi: kilit olmasa sonrakiler onu gecerdi
+    manager = FakeManager(delays=[0.05, 0.01, 0.0, 0.0])
+    proxy = ModbusProxy(manager, port=5020)
+    responses = run(
+        proxy,
+        struct.pack('>BHH', 6, 1, 100),
+        struct.pack('>BHH', 5, 3, 0xFF00),
+        struct.pack('>BHHB', 16, 20, 2, 4) + struct.pack('>HH', 7, 8),
+        struct.pack('>BHHH', 22, 30, 0xFFF6, 0x0008),
+    )
+    assert responses[0] == struct.pack('>BHH', 6, 1, 100)
+    assert responses[3] == struct.pack('>BHHH', 22, 30, 0xFFF6, 0x0008)
+    assert manager.max_active == 1
+    assert manager.writes == [
+        ('registers', [(1, 100)], 'modbus-proxy:5020'),
+        ('coils', [(3, True)], 'modbus-proxy:5020'),
+        ('registers', [(20, 7), (21, 8)], 'modbus-proxy:5020'),
+        # AND maskesinde 0 olan bitler (0 ve 3) OR maskesindeki degerle yazilir
+        ('bits', [((30, 0), False), ((30, 3), True)], 'modbus-proxy:5020'),
+    ]
+
+
+def test_failed_plc_write_maps_to_gateway_exception():
+    manager = FakeManager()
+    manager.fail = True
+    proxy = ModbusProxy(manager, port=0)
+    assert run(proxy, struct.pack('>BHH', 6, 1, 100)) == [bytes((0x86, GATEWAY_TARGET_FAILED))]
+    assert proxy.stats()['failures'] == 1
@@ -0,0 +1,133 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import periodic_snapshots
+from periodic_snapshots import PeriodicSnapshotCollector, next_period_start, period_start
+
+
+@pytest.mark.parametrize('snapshot_type, moment, start, following', [
+    ('daily', datetime(2026, 3, 15, 13, 30), datetime(2026, 3, 15), datetime(2026, 3, 16)),
+    ('daily', datetime(2026, 12, 31, 23, 59), datetime(2026, 12, 31), datetime(2027, 1, 1)),
+    ('weekly', datetime(2026, 3, 15, 13, 30), datetime(2026, 3, 9), datetime(2026, 3, 16)),
+    ('weekly', datetime(2026, 3, 16), datetime(2026, 3, 16), datetime(2026, 3, 23)),
+    ('monthly', datetime(2026, 1, 31, 8), datetime(2026, 1, 1), datetime(2026, 2, 1)),
+    ('monthly', datetime(2026, 2, 28, 8), datetime(2026, 2, 1), datetime(2026, 3, 1)),
+    ('quarterly', datetime(2026, 3, 31, 8), datetime(2026, 1, 1), datetime(2026, 4, 1)),
+    ('quarterly', datetime(2026, 11, 2), datetime(2026, 10, 1), datetime(2027, 1, 1)),
+    ('yearly', datetime(2028, 2, 29, 8), datetime(2028, 1, 1), datetime(2029, 1, 1)),
+])
+def test_period_boundaries(snapshot_type, moment, start, following):
+    assert period_start(snapshot_type, moment) == start
+    assert next_period_start(snapshot_type, moment) == following
+    assert next_period_start(snapshot_type, start) == following
+
+
+def test_unknown_type():
+    with pytest.raises(ValueError):
+        period_start('hourly', datetime(2026, 1, 1))
+
+
+class FakeTagDatabase:
+    def resolve(self, names):
+        return [SimpleNamespace(name=name, address=SimpleNamespace(text=f'HR{index}')) for index, name in enumerate(names)]
+
+
+class FakeManager:
+    def __init__(self):
+        self.value = 0.0
+        self.errors = {}
+        self.reads = 0
+
+    def read_values(self, addresses, max_age=None, priority=None):
+        self.reads += 1
+        return {address.text: self.value for address in addresses}, self.errors, None
+
+
+@pytest.fixture
+def make_collector(tmp_path, monkeypatch):
+    monkeypatch.setattr(periodic_snapshots, 'to_engineering', lambda tag, value: value)
+    manager = FakeManager()
+    collectors = []
+
+    def make(types=('daily',)):
+        collector = PeriodicSnapshotCollector(
+            str(tmp_path / 'snapshots.db'), {'m1': manager}, FakeTagDatabase(),
+            {'m1': {'tags': {'actual_production': 'ActualProduction'}}}, types=types, grace=60.0
+        )
+        collectors.append(collector)
+        return collector
+
+    make.manager = manager
+    yield make
+    for collector in collectors:
+        collector._db.close()
+
+
+def dates(collector, **filters):
+    return [(row['snapshot_date'], row['caught_up'], row['actual_production']) for row in collector.query(**filters)]
+
+
+def test_first_run_does_not_record_partial_period(make_collector):
+    collector = make_collector()
+    assert collector.capture_due(datetime(2026, 3, 15, 10)) == 0
+    assert collector.capture_due(datetime(2026, 3, 15, 23)) == 0
+    make_collector.manager.value = 42.0
+    assert collector.capture_due(datetime(2026, 3, 16, 0, 0, 5)) == 1
+    assert dates(collector) == [('2026-03-16T00:00:00', False, 42.0)]
+
+
+def test_missed_boundaries_are_caught_up_after_restart(make_collector):
+    collector = make_collector()
+    make_collector.manager.value = 1.0
+    collector.capture_due(datetime(2026, 3, 15, 10))
+    collector.capture_due(datetime(2026, 3, 16, 0, 0, 1))
+
+    # Servis 16'sinda kapanip 19'unda aciliyor
+    restarted = make_collector()
+    make_collector.manager.value = 7.0
+    assert restarted.capture_due(datetime(2026, 3, 19, 9)) == 3
+    assert dates(restarted) == [
+        ('2026-03-19T00:00:00', True, 7.0),
+        ('2026-03-18T00:00:00', True, None),
+        ('2026-03-17T00:00:00', True, None),
+        ('2026-03-16T00:00:00', False, 1.0),
+    ]
+
+
+def test_first_boundary_is_caught_up_when_down_before_any_row(make_collector):
+    collector = make_collector()
+    collector.capture_due(datetime(2026, 3, 15, 10))
+
+    # Ilk sinirdan once kapandi, hic satir yazilmadi
+    restarted = make_collector()
+    make_collector.manager.value = 3.0
+    assert restarted.capture_due(datetime(2026, 3, 17, 8)) == 2
+    assert dates(restarted) == [
+        ('2026-03-17T00:00:00', True, 3.0),
+        ('2026-03-16T00:00:00', True, None),
+    ]
+
+
+def test_all_types_due_at_year_boundary_share_one_read(make_collector):
+    collector = make_collector(types=periodic_snapshots.SNAPSHOT_TYPES)
+    collector.capture_due(datetime(2026, 12, 31, 12))
+    make_collector.manager.value = 5.0
+    assert collector.capture_due(datetime(2027, 1, 1, 0, 0, 10)) == 4
+    assert make_collector.manager.reads == 1
+    # 1 Ocak 2027 Cuma: haftalik sinir yok
+    assert sorted(row['snapshot_type'] for row in collector.query()) == ['daily', 'monthly', 'quarterly', 'yearly']
+
+
+def test_failed_read_is_retried_in_same_period(make_collector):
+    collector = make_collector()
+    collector.capture_due(datetime(2026, 3, 15, 10))
+    make_collector.manager.errors = {'HR0': 'Timeout'}
+    assert collector.capture_due(datetime(2026, 3, 16, 0, 0, 5)) == 0
+    assert collector.failures == 1
+
+    make_collector.manager.errors = {}
+    make_collector.manager.value = 9.0
+    assert collector.capture_due(datetime(2026, 3, 16, 0, 5)) == 1
+    assert dates(collector) == [('2026-03-16T00:00:00', True, 9.0)]
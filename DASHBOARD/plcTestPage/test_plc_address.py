@@ -0,0 +1,69 @@
+import pytest
+
+from plc_address import DB_COIL_SPAN, DB_REGISTER_SPAN, decode_value, encode_value, parse_plc_address
+
+
+@pytest.mark.parametrize('text, area, address, bit, data_type, count', [
+    ('42', 'coil', 42, None, 'BOOL', 1),
+    ('DB1.DBX0.0', 'coil', 0, None, 'BOOL', 1),
+    ('DB1.DBX2.5', 'coil', 21, None, 'BOOL', 1),
+    ('DB2.DBX0.1', 'coil', DB_COIL_SPAN + 1, None, 'BOOL', 1),
+    ('DB1.DBW10', 'register', 5, None, 'WORD', 1),
+    ('DB1.DBW10:INT', 'register', 5, None, 'INT', 1),
+    ('DB1.DBW10.3', 'register_bit', 5, 3, 'BOOL', 1),
+    ('DB1.DBD4', 'register', 2, None, 'DWORD', 2),
+    ('DB3.DBD4:REAL', 'register', 2 * DB_REGISTER_SPAN + 2, None, 'REAL', 2),
+    ('db1.dbd4:real', 'register', 2, None, 'REAL', 2),
+    ('HR100', 'register', 100, None, 'WORD', 1),
+    ('HR100.15', 'register_bit', 100, 15, 'BOOL', 1),
+    ('HR100:DINT', 'register', 100, None, 'DINT', 2),
+])
+def test_parse_plc_address(text, area, address, bit, data_type, count):
+    parsed = parse_plc_address(text)
+    assert (parsed.area, parsed.address, parsed.bit, parsed.data_type, parsed.count) == (area, address, bit, data_type, count)
+    assert parsed.text == text
+
+
+@pytest.mark.parametrize('text', [
+    'DB0.DBX0.0',       # DB 1'den baslar
+    'DB1.DBX0.8',       # bit 0-7
+    'DB1.DBX0',         # bit gerekli
+    'DB1.DBW3',         # tek offset
+    'DB1.DBW10:REAL',   # DBW'de 32 bit tip
+    'DB1.DBD4:WORD',    # DBD'de 16 bit tip
+    'DB1.DBD4.1',       # DBD'de bit
+    'DB1.DBW510.0:INT',  # bitte tip
+    'DB1.DBD510',       # DB boyutunu asar
+    'HR100.16',         # bit 0-15
+    'HR65535:REAL',     # iki register adres alanini asar
+    '70000',            # coil adres alani
+    'HR1:FLOAT',        # bilinmeyen tip
+    'abc',
+])
+def test_parse_plc_address_rejects(text):
+    with pytest.raises(ValueError):
+        parse_plc_address(text)
+
+
+@pytest.mark.parametrize('data_type, value, word_order, registers', [
+    ('WORD', 0xBEEF, 'little', [0xBEEF]),
+    ('INT', -2, 'little', [0xFFFE]),
+    ('DWORD', 0x12345678, 'big', [0x1234, 0x5678]),
+    ('DWORD', 0x12345678, 'little', [0x5678, 0x1234]),
+    ('DINT', -1, 'little', [0xFFFF, 0xFFFF]),
+    ('REAL', 1.5, 'big', [0x3FC0, 0x0000]),
+    ('REAL', 1.5, 'little', [0x0000, 0x3FC0]),
+])
+def test_encode_decode_round_trip(data_type, value, word_order, registers):
+    assert encode_value(data_type, value, word_order) == registers
+    assert decode_value(data_type, registers, word_order) == value
+
+
+@pytest.mark.parametrize('data_type, value', [
+    ('WORD', 0x10000),
+    ('INT', 40000),
+    ('DINT', 1.5),
+])
+def test_encode_value_rejects_out_of_range(data_type, value):
+    with pytest.raises(ValueError):
+        encode_value(data_type, value)
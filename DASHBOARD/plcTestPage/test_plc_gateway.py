@@ -0,0 +1,89 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from modbus_server import ModbusTcpServer
+from plc_gateway import MachineRegistry, PLCGateway
+from plc_simulator import PLCSimulator
+
+
+def read_coil(client, slave):
+    return client.read_coils(0, 1, slave=slave)
+
+
+def test_registry_loads_machines_and_falls_back_to_single_plc(tmp_path):
+    path = tmp_path / 'machines.json'
+    registry = MachineRegistry.load(str(path), 'lemanic3', '10.0.0.1', 1502, 2)
+    assert registry.get() == ('lemanic3', {'name': 'lemanic3', 'host': '10.0.0.1', 'port': 1502, 'slave_id': 2})
+
+    path.write_text(json.dumps({'machines': {
+        'a': {'host': '10.0.0.2', 'debounce': {'run_delay': 3}},
+        'b': {'host': '10.0.0.3', 'port': '1502', 'slave_id': '4'},
+    }}))
+    registry = MachineRegistry.load(str(path), 'x', '', 0, 0)
+    # default verilmezse ilk makine; alt sistem ayarlari oldugu gibi kalir
+    assert registry.get()[0] == 'a'
+    assert registry.get('a')[1]['debounce'] == {'run_delay': 3}
+    assert registry.get('b')[1] == {'name': 'b', 'host': '10.0.0.3', 'port': 1502, 'slave_id': 4}
+    with pytest.raises(ValueError):
+        registry.get('c')
+
+
+@pytest.mark.parametrize('machines', [
+    {'machines': {}},
+    {'default': 'b', 'machines': {'a': {'host': '10.0.0.2'}}},
+    {'machines': {'a': {'port': 502}}},
+])
+def test_registry_rejects_bad_files(tmp_path, machines):
+    path = tmp_path / 'machines.json'
+    path.write_text(json.dumps(machines))
+    with pytest.raises(ValueError):
+        MachineRegistry.load(str(path), 'x', '', 0, 0)
+
+
+@pytest.fixture
+def plcs():
+    # Iki sahte PLC ayri bir loop'ta: gateway kendi loop'unu kullanir
+    simulators = {key: PLCSimulator(coils=8, registers=8) for key in ('fast', 'stuck')}
+    loop = asyncio.new_event_loop()
+    servers = {key: ModbusTcpServer(simulator.handle, '127.0.0.1', 0) for key, simulator in simulators.items()}
+    for server in servers.values():
+        loop.run_until_complete(server.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    ports = {key: server._server.sockets[0].getsockname()[1] for key, server in servers.items()}
+    yield simulators, ports
+    for server in servers.values():
+        asyncio.run_coroutine_threadsafe(server.stop(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+
+
+def test_stuck_plc_does_not_delay_other_machines(plcs):
+    simulators, ports = plcs
+    registry = MachineRegistry({
+        key: {'name': key, 'host': '127.0.0.1', 'port': port, 'slave_id': 1} for key, port in ports.items()
+    }, 'fast')
+    gateway = PLCGateway(registry, request_timeout=5.0, timeout=1.0, backoff_initial=0.1)
+    gateway.start()
+    try:
+        assert gateway.call('stuck', read_coil)[0]
+        simulators['stuck'].drop_rate = 1.0
+        stuck = gateway.submit(gateway.session('stuck').execute(read_coil))
+
+        # Cevapsiz PLC'nin istegi beklerken diger makine hemen cevap alir
+        started = time.perf_counter()
+        for _ in range(10):
+            assert gateway.call('fast', read_coil)[0]
+        assert time.perf_counter() - started < 0.5
+        assert not stuck.done()
+
+        assert not stuck.result(5)[0]
+        assert gateway.status()['fast']['state'] == 'connected'
+        assert gateway.write('fast', 'coils', [(2, True)])[0]['success']
+        assert simulators['fast'].context[1].getValues(1, 2, 1) == [True]
+    finally:
+        gateway.stop()
@@ -0,0 +1,135 @@
+import multiprocessing
+import time
+import uuid
+from array import array
+
+import pytest
+
+from plc_image import _MACHINE_HEADER, _READ_RETRIES, _SEQUENCE, ImageLayout, ImageReader, ImageWriter
+
+# Register'lar aradaki bosluk yuzunden iki bolgeye ayrilir; bir yayin birden fazla bolgeye yazar
+MACHINES = {
+    'm1': {'coils': list(range(0, 16)), 'holding_registers': list(range(100, 140)) + list(range(1000, 1040))},
+    'm2': {'coils': [5], 'holding_registers': [7]},
+}
+ALL_REGISTERS = MACHINES['m1']['holding_registers']
+
+
+@pytest.fixture
+def image_name():
+    return f'plc_test_{uuid.uuid4().hex[:12]}'
+
+
+@pytest.fixture
+def writer(image_name):
+    image_writer = ImageWriter(image_name, ImageLayout(MACHINES))
+    yield image_writer
+    image_writer.close()
+
+
+def test_layout_regions_and_find():
+    layout = ImageLayout(MACHINES)
+    _, regions = layout.machines['m1']
+    assert [(start, count) for start, count, _ in regions['holding_registers']] == [(100, 40), (1000, 40)]
+    assert layout.find('m1', 'holding_registers', 1039)[0] == 1000
+    assert layout.find('m1', 'holding_registers', 140) is None
+    assert layout.find('m1', 'holding_registers', 99) is None
+    assert layout.addresses('m2', 'coils') == [5]
+    assert ImageLayout(MACHINES).crc == layout.crc
+    assert ImageLayout({'m1': {'coils': [1]}}).crc != layout.crc
+
+
+def test_publish_and_read(writer, image_name):
+    reader = ImageReader(image_name, ImageLayout(MACHINES))
+    try:
+        writer.publish('m1', {'coils': {3: 1}, 'holding_registers': {100: 7, 1039: 65535}}, updated_at=123.5)
+        values, updated_at = reader.read('m1', 'holding_registers', [100, 101, 1039])
+        assert values == {100: 7, 101: 0, 1039: 65535}
+        assert updated_at == 123.5
+        values, _ = reader.read('m1', 'coils', [2, 3])
+        assert values == {2: False, 3: True}
+
+        # Verilmeyen adresler ve zaman onceki degerini korur
+        writer.publish('m1', {'holding_registers': {101: 9}})
+        values, updated_at = reader.read('m1', 'holding_registers', [100, 101])
+        assert values == {100: 7, 101: 9}
+        assert updated_at == 123.5
+        # Blok okumasi tek bolge icinde kalmali
+        registers, updated_at = reader.read_block('m1', 'holding_registers', 100, 3)
+        assert registers == array('H', [7, 9, 0]) and updated_at == 123.5
+        assert reader.read_block('m1', 'holding_registers', 138, 4) is None
+        # Imajda olmayan adres veya tablo cagirani IPC'ye dusurur
+        assert reader.read('m1', 'holding_registers', [100, 500]) is None
+        assert reader.read('m1', 'input_registers', [0]) is None
+        assert reader.read('m2', 'holding_registers', [7]) == ({7: 0}, 0.0)
+    finally:
+        reader.close()
+
+
+def test_reader_without_image_or_with_other_layout(image_name):
+    reader = ImageReader(image_name, ImageLayout(MACHINES))
+    assert reader.read('m1', 'coils', [0]) is None
+
+    other = ImageWriter(image_name, ImageLayout({'m1': {'coils': [0]}}))
+    try:
+        assert reader.read('m1', 'coils', [0]) is None
+    finally:
+        other.close()
+        reader.close()
+
+
+def test_reader_gives_up_while_writer_holds_sequence(writer, image_name):
+    reader = ImageReader(image_name, ImageLayout(MACHINES))
+    try:
+        header, _ = writer.layout.machines['m1']
+        buffer = writer._image.buffer
+        sequence = _MACHINE_HEADER.unpack_from(buffer, header)[0]
+        # Yazar yayin ortasinda kalmis gibi: sayac tek
+        _SEQUENCE.pack_into(buffer, header, sequence + 1)
+        assert reader.read('m1', 'coils', [0]) is None
+        assert reader.retries == _READ_RETRIES
+        _SEQUENCE.pack_into(buffer, header, sequence + 2)
+        assert reader.read('m1', 'coils', [0]) is not None
+    finally:
+        reader.close()
+
+
+def _publish_loop(name, stop, ready):
+    image_writer = ImageWriter(name, ImageLayout(MACHINES))
+    ready.set()
+    try:
+        value = 0
+        while not stop.is_set():
+            value = (value + 1) & 0xFFFF
+            image_writer.publish('m1', {'holding_registers': dict.fromkeys(ALL_REGISTERS, value)}, updated_at=value)
+    finally:
+        image_writer.close()
+
+
+def test_seqlock_never_returns_torn_image(image_name):
+    # Yazar ayri surecte durmadan yayinlar; her okuma tek bir yayinin degerlerini gormeli
+    context = multiprocessing.get_context('spawn')
+    stop, ready = context.Event(), context.Event()
+    process = context.Process(target=_publish_loop, args=(image_name, stop, ready))
+    process.start()
+    reader = ImageReader(image_name, ImageLayout(MACHINES))
+    try:
+        assert ready.wait(20)
+        reads = 0
+        seen = set()
+        deadline = time.monotonic() + 1.5
+        while time.monotonic() < deadline:
+            result = reader.read('m1', 'holding_registers', ALL_REGISTERS)
+            if result is None:
+                continue
+            values, updated_at = result
+            assert len(set(values.values())) == 1
+            assert next(iter(values.values())) == updated_at
+            seen.add(updated_at)
+            reads += 1
+        assert reads > 100
+        assert len(seen) > 10
+    finally:
+        reader.close()
+        stop.set()
+        process.join(10)
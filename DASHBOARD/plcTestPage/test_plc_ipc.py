@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from plc_ipc import AUTHKEY_BYTES, IPCClient, IPCServer, load_authkey
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def add(self, amount):
+        self.value += amount
+        return self.value
+
+    def reset(self):
+        self.value = 0
+
+
+def test_authkey_is_created_once_and_required(tmp_path):
+    path = str(tmp_path / 'plc_io.key')
+    with pytest.raises(RuntimeError):
+        load_authkey(path)
+    authkey = load_authkey(path, create=True)
+    assert len(authkey) == AUTHKEY_BYTES
+    # Ikinci I/O sureci ve web worker'lari ayni anahtari okur
+    assert load_authkey(path, create=True) == authkey
+    assert load_authkey(path) == authkey
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='POSIX dosya izinleri')
+def test_authkey_file_is_owner_only(tmp_path):
+    path = str(tmp_path / 'plc_io.key')
+    load_authkey(path, create=True)
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    os.chmod(path, 0o644)
+    with pytest.raises(RuntimeError):
+        load_authkey(path)
+
+
+def test_calls_need_matching_key_and_export(tmp_path):
+    counter = Counter()
+    server = IPCServer(('127.0.0.1', 0), load_authkey(str(tmp_path / 'key'), create=True), {
+        'counter': (counter, ('add',)),
+    })
+    server.start()
+    address = server._listener.address
+    try:
+        client = IPCClient(address, load_authkey(str(tmp_path / 'key')))
+        assert client.call('counter', 'add', 2) == 2
+        with pytest.raises(ValueError):
+            client.call('counter', 'reset')
+        assert counter.value == 2
+        client.close()
+
+        with pytest.raises(ConnectionError):
+            IPCClient(address, os.urandom(AUTHKEY_BYTES)).call('counter', 'add', 5)
+        assert counter.value == 2
+    finally:
+        server.close()
@@ -0,0 +1,57 @@
+import asyncio
+import struct
+
+from plc_replay import Exchange, ReplayPLC
+
+# Ilk okuma cevaplari kayit basindan 5 sn sonra gelmis
+EXCHANGES = [
+    Exchange(0, 5_000_000, 1, bytes([1, 0, 0, 0, 16]), bytes([1, 2, 0xFF, 0x01])),
+    Exchange(1_000, 5_000_000, 1, bytes([3, 0, 0, 0, 10]), bytes([3, 20]) + struct.pack('>10H', *range(1, 11))),
+    Exchange(6_000_000, 2_000, 1, bytes([6, 0, 3, 0, 99]), bytes([6, 0, 3, 0, 99])),
+    Exchange(7_000_000, 2_000, 1, bytes([3, 0, 0, 0, 10]), bytes([3, 20]) + struct.pack('>10H', *range(11, 21))),
+]
+
+
+def replay(requests, at=0):
+    plc = ReplayPLC(EXCHANGES, speed=1000.0)
+    # Saat kayittaki verilen anda durdurulur; cevap gecikmeleri kayit zamanini ilerletmez
+    plc.capture_time = lambda: plc.first_time + at
+
+    async def run():
+        return [await plc.handle(1, request) for request in requests]
+
+    return asyncio.run(run()), plc.stats
+
+
+def test_synthesized_reads_see_first_recorded_values_from_the_start():
+    (coils, registers), stats = replay([bytes([1, 0, 0, 0, 12]), bytes([3, 0, 2, 0, 3])])
+    assert coils == bytes([1, 2, 0xFF, 0x01])
+    assert registers == bytes([3, 6]) + struct.pack('>3H', 3, 4, 5)
+    assert stats['synthesized'] == 2
+
+
+def test_never_seen_addresses_read_as_zero():
+    (registers, coils), _ = replay([bytes([3, 0, 50, 0, 2]), bytes([1, 0, 100, 0, 3])])
+    assert registers == bytes([3, 4, 0, 0, 0, 0])
+    assert coils == bytes([1, 1, 0])
+
+
+def test_exact_request_returns_recorded_response():
+    (response,), stats = replay([bytes([3, 0, 0, 0, 10])])
+    assert response == bytes([3, 20]) + struct.pack('>10H', *range(1, 11))
+    assert stats['exact'] == 1
+
+
+def test_synthesized_write_updates_image():
+    (write, read), _ = replay([bytes([16, 0, 2, 0, 1, 2, 0x12, 0x34]), bytes([3, 0, 1, 0, 2])])
+    assert write == bytes([16, 0, 2, 0, 1])
+    assert read == bytes([3, 4]) + struct.pack('>2H', 2, 0x1234)
+
+
+def test_later_recorded_values_apply_as_capture_time_advances():
+    request = bytes([3, 0, 2, 0, 2])
+    # 6 sn'deki yazma uygulanmis, 7 sn'deki okuma cevabi (7.002 sn) henuz degil
+    (before,), _ = replay([request], at=6_500_000)
+    assert before == bytes([3, 4]) + struct.pack('>2H', 3, 99)
+    (after,), _ = replay([request], at=8_000_000)
+    assert after == bytes([3, 4]) + struct.pack('>2H', 13, 14)
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from plc_scheduler import PriorityGate
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def queue_up(gate, order, *priorities):
+    # Her bekleyen slotu alinca adini kaydeder; slot testte elle birakilir
+    tasks = []
+    for name in priorities:
+        async def take(name=name):
+            await gate.acquire(name.rstrip('0123456789'))
+            order.append(name)
+        tasks.append(asyncio.create_task(take()))
+        await settle()
+    return tasks
+
+
+def test_higher_classes_go_first_and_order_is_kept_within_a_class():
+    async def main():
+        gate = PriorityGate(1)
+        await gate.acquire('background')
+        order = []
+        await queue_up(gate, order, 'background1', 'interactive1', 'command1', 'interactive2', 'background2')
+        assert gate.waiting() == {'command': 1, 'interactive': 2, 'background': 2}
+        for priority in ('background', 'command', 'interactive', 'interactive', 'background'):
+            gate.release(priority)
+            await settle()
+        return order, gate.granted
+
+    order, granted = asyncio.run(main())
+    assert order == ['command1', 'interactive1', 'interactive2', 'background1', 'background2']
+    assert granted == {'command': 1, 'interactive': 2, 'background': 3}
+
+
+def test_background_never_takes_the_last_pipeline_slot():
+    async def main():
+        gate = PriorityGate(3)
+        order = []
+        await queue_up(gate, order, 'background1', 'background2', 'background3')
+        assert order == ['background1', 'background2']
+        await queue_up(gate, order, 'command1')
+        assert order[-1] == 'command1' and gate.busy == 3
+        gate.release('background')
+        await settle()
+        return order
+
+    assert asyncio.run(main()) == ['background1', 'background2', 'command1', 'background3']
+
+
+def test_background_gets_a_slot_after_starvation_limit():
+    async def main():
+        gate = PriorityGate(1, starvation_limit=2)
+        await gate.acquire('interactive')
+        order = []
+        await queue_up(gate, order, 'background1', 'interactive1', 'interactive2', 'interactive3', 'interactive4')
+        for priority in ('interactive',) * 3 + ('background', 'interactive', 'interactive'):
+            gate.release(priority)
+            await settle()
+        return order
+
+    # Iki kez atlanan arka plan taramasi ucuncu slotu alir
+    assert asyncio.run(main()) == ['interactive1', 'interactive2', 'background1', 'interactive3', 'interactive4']
+
+
+def test_cancelled_waiters_do_not_leak_slots():
+    async def main():
+        gate = PriorityGate(1)
+        await gate.acquire('command')
+        order = []
+        waiting, granted_then_cancelled, last = await queue_up(gate, order, 'interactive1', 'command2', 'background1')
+        waiting.cancel()
+        await settle()
+        assert gate.waiting() == {'command': 1, 'interactive': 0, 'background': 1}
+
+        # Slot verildigi anda iptal edilen bekleyen slotu geri birakir
+        gate.release('command')
+        granted_then_cancelled.cancel()
+        await settle()
+        await last
+        assert order == ['background1'] and gate.busy == 1
+        with pytest.raises(ValueError):
+            await gate.acquire('urgent')
+
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+import asyncio
+import socket
+import time
+
+from modbus_server import ModbusTcpServer
+from plc_session import STATE_BACKOFF, STATE_CONNECTED, STATE_STOPPED, PLCSession
+from plc_simulator import PLCSimulator
+
+
+def read_coil(client, slave):
+    return client.read_coils(0, 1, slave=slave)
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "kosul zaman asimina ugradi"
+        await asyncio.sleep(0.02)
+
+
+def make_session(port, **options):
+    options = dict({'timeout': 0.3, 'keepalive_interval': 0.2, 'backoff_initial': 0.1, 'backoff_max': 0.4}, **options)
+    return PLCSession('127.0.0.1', port, 1, **options)
+
+
+def test_backoff_fails_fast_then_reconnects_when_plc_appears():
+    async def main():
+        port = free_port()
+        session = make_session(port)
+        await session.start()
+        server = None
+        try:
+            success, message = await session.execute(read_coil)
+            assert (success, message) == (False, "PLC baglantisi kurulamadi")
+            assert session.state == STATE_BACKOFF
+
+            # Bekleme suresi icindeki istekler baglanti denemeden hemen hata doner
+            started = time.perf_counter()
+            success, message = await session.execute(read_coil)
+            assert not success and 'yeniden deneme' in message
+            assert time.perf_counter() - started < 0.05
+
+            # Arka plan gorevi tekrar dener; bekleme ikiye katlanir ve backoff_max'ta durur
+            await wait_for(lambda: session.status()['consecutive_failures'] >= 4)
+            assert session._backoff == 0.4
+            assert 0 < session.status()['retry_in_seconds'] <= 0.4
+
+            server = ModbusTcpServer(PLCSimulator(coils=8, registers=8).handle, '127.0.0.1', port)
+            await server.start()
+            await wait_for(lambda: session.state == STATE_CONNECTED)
+            status = session.status()
+            assert (status['reconnect_count'], status['consecutive_failures'], status['last_error']) == (1, 0, None)
+            assert session._backoff == 0.1
+            assert (await session.execute(read_coil))[0]
+        finally:
+            await session.stop()
+            if server is not None:
+                await server.stop()
+        assert session.state == STATE_STOPPED
+        assert await session.execute(read_coil) == (False, "PLC oturumu calismiyor")
+
+    asyncio.run(main())
+
+
+def test_unanswered_request_drops_connection_and_session_recovers():
+    async def main():
+        simulator = PLCSimulator(coils=8, registers=8)
+        server = ModbusTcpServer(simulator.handle, '127.0.0.1', 0)
+        await server.start()
+        session = make_session(server._server.sockets[0].getsockname()[1])
+        await session.start()
+        try:
+            assert (await session.execute(read_coil))[0]
+            simulator.drop_rate = 1.0
+            success, _ = await session.execute(read_coil)
+            assert not success
+            assert session.state == STATE_BACKOFF
+
+            simulator.drop_rate = 0.0
+            await wait_for(lambda: session.state == STATE_CONNECTED)
+            assert (await session.execute(read_coil))[0]
+            assert session.reconnect_count == 1
+            assert server.connection_count == 2
+        finally:
+            await session.stop()
+            await server.stop()
+
+    asyncio.run(main())
+
+
+def test_modbus_exception_keeps_connection():
+    async def main():
+        server = ModbusTcpServer(PLCSimulator(coils=8, registers=8).handle, '127.0.0.1', 0)
+        await server.start()
+        session = make_session(server._server.sockets[0].getsockname()[1])
+        await session.start()
+        try:
+            success, message = await session.execute(lambda client, slave: client.read_coils(100, 1, slave=slave))
+            assert not success and message.startswith('Modbus hatasi')
+            assert session.state == STATE_CONNECTED
+            assert (await session.execute(read_coil))[0]
+            assert server.connection_count == 1
+        finally:
+            await session.stop()
+            await server.stop()
+
+    asyncio.run(main())
+
+
+def test_idle_connection_is_kept_warm_with_keepalive_probe():
+    async def main():
+        server = ModbusTcpServer(PLCSimulator(coils=8, registers=8).handle, '127.0.0.1', 0)
+        await server.start()
+        session = make_session(server._server.sockets[0].getsockname()[1])
+        await session.start()
+        try:
+            assert (await session.execute(read_coil))[0]
+            requests = server.request_count
+            await asyncio.sleep(0.7)
+            # keepalive_interval 0.2 sn: bosta gecen surede en az iki probe
+            assert server.request_count - requests >= 2
+            assert session.status()['idle_seconds'] < 0.5
+            assert server.connection_count == 1
+        finally:
+            await session.stop()
+            await server.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+import math
+import threading
+import time
+
+import pytest
+
+from plc_address import encode_value
+from signal_filter import RunStateMonitor, RunStopDebouncer, SpeedFilter, TransitionLog
+
+
+def test_run_needs_run_delay_above_run_threshold():
+    debouncer = RunStopDebouncer(24.0, 24.5, 2.0)
+    assert debouncer.stopped
+    assert not debouncer.update(30.0, False, 10.0)
+    assert not debouncer.update(30.0, False, 11.9)
+    assert debouncer.update(30.0, False, 12.0)
+    assert not debouncer.stopped
+    assert not debouncer.update(30.0, False, 13.0)
+
+
+def test_band_between_thresholds_resets_timer_and_keeps_state():
+    debouncer = RunStopDebouncer(24.0, 24.5, 2.0)
+    debouncer.update(30.0, False, 0.0)
+    assert not debouncer.update(24.2, False, 1.5)
+    # Zamanlayici ara bantta sifirlandi, yeniden run_delay beklenir
+    assert not debouncer.update(30.0, False, 2.5)
+    assert not debouncer.update(30.0, False, 4.4)
+    assert debouncer.update(30.0, False, 4.5)
+    # Calisirken ara bant durum degistirmez (histerezis)
+    assert not debouncer.update(24.2, False, 5.0)
+    assert not debouncer.stopped
+
+
+def test_stop_is_immediate_on_low_speed_or_stop_signal():
+    debouncer = RunStopDebouncer(24.0, 24.5, 0.0)
+    assert debouncer.update(30.0, False, 0.0)
+    assert debouncer.update(23.9, False, 0.1)
+    assert debouncer.stopped
+    assert debouncer.update(30.0, False, 0.2)
+    assert debouncer.update(30.0, True, 0.3)
+    assert debouncer.stopped
+    assert not debouncer.update(30.0, True, 5.0)
+
+
+def test_debouncer_rejects_inverted_thresholds():
+    with pytest.raises(ValueError):
+        RunStopDebouncer(25.0, 24.0, 2.0)
+    with pytest.raises(ValueError):
+        RunStopDebouncer(24.0, 24.5, -1.0)
+
+
+def test_speed_filter_rejects_noise_and_takes_median():
+    speed_filter = SpeedFilter(window=3, max_speed=400.0, min_period=5.0, max_period=2000.0)
+    assert speed_filter.update(100.0) == 100.0
+    assert speed_filter.update(101.0) == 101.0
+    # Tekil sivri deger medyanda bastirilir
+    assert speed_filter.update(390.0) == 101.0
+    assert speed_filter.update(500.0) is None
+    assert speed_filter.update(-1.0) is None
+    assert speed_filter.update(math.nan) is None
+    # Ters donus ve bounce period'lari reddedilir; pulse yoksa hiz 0
+    assert speed_filter.update(100.0, period=-10.0) is None
+    assert speed_filter.update(100.0, period=2.0) is None
+    assert speed_filter.update(100.0, period=0.0) == 101.0
+    assert speed_filter.update(100.0, period=3000.0) == 0.0
+    assert (speed_filter.accepted, speed_filter.rejected) == (5, 5)
+
+
+class FakeManager:
+    """Hiz register'lari ve durdurma coil'i olan sahte PLC manager."""
+
+    def __init__(self):
+        self.registers = {}
+        self.coils = {4: False}
+        self.lock = threading.Lock()
+        self.set_speed(0.0)
+
+    def set_speed(self, speed):
+        with self.lock:
+            self.registers.update(zip((100, 101), encode_value('REAL', speed)))
+
+    def read(self, table, addresses, max_age=None, priority='interactive'):
+        with self.lock:
+            source = self.registers if table == 'holding_registers' else self.coils
+            return {address: source[address] for address in addresses}, {}, 0.0
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_monitor_timing_and_transitions():
+    manager = FakeManager()
+    transitions = TransitionLog()
+    monitor = RunStateMonitor('m1', manager, {
+        'speed_register': 100, 'stop_coil': 4, 'sample_interval': 0.01,
+        'run_delay': 0.3, 'median_window': 1,
+    }, transitions)
+    monitor.start()
+    try:
+        assert wait_for(lambda: monitor.samples > 3)
+        assert monitor.status()['state'] == 'stopped'
+
+        manager.set_speed(30.0)
+        started = time.monotonic()
+        assert wait_for(lambda: monitor.status()['state'] == 'running')
+        assert time.monotonic() - started >= 0.3
+
+        manager.coils[4] = True
+        started = time.monotonic()
+        assert wait_for(lambda: monitor.status()['state'] == 'stopped')
+        assert time.monotonic() - started < 0.2
+
+        # Esikler canli degisir: 30 artik calisma esiginin altinda
+        manager.coils[4] = False
+        monitor.configure(stop_threshold=35.0, run_threshold=40.0)
+        time.sleep(0.4)
+        assert monitor.status()['state'] == 'stopped'
+    finally:
+        monitor.stop()
+
+    assert [(entry['state'], entry['speed']) for entry in transitions.recent('m1')] == [
+        ('running', 30.0), ('stopped', 30.0)
+    ]
+    assert monitor.status()['last_error'] is None
@@ -0,0 +1,75 @@
+from array import array
+
+import pytest
+
+from snapshot_cache import SnapshotCache
+
+
+class FakePLC:
+    def __init__(self):
+        self.registers = list(range(1000, 1300))
+        self.reads = []
+        self.fail = set()
+
+    def read(self, table, start, count, priority):
+        self.reads.append((start, count))
+        if start in self.fail:
+            return False, 'timeout'
+        return True, self.registers[start:start + count]
+
+    def read_many(self, table, blocks, priority):
+        return [self.read(table, start, count, priority) for start, count in blocks]
+
+
+@pytest.fixture
+def plc():
+    return FakePLC()
+
+
+@pytest.fixture
+def cache(plc):
+    return SnapshotCache(plc.read, 60.0, plc.read_many)
+
+
+def test_read_arrays_scans_once_and_reuses_block(cache, plc):
+    [(first, error)], _ = cache.read_arrays('holding_registers', [(10, 4)])
+    assert error is None
+    assert first == array('H', [1010, 1011, 1012, 1013])
+    [(second, _)], _ = cache.read_arrays('holding_registers', [(10, 4)])
+    assert second is first
+    # Kapsanan bir alt blok yeniden taranmaz
+    [(inner, _)], _ = cache.read_arrays('holding_registers', [(11, 2)])
+    assert inner == array('H', [1011, 1012])
+    assert plc.reads == [(10, 4)]
+    assert cache.read('holding_registers', [12])[0] == {12: 1012}
+
+
+def test_read_arrays_scans_missing_blocks_together_and_reports_errors(cache, plc):
+    plc.fail.add(200)
+    blocks, _ = cache.read_arrays('holding_registers', [(0, 2), (100, 3), (200, 1)])
+    assert [list(registers) if registers is not None else error for registers, error in blocks] == [
+        [1000, 1001], [1100, 1101, 1102], 'timeout'
+    ]
+    assert plc.reads == [(0, 2), (100, 3), (200, 1)]
+    assert cache.scan_count == 1
+
+
+def test_write_drops_block_but_fresh_addresses_still_serve(cache, plc):
+    cache.read_arrays('holding_registers', [(10, 4)])
+    cache.update('holding_registers', {11: 7})
+    [(registers, _)], _ = cache.read_arrays('holding_registers', [(10, 4)])
+    assert registers == array('H', [1010, 7, 1012, 1013])
+    assert plc.reads == [(10, 4)]
+
+    cache.invalidate('holding_registers', [12])
+    [(registers, _)], _ = cache.read_arrays('holding_registers', [(10, 4)])
+    assert registers == array('H', [1010, 1011, 1012, 1013])
+    assert plc.reads == [(10, 4), (10, 4)]
+
+
+def test_read_arrays_rescans_stale_blocks(cache, plc):
+    cache.read_arrays('holding_registers', [(10, 2)])
+    cache.read_arrays('holding_registers', [(10, 2)], max_age=0)
+    assert plc.reads == [(10, 2), (10, 2)]
+    with pytest.raises(ValueError):
+        cache.read_arrays('coils', [(0, 8)])
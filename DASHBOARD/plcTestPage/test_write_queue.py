@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from modbus_server import ModbusTcpServer
+from plc_session import PLCSession
+from plc_simulator import PLCSimulator
+from write_queue import WriteQueue
+
+
+def run_with_queue(scenario, verify=False, window=0.02):
+    """Sahte PLC'yi bos bir portta acar, oturum + kuyruk ile senaryoyu calistirir."""
+    async def main():
+        simulator = PLCSimulator(coils=64, registers=64)
+        server = ModbusTcpServer(simulator.handle, '127.0.0.1', 0)
+        await server.start()
+        port = server._server.sockets[0].getsockname()[1]
+        session = PLCSession('127.0.0.1', port, 1, timeout=2.0, pipeline_depth=4)
+        await session.start()
+        try:
+            queue = WriteQueue(session, window=window, verify=verify)
+            result = await scenario(queue, session, simulator)
+            return result, queue.stats()
+        finally:
+            await session.stop()
+            await server.stop()
+
+    return asyncio.run(main())
+
+
+def registers(simulator, start, count):
+    return simulator.context[1].getValues(3, start, count)
+
+
+def test_same_address_coalesces_last_value_wins():
+    async def scenario(queue, session, simulator):
+        acks = await asyncio.gather(
+            queue.write('holding_registers', [(5, 1)]),
+            queue.write('holding_registers', [(5, 2)]),
+            queue.write('holding_registers', [(5, 3)]),
+        )
+        return [ack for batch in acks for ack in batch], registers(simulator, 5, 1)
+
+    (acks, values), stats = run_with_queue(scenario)
+    assert values == [3]
+    assert all(ack['success'] for ack in acks)
+    assert all(ack['value'] == 3 for ack in acks)
+    assert [ack['superseded'] for ack in acks] == [True, True, False]
+    assert stats['coalesced'] == 2
+    assert stats['transactions'] == 1
+
+
+def test_contiguous_addresses_become_one_block():
+    async def scenario(queue, session, simulator):
+        await asyncio.gather(*(queue.write('holding_registers', [(10 + offset, offset + 1)]) for offset in range(5)))
+        await queue.write('coils', [(3, True), (4, True), (6, True)])
+        return registers(simulator, 10, 5), simulator.context[1].getValues(1, 3, 4)
+
+    (values, coils), stats = run_with_queue(scenario)
+    assert values == [1, 2, 3, 4, 5]
+    assert coils == [True, True, False, True]
+    # 1 register blogu + 2 coil blogu (3-4 ve 6)
+    assert stats['transactions'] == 3
+
+
+def test_coil_batches_from_many_callers_coalesce_into_one_write_coils():
+    async def scenario(queue, session, simulator):
+        simulator.context[1].setValues(1, 0, [True] * 8)
+        acks = await asyncio.gather(
+            queue.write('coils', [(0, False), (1, True), (2, False)]),
+            queue.write('coils', [(3, True), (1, False)]),
+            queue.write('coils', [(4, False), (0, True)]),
+        )
+        return [ack for batch in acks for ack in batch], simulator.context[1].getValues(1, 0, 6)
+
+    (acks, coils), stats = run_with_queue(scenario)
+    assert coils == [True, False, False, True, False, True]
+    assert all(ack['success'] for ack in acks)
+    assert len({ack['transaction'] for ack in acks}) == 1
+    assert [ack['superseded'] for ack in acks] == [True, True, False, False, False, False, False]
+    assert (stats['transactions'], stats['coalesced']) == (1, 2)
+
+
+def test_register_bits_share_one_mask_write_and_keep_other_bits():
+    async def scenario(queue, session, simulator):
+        simulator.context[1].setValues(6, 20, [0b1000_0000_0000_0001])
+        acks = await asyncio.gather(
+            queue.write('register_bits', [((20, 1), True)]),
+            queue.write('register_bits', [((20, 2), True), ((20, 0), False)]),
+            queue.write('register_bits', [((21, 4), True)]),
+        )
+        return acks, registers(simulator, 20, 2)
+
+    (acks, values), stats = run_with_queue(scenario)
+    assert values == [0b1000_0000_0000_0110, 0b1_0000]
+    assert all(ack['success'] for batch in acks for ack in batch)
+    # Register basina tek FC22
+    assert stats['transactions'] == 2
+
+
+def test_bits_apply_after_full_register_write_in_same_window():
+    async def scenario(queue, session, simulator):
+        await asyncio.gather(
+            queue.write('register_bits', [((30, 0), True)]),
+            queue.write('holding_registers', [(30, 0xFF00)]),
+        )
+        return registers(simulator, 30, 1)
+
+    (values, _) = run_with_queue(scenario)
+    assert values == [0xFF01]
+
+
+@pytest.mark.parametrize('bits, expected', [
+    ([(0, True)], (0xFFFE, 0x0001)),
+    ([(3, False), (15, True)], (0x7FF7, 0x8000)),
+])
+def test_masks(bits, expected):
+    assert WriteQueue._masks(bits) == expected
+
+
+def test_verify_reports_read_back():
+    async def scenario(queue, session, simulator):
+        return await queue.write('holding_registers', [(40, 7), (41, 8)], verify=True)
+
+    acks, stats = run_with_queue(scenario)
+    assert [ack['verified'] for ack in acks] == [True, True]
+    assert stats['verify_mismatches'] == 0
+
+
+def test_failed_write_resolves_every_caller():
+    async def scenario(queue, session, simulator):
+        # Simulatorde 64 register var; 100 adresi exception doner
+        return await asyncio.gather(
+            queue.write('holding_registers', [(100, 1)]),
+            queue.write('holding_registers', [(100, 2)]),
+        )
+
+    acks, stats = run_with_queue(scenario)
+    acks = [ack for batch in acks for ack in batch]
+    assert len(acks) == 2
+    assert not any(ack['success'] for ack in acks)
+    assert stats['failed_transactions'] == 1
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+
+from modbus_blocks import group_coil_writes, group_register_writes
+
+logger = logging.getLogger(__name__)
+
+# 'register_bits' adresleri (register, bit) ciftidir ve FC22 (mask write) ile yazilir
+WRITABLE_TABLES = ('coils', 'holding_registers', 'register_bits')
+
+
+class WriteQueue:
+    """PLC oturumunun onundeki yazma kuyrugu.
+
+    Kisa bir pencere icinde ayni adrese gelen yazmalar birlesir (son yazan
+    kazanir), farkli adresler ardisik bloklar halinde toplu yazilir. Her
+    cagiran, kendi degeri veya daha yeni bir deger PLC'ye yazildiginda
+    cozulen bir ack alir. Yazmalar ve geri okumalari oturuma 'command'
+    onceligiyle gider. Ayni register'in bitlerine gelen yazmalar tek bir
+    Mask Write Register (FC22) istegine toplanir; bu bitler ayni pencerede
+    gelen tam register yazmalarindan sonra uygulanir. Gateway'in event
+    loop'unda calisir.
+
+    verify=True ise her yazma blogunun cevabindan sonra ayni aralik geri
+    okunur ve farkli okunan adresler ack'te bildirilir. Bloklar ayni anda
+    gonderildigi icin geri okumalar da pipeline'da ust uste biner.
+    """
+
+    def __init__(self, session, window=0.01, verify=False):
+        self.session = session
+        self.window = window
+        self.verify = verify
+        self._pending = {}
+        self._in_flight = 0
+        self._flush_task = None
+        self._transaction_id = 0
+        self.submitted = 0
+        self.coalesced = 0
+        self.transactions = 0
+        self.failed = 0
+        self.verify_mismatches = 0
+        self.verify_failures = 0
+
+    async def write(self, table, writes, verify=False):
+        """[(adres, deger)] yazmalarini kuyruga koyar, her biri icin ack listesi doner.
+
+        Ack: {'success', 'message', 'value', 'superseded', 'transaction', 'verified'}
+        verify acikken 'verified' geri okumanin sonucudur, uyusmazlikta 'read_back' eklenir.
+        verify=True kuyruk ayari kapali olsa da bu yazmalarin bloklarini geri okutur.
+        """
+        if table not in WRITABLE_TABLES:
+            raise ValueError(f"Yazilamaz tablo: {table}")
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        for address, value in writes:
+            future = loop.create_future()
+            entry = self._pending.get((table, address))
+            if entry is None:
+                self._pending[(table, address)] = [value, [future], verify]
+            else:
+                # Ayni adrese bekleyen yazma var: deger ezilir, ack'ler birlikte cozulur
+                entry[0] = value
+                entry[1].append(future)
+                entry[2] = entry[2] or verify
+                self.coalesced += 1
+            futures.append(future)
+        self.submitted += len(futures)
+
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+        return await asyncio.gather(*futures)
+
+    def stats(self):
+        return {
+            'window_ms': round(self.window * 1000, 1),
+            'pending_addresses': len(self._pending),
+            'pending_writes': sum(len(entry[1]) for entry in list(self._pending.values())),
+            'in_flight': self._in_flight,
+            'submitted': self.submitted,
+            'coalesced': self.coalesced,
+            'transactions': self.transactions,
+            'failed_transactions': self.failed,
+            'verify': self.verify,
+            'verify_mismatches': self.verify_mismatches,
+            'verify_failures': self.verify_failures,
+        }
+
+    async def _flush_loop(self):
+        try:
+            while self._pending:
+                await asyncio.sleep(self.window)
+                batch, self._pending = self._pending, {}
+                await self._flush(batch)
+        finally:
+            self._flush_task = None
+
+    async def _flush(self, batch):
+        for table in WRITABLE_TABLES:
+            writes = [(address, entry[0]) for (entry_table, address), entry in batch.items() if entry_table == table]
+            if not writes:
+                continue
+            # Ayni tablodaki bloklar bagimsiz; oturumun pipeline derinligi kadari ayni anda gider
+            if table == 'register_bits':
+                jobs = [self._write_bits(batch, register, bits) for register, bits in self._group_bit_writes(writes)]
+            else:
+                group = group_coil_writes if table == 'coils' else group_register_writes
+                jobs = [self._write_block(batch, table, start, values) for start, values in group(writes)]
+            await asyncio.gather(*jobs)
+
+    async def _write_block(self, batch, table, start, values):
+        success, result, transaction = await self._execute(self._operation(table, start, values))
+        if not success:
+            logger.error(f"Kuyruk yazma hatasi: {table} {start}-{start + len(values) - 1} - {result}")
+        verify = self.verify or any(batch[(table, start + offset)][2] for offset in range(len(values)))
+        read_back = await self._read_back(table, start, len(values)) if success and verify else None
+        self._resolve(
+            batch,
+            [((table, start + offset), value, read_back[offset] if read_back else None)
+             for offset, value in enumerate(values)],
+            success, result, transaction
+        )
+
+    async def _write_bits(self, batch, register, bits):
+        and_mask, or_mask = self._masks(bits)
+        success, result, transaction = await self._execute(
+            lambda client, slave: client.mask_write_register(register, and_mask, or_mask, slave=slave)
+        )
+        if not success:
+            logger.error(f"Kuyruk yazma hatasi: register {register} maske {and_mask:#06x}/{or_mask:#06x} - {result}")
+        verify = self.verify or any(batch[('register_bits', (register, bit))][2] for bit, _ in bits)
+        read_back = await self._read_back('holding_registers', register, 1) if success and verify else None
+        self._resolve(
+            batch,
+            [(('register_bits', (register, bit)), value, bool(read_back[0] >> bit & 1) if read_back else None)
+             for bit, value in bits],
+            success, result, transaction
+        )
+
+    async def _read_back(self, table, start, count):
+        # Dogrulama okumasi yazma cevabindan sonra gider; PLC istekleri sirasiz isleyebilir
+        reader = 'read_coils' if table == 'coils' else 'read_holding_registers'
+        success, result = await self.session.execute(
+            lambda client, slave: getattr(client, reader)(start, count, slave=slave), 'command'
+        )
+        if not success:
+            self.verify_failures += 1
+            logger.error(f"Dogrulama okumasi yapilamadi: {table} {start}-{start + count - 1} - {result}")
+            return None
+        return result.bits[:count] if table == 'coils' else result.registers[:count]
+
+    async def _execute(self, operation):
+        self._in_flight += 1
+        try:
+            success, result = await self.session.execute(operation, 'command')
+        except Exception as e:
+            success, result = False, f"Genel hata: {e}"
+        finally:
+            self._in_flight -= 1
+
+        self._transaction_id += 1
+        self.transactions += 1
+        if not success:
+            self.failed += 1
+        return success, result, self._transaction_id
+
+    def _resolve(self, batch, written, success, result, transaction):
+        for key, value, read_back in written:
+            verified = None
+            if read_back is not None:
+                verified = bool(read_back) == value if isinstance(value, bool) else read_back == value
+                if not verified:
+                    self.verify_mismatches += 1
+                    logger.warning(f"Dogrulama uyusmazligi: {key[0]} {key[1]} yazilan {value}, okunan {read_back}")
+            futures = batch[key][1]
+            for index, future in enumerate(futures):
+                if future.done():
+                    continue
+                ack = {
+                    'success': success,
+                    'message': "Basari" if success else result,
+                    'value': value,
+                    'superseded': index < len(futures) - 1,
+                    'transaction': transaction,
+                    'verified': verified,
+                }
+                if verified is False:
+                    ack['read_back'] = read_back
+                future.set_result(ack)
+
+    @staticmethod
+    def _group_bit_writes(writes):
+        # [((register, bit), deger)] -> [(register, [(bit, deger)])]
+        registers = {}
+        for (register, bit), value in writes:
+            registers.setdefault(register, []).append((bit, bool(value)))
+        return sorted(registers.items())
+
+    @staticmethod
+    def _masks(bits):
+        # FC22: sonuc = (mevcut AND and_mask) OR (or_mask AND NOT and_mask)
+        and_mask = 0xFFFF
+        or_mask = 0
+        for bit, value in bits:
+            and_mask &= ~(1 << bit) & 0xFFFF
+            if value:
+                or_mask |= 1 << bit
+        return and_mask, or_mask
+
+    @staticmethod
+    def _operation(table, start, values):
+        if table == 'coils':
+            if len(values) == 1:
+                return lambda client, slave: client.write_coil(start, values[0], slave=slave)
+            return lambda client, slave: client.write_coils(start, values, slave=slave)
+        if len(values) == 1:
+            return lambda client, slave: client.write_register(start, values[0], slave=slave)
+        return lambda client, slave: client.write_registers(start, values, slave=slave)